@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of read_edf_header on synthetic edf headers.
+
+The single read parser of CEAMS_edfLib is compared with the previous
+parser which read each field of each channel with its own fid.read() call.
+
+Usage : python benchmarks/bench_read_edf_header.py [nchan] [n_repeat]
+"""
+
+import numpy as np
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+                                '..', 'src', 'main', 'python'))
+import CEAMS_edfLib
+
+
+def write_synthetic_hdr(fname, nchan, n_records=10, n_samps=256):
+    """Write an edf file with nchan channels and n_records short data records.
+    """
+    hdr_fields = ['0'.ljust(8), 'X X X X'.ljust(80), 'Startdate X X X X'.ljust(80),\
+        '01.01.00', '00.00.00', str(256*(nchan+1)).ljust(8), 'EDF+C'.ljust(44),\
+        str(n_records).ljust(8), '1'.ljust(8), str(nchan).ljust(4)]
+    channels = range(nchan)
+    hdr_fields.extend(['EEG C{}'.format(ch).ljust(16) for ch in channels])
+    hdr_fields.extend(['AgAgCl electrode'.ljust(80) for ch in channels])
+    hdr_fields.extend(['uV'.ljust(8) for ch in channels])
+    hdr_fields.extend(['-500'.ljust(8) for ch in channels])
+    hdr_fields.extend(['500'.ljust(8) for ch in channels])
+    hdr_fields.extend(['-32768'.ljust(8) for ch in channels])
+    hdr_fields.extend(['32767'.ljust(8) for ch in channels])
+    hdr_fields.extend(['HP:0.1Hz LP:75Hz'.ljust(80) for ch in channels])
+    hdr_fields.extend([str(n_samps).ljust(8) for ch in channels])
+    hdr_fields.extend([''.ljust(32) for ch in channels])
+    with open(fname, 'wb') as fid:
+        fid.write(bytes(''.join(hdr_fields), encoding='latin-1'))
+        fid.write(bytes(2*nchan*n_samps*n_records))
+
+
+def read_edf_header_per_field(fname, message_win):
+    """Reference parser : one fid.read() per field and per channel followed
+    by a decode/replace/strip and a conversion loop per channel (previous
+    implementation of read_edf_header).
+    """
+    edf_info = {}
+    with open(fname, 'rb') as fid:
+        fid.seek(8, 0)
+        for field, n_ascii in (('patient_id', 80), ('rec_id', 80), \
+            ('startdate', 8), ('starttime', 8)):
+            edf_info[field] = fid.read(n_ascii).decode('latin-1').replace('\x00', ' ')
+        edf_info['hdr_nbytes'] = int(fid.read(8).decode('latin-1').replace('\x00', '').strip())
+        edf_info['comment_44rsv'] = fid.read(44).decode('latin-1').replace('\x00', ' ')
+        edf_info['n_records'] = int(fid.read(8).decode('latin-1').replace('\x00', '').strip())
+        edf_info['record_length_sec'] = float(fid.read(8).decode('latin-1').replace('\x00', '').strip())
+        edf_info['nchan'] = int(fid.read(4).decode('latin-1').replace('\x00', '').strip())
+        channels = list(range(edf_info['nchan']))
+        for field, n_ascii in (('ch_labels', 16), ('transducer', 80), ('units', 8)):
+            edf_info[field] = [fid.read(n_ascii).decode('latin-1').replace('\x00', ' ') for ch in channels]
+        for field, dtype in (('physical_min', float), ('physical_max', float), \
+            ('digital_min', int), ('digital_max', int)):
+            vals = np.array([fid.read(8).decode('latin-1').replace('\x00', '').strip() for ch in channels])
+            edf_info[field] = np.zeros(len(vals), dtype=dtype)
+            for i, val in enumerate(vals):
+                try:
+                    edf_info[field][i] = dtype(float(val))
+                except:
+                    message_win.append(val)
+        edf_info['prefiltering'] = [fid.read(80).decode('latin-1').replace('\x00', ' ') for ch in channels]
+        vals = np.array([fid.read(8).decode('latin-1').replace('\x00', '').strip() for ch in channels])
+        edf_info['n_samps_record'] = np.zeros(len(vals), dtype=int)
+        for i, val in enumerate(vals):
+            edf_info['n_samps_record'][i] = int(val)
+        edf_info['comment_32rsv'] = [fid.read(32).decode('latin-1').replace('\x00', ' ') for ch in channels]
+        edf_info['hdr_nbytes_real'] = fid.tell()
+    return edf_info
+
+
+def main():
+    nchan = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fname = os.path.join(tmp_dir, 'bench_{}chans.edf'.format(nchan))
+        write_synthetic_hdr(fname, nchan)
+        message_win = []
+
+        t_per_field = min(timeit.repeat(lambda: read_edf_header_per_field(fname, message_win),\
+                                        number=n_repeat, repeat=3)) / n_repeat
+        t_single_read = min(timeit.repeat(lambda: CEAMS_edfLib.read_edf_header(fname, message_win),\
+                                          number=n_repeat, repeat=3)) / n_repeat
+
+    print("read_edf_header on {} channels ({} repeats)".format(nchan, n_repeat))
+    print("  per field reads : {:8.3f} ms".format(t_per_field*1e3))
+    print("  single read     : {:8.3f} ms".format(t_single_read*1e3))
+    print("  speedup         : {:8.1f} x".format(t_per_field/t_single_read))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite of the I/O paths of CEAMS_edfLib and of the reports.
+
+Synthetic EDF+ files (edf_synth.py) of several sizes are generated, then each
+benchmark is run in its own process to measure its peak RSS :
+    -read_edf_header, read_edf_data, write_edf_file, extract_edf_data
+    -reports : write_hdr_rep, write_chan_count and write_chan_reports
+     of REPORT_NFILES headers
+    -concat_edf_files : two files of the same size
+The results (time, throughput and peak RSS) can be saved as a baseline and
+compared to a baseline : a benchmark slower or using more memory than the
+baseline by more than the tolerance is a regression (exit code 1).
+
+Sizes (--sizes) :
+    -small : 1 channel 1 min, 32 mixed channels 10 min
+    -medium : 64 channels 1 h, 512 mixed channels 10 min (about 120 MB)
+    -large : 64 channels 8 h (about 1 GB)
+    -xl : 64 mixed channels 24 h (about 2 GB)
+
+With --bdf the files are BDF+ files (24-bit samples).
+
+Usage :
+    python benchmarks/bench_suite.py --sizes small,medium --save baseline.json
+    python benchmarks/bench_suite.py --sizes small,medium --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+                                '..', 'src', 'main', 'python'))
+import edf_synth
+
+# Files of each size : (name, nchan, n_records of 1 s, mixed n_samps_record)
+BENCH_SIZES = {
+    'small': [('1ch_1min', 1, 60, False), ('32ch_mixed_10min', 32, 600, True)],
+    'medium': [('64ch_1h', 64, 3600, False), ('512ch_mixed_10min', 512, 600, True)],
+    'large': [('64ch_8h', 64, 8*3600, False)],
+    'xl': [('64ch_mixed_24h', 64, 24*3600, True)],
+}
+BENCHES = ('read_edf_header', 'read_edf_data', 'write_edf_file', 'extract_edf_data', \
+           'reports', 'concat_edf_files')
+# The benchmarks that load the whole data in memory are skipped above this size
+IN_MEMORY_MAX_NBYTES = 2*1024**3
+# Number of headers of the reports
+REPORT_NFILES = 1000
+# A benchmark is repeated until BENCH_MIN_SEC (at most BENCH_MAX_REPEAT times),
+# the fastest run is kept
+BENCH_MIN_SEC = 0.5
+BENCH_MAX_REPEAT = 20
+# Default tolerance of the comparison to the baseline
+BENCH_TOLERANCE = 0.25
+
+
+# Internal function to return the peak RSS of the process in MB
+# (None if the resource module is not available, ex. Windows).
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return max_rss / (1024**2 if sys.platform == 'darwin' else 1024)
+
+
+# Internal function to time func : the fastest of the runs.
+def _time_call(func):
+    run_secs = []
+    while sum(run_secs) < BENCH_MIN_SEC and len(run_secs) < BENCH_MAX_REPEAT:
+        time_start = time.perf_counter()
+        func()
+        run_secs.append(time.perf_counter() - time_start)
+    return min(run_secs)
+
+
+# Internal function run in the child process : run the benchmark "bench" on
+# the edf file "fname" ("fname_next" follows it for the concatenation).
+# Returns the time in seconds and the throughput (value, unit).
+def _run_bench(bench, fname, fname_next, tmp_dir):
+    import CEAMS_edfLib
+    import CEAMS_edfReports
+    message_win = []
+    edf_info = CEAMS_edfLib.read_edf_header(fname, message_win)
+    file_nbytes = os.path.getsize(fname)
+    fname_out = os.path.join(tmp_dir, 'bench_out' + os.path.splitext(fname)[1])
+    if bench == 'read_edf_header':
+        sec = _time_call(lambda: CEAMS_edfLib.read_edf_header(fname, []))
+        return sec, (1/sec, 'headers/s')
+    if bench == 'read_edf_data':
+        sec = _time_call(lambda: CEAMS_edfLib.read_edf_data(fname, \
+                                    edf_info.get('hdr_nbytes'), message_win))
+        return sec, (file_nbytes/sec/1e6, 'MB/s')
+    if bench == 'write_edf_file':
+        edf_data = CEAMS_edfLib.read_edf_data(fname, edf_info.get('hdr_nbytes'), message_win)
+        sec = _time_call(lambda: CEAMS_edfLib.write_edf_file(fname_out, edf_info, \
+                                                             edf_data, message_win))
+        return sec, (file_nbytes/sec/1e6, 'MB/s')
+    if bench == 'extract_edf_data':
+        sec = _time_call(lambda: CEAMS_edfLib.extract_edf_data(fname, edf_info, message_win))
+        return sec, (file_nbytes/sec/1e6, 'MB/s')
+    if bench == 'reports':
+        edf_hdr_list = [edf_info]*REPORT_NFILES
+        edf_file_names = ['file{}.edf'.format(i) for i in range(REPORT_NFILES)]
+        def write_reports():
+            CEAMS_edfReports.write_hdr_rep(edf_hdr_list, edf_file_names, tmp_dir, message_win)
+            chan_table = CEAMS_edfReports.build_chan_table(edf_hdr_list, edf_file_names)
+            CEAMS_edfReports.write_chan_count(edf_hdr_list, tmp_dir, message_win, chan_table)
+            CEAMS_edfReports.write_chan_reports(edf_hdr_list, edf_file_names, tmp_dir, \
+                                                message_win, chan_table)
+        sec = _time_call(write_reports)
+        return sec, (REPORT_NFILES/sec, 'files/s')
+    if bench == 'concat_edf_files':
+        sec = _time_call(lambda: CEAMS_edfLib.concat_edf_files([fname, fname_next], \
+                                                               fname_out, message_win))
+        return sec, (2*file_nbytes/sec/1e6, 'MB/s')
+    raise ValueError('unknown benchmark {}'.format(bench))
+
+
+# Internal function to generate the edf (or bdf) files of a size in tmp_dir.
+# Returns (name, fname, fname_next) of each file.
+def _generate_files(size, tmp_dir, bdf=False):
+    bench_files = []
+    ext = '.bdf' if bdf else '.edf'
+    for name, nchan, n_records, mixed in BENCH_SIZES[size]:
+        fname = os.path.join(tmp_dir, name + ext)
+        fname_next = os.path.join(tmp_dir, name + '_next' + ext)
+        edf_synth.write_synthetic_edf(fname, nchan, n_records, mixed=mixed, bdf=bdf)
+        # The next file starts at the end of the first one
+        start_sec = n_records
+        edf_synth.write_synthetic_edf(fname_next, nchan, n_records, mixed=mixed, bdf=bdf, \
+            startdate='{:02d}.01.00'.format(1 + start_sec // 86400), \
+            starttime='{:02d}.{:02d}.{:02d}'.format(start_sec % 86400 // 3600, \
+                                                    start_sec % 3600 // 60, start_sec % 60))
+        bench_files.append((name, fname, fname_next))
+    return bench_files
+
+
+def run_suite(sizes, benches=BENCHES, tmp_dir=None, bdf=False):
+    """Run the benchmarks on the files of each size, each benchmark in a child
+    process.  Returns a dict "file/benchmark" : {sec, throughput, unit,
+    peak_rss_mb, file_mb}."""
+    results = {}
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as bench_dir:
+        for size in sizes:
+            for name, fname, fname_next in _generate_files(size, bench_dir, bdf):
+                file_nbytes = os.path.getsize(fname)
+                for bench in benches:
+                    key = '{}/{}'.format(name, bench)
+                    if bench in ('read_edf_data', 'write_edf_file') and \
+                        file_nbytes > IN_MEMORY_MAX_NBYTES:
+                        print('{:40s} skipped (file larger than {} GB)'.format(\
+                            key, IN_MEMORY_MAX_NBYTES/1024**3))
+                        continue
+                    child = subprocess.run([sys.executable, os.path.abspath(__file__), \
+                        '--child', bench, fname, fname_next, bench_dir], \
+                        capture_output=True, text=True)
+                    if child.returncode != 0:
+                        print('{:40s} FAILED\n{}'.format(key, child.stderr))
+                        continue
+                    result = json.loads(child.stdout.strip().splitlines()[-1])
+                    result['file_mb'] = file_nbytes/1e6
+                    results[key] = result
+                    print('{:40s} {:10.4f} s {:10.1f} {:9s} peak RSS {:8.1f} MB'.format(\
+                        key, result['sec'], result['throughput'], result['unit'], \
+                        result['peak_rss_mb'] or float('nan')))
+    return results
+
+
+def compare_baseline(results, baseline, tolerance=BENCH_TOLERANCE):
+    """Return the regressions of results compared to baseline : the benchmarks
+    slower or using more memory by more than the tolerance (fraction)."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['sec'] > base['sec']*(1 + tolerance):
+            regressions.append('{} : {:.4f} s (baseline {:.4f} s)'.format(\
+                key, result['sec'], base['sec']))
+        if result.get('peak_rss_mb') and base.get('peak_rss_mb') and \
+            result['peak_rss_mb'] > base['peak_rss_mb']*(1 + tolerance):
+            regressions.append('{} : peak RSS {:.1f} MB (baseline {:.1f} MB)'.format(\
+                key, result['peak_rss_mb'], base['peak_rss_mb']))
+    return regressions
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) > 0 and argv[0] == '--child':
+        # Child process : one benchmark, the result is the last line (json)
+        bench, fname, fname_next, bench_dir = argv[1:5]
+        sec, (throughput, unit) = _run_bench(bench, fname, fname_next, bench_dir)
+        print(json.dumps({'sec': sec, 'throughput': throughput, 'unit': unit, \
+                          'peak_rss_mb': _peak_rss_mb()}))
+        return 0
+
+    parser = argparse.ArgumentParser(description='Benchmark suite of CEAMS_edfLib.')
+    parser.add_argument('--sizes', default='small,medium', \
+        help='sizes of files, comma separated among {} (default : small,medium)'.\
+            format(', '.join(BENCH_SIZES)))
+    parser.add_argument('--benches', default=','.join(BENCHES), \
+        help='benchmarks, comma separated (default : all)')
+    parser.add_argument('--tmp-dir', default=None, \
+        help='directory of the synthetic files (default : system temp)')
+    parser.add_argument('--bdf', action='store_true', help='BDF+ files (24-bit samples)')
+    parser.add_argument('--save', default=None, help='save the results as a baseline (json)')
+    parser.add_argument('--compare', default=None, help='baseline to compare to (json)')
+    parser.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE, \
+        help='tolerance of the comparison (default : {})'.format(BENCH_TOLERANCE))
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes.split(','), args.benches.split(','), args.tmp_dir, args.bdf)
+    if args.save is not None:
+        with open(args.save, 'w') as fid:
+            json.dump(results, fid, indent=1, sort_keys=True)
+        print('Baseline is written to {}'.format(args.save))
+    if args.compare is not None:
+        with open(args.compare, 'r') as fid:
+            baseline = json.load(fid)
+        regressions = compare_baseline(results, baseline, args.tolerance)
+        print('{} regressions compared to {}'.format(len(regressions), args.compare))
+        if len(regressions) > 0:
+            print(*regressions, sep="\n")
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
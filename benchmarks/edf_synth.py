@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generator of synthetic EDF+ (or BDF+) files for the benchmarks.
+
+The data records are written by blocks (the memory used does not depend on
+the size of the file), then files of several GB can be generated.  The
+samples are random (seeded) and the last channel is an "EDF Annotations"
+channel with the timekeeping TAL of each data record.
+
+Usage : python benchmarks/edf_synth.py out.edf --nchan 64 --n-records 3600 --mixed
+        python benchmarks/edf_synth.py out.bdf --nchan 64 --n-records 3600 --bdf
+"""
+
+import argparse
+import numpy as np
+
+# Number of samples per data record of the channels of a mixed file (cycled)
+MIXED_NSAMPS = (256, 512, 128, 200, 1, 64)
+# Number of samples per data record of the annotation channel
+ANNOT_NSAMPS = 30
+# Number of bytes of the data records written at once
+SYNTH_BLOCK_NBYTES = 16*1024*1024
+
+
+def synth_n_samps(nchan, n_samps=256, mixed=False):
+    """Return the number of samples per data record of each signal channel
+    (n_samps for all the channels or MIXED_NSAMPS cycled if mixed)."""
+    if mixed:
+        return [MIXED_NSAMPS[ch % len(MIXED_NSAMPS)] for ch in range(nchan)]
+    return [n_samps]*nchan
+
+
+def write_synthetic_edf(fname, nchan, n_records, n_samps=256, mixed=False, \
+                        record_length_sec=1, startdate='01.01.00', starttime='00.00.00', \
+                        seed=0, bdf=False):
+    """Write an EDF+C (or BDF+C) file with nchan signal channels and an 
+    annotation channel.
+
+    Parameters
+    -----------
+    fname : str
+        Path of the edf file written.
+    nchan : int
+        Number of signal channels (the annotation channel is added).
+    n_records : int
+        Number of data records.
+    n_samps : int, optional
+        Number of samples per data record of each channel.
+    mixed : Bool, optional
+        True to cycle the number of samples per data record (MIXED_NSAMPS).
+    record_length_sec : int, optional
+        Duration of a data record in seconds.
+    startdate, starttime : str, optional
+        Start of the recording (dd.mm.yy and hh.mm.ss)
+    bdf : Bool, optional
+        True to write a BDF+C file (24-bit samples).
+
+    Returns
+    -----------
+    n_bytes : int
+        size of the file in bytes
+
+    Usage : write_synthetic_edf('bench.edf', 64, 3600, mixed=True)
+    """
+    samp_nbytes = 3 if bdf else 2
+    file_type = 'BDF' if bdf else 'EDF'
+    ns = synth_n_samps(nchan, n_samps, mixed) + [ANNOT_NSAMPS]
+    labels = ['EEG C{}'.format(ch) for ch in range(nchan)] + [file_type + ' Annotations']
+    n_sig = nchan + 1
+    hdr_fields = [('\xffBIOSEMI' if bdf else '0').ljust(8), 'X X X X'.ljust(80), \
+        'Startdate X X X X'.ljust(80), startdate, starttime, str(256*(n_sig+1)).ljust(8), \
+        (file_type + '+C').ljust(44), str(n_records).ljust(8), \
+        str(record_length_sec).ljust(8), str(n_sig).ljust(4)]
+    hdr_fields.extend([label.ljust(16) for label in labels])
+    hdr_fields.extend(['AgAgCl electrode'.ljust(80)]*nchan + [''.ljust(80)])
+    hdr_fields.extend(['uV'.ljust(8)]*nchan + [''.ljust(8)])
+    hdr_fields.extend(['-500'.ljust(8)]*nchan + ['-1'.ljust(8)])
+    hdr_fields.extend(['500'.ljust(8)]*nchan + ['1'.ljust(8)])
+    hdr_fields.extend([('-8388608' if bdf else '-32768').ljust(8)]*n_sig)
+    hdr_fields.extend([('8388607' if bdf else '32767').ljust(8)]*n_sig)
+    hdr_fields.extend(['HP:0.1Hz LP:75Hz'.ljust(80)]*nchan + [''.ljust(80)])
+    hdr_fields.extend([str(n).ljust(8) for n in ns])
+    hdr_fields.extend([''.ljust(32)]*n_sig)
+
+    n_samps_tot = sum(ns)
+    annot_start = samp_nbytes*(n_samps_tot - ANNOT_NSAMPS)
+    block_nrecords = max(min(SYNTH_BLOCK_NBYTES // (samp_nbytes*n_samps_tot), n_records), 1)
+    rng = np.random.default_rng(seed)
+    # The same random samples are written in each block
+    block = rng.integers(-2000, 2000, size=(block_nrecords, n_samps_tot), dtype='<i4')
+    # Little-endian bytes of each sample (16 or 24 bits)
+    block_bytes = np.ascontiguousarray(block[..., None].view(np.uint8)[..., :samp_nbytes])\
+        .reshape(block_nrecords, -1)
+    with open(fname, 'wb') as fid:
+        fid.write(bytes(''.join(hdr_fields), encoding='latin-1'))
+        for rec_start in range(0, n_records, block_nrecords):
+            n_block = min(block_nrecords, n_records - rec_start)
+            # Timekeeping TAL of each data record
+            block_bytes[:n_block, annot_start:] = 0
+            for rec_i in range(n_block):
+                tal = '+{}\x14\x14\x00'.format((rec_start+rec_i)*record_length_sec).encode()
+                block_bytes[rec_i, annot_start:annot_start+len(tal)] = \
+                    np.frombuffer(tal, dtype=np.uint8)
+            fid.write(block_bytes[:n_block].tobytes())
+        return fid.tell()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic EDF+ file.')
+    parser.add_argument('fname', help='edf file to write')
+    parser.add_argument('--nchan', type=int, default=8, help='number of signal channels')
+    parser.add_argument('--n-records', type=int, default=60, help='number of data records')
+    parser.add_argument('--n-samps', type=int, default=256, \
+        help='number of samples per data record')
+    parser.add_argument('--mixed', action='store_true', \
+        help='mixed number of samples per data record')
+    parser.add_argument('--bdf', action='store_true', help='write a BDF+ file (24-bit)')
+    args = parser.parse_args(argv)
+    n_bytes = write_synthetic_edf(args.fname, args.nchan, args.n_records, \
+                                  args.n_samps, args.mixed, bdf=args.bdf)
+    print('{} is written ({:.1f} MB)'.format(args.fname, n_bytes/1e6))
+
+
+if __name__ == "__main__":
+    main()
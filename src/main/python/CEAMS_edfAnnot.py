@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reader of the EDF+ annotations (channels labelled "EDF Annotations", 
+"BDF Annotations" in a BDF+ file).
+Each data record of an annotation channel contains Time-stamped Annotation
+Lists (TALs) :
+    +onset[\x15duration]\x14text\x14[text\x14...]\x00
+The first TAL of each data record of the first annotation channel is the
+timekeeping TAL : its onset is the start of the data record.
+
+Only the bytes of the annotation channels are read (memory mapped slices of
+each data record with EdfDataMap), the signal bytes are never copied.
+
+The discontinuities of the EDF+D files are found from the timekeeping TALs
+only (the first bytes of each data record).
+
+The texts of the annotations can be scrubbed (de-identification) in place :
+only the bytes of the texts are replaced and only the data records modified
+are written.  The onsets of the TALs can be shifted in place the same way
+(ex. the data records of a file concatenated after another file).
+
+Usage :
+    annotations, record_onsets = read_edf_annotations(your_file.edf, edf_info, message_win)
+    segments = edf_discontinuities(your_file.edf, edf_info, message_win)
+    n_scrubbed = scrub_edf_annotations(your_file.edf, edf_info, message_win)
+    shifted = shift_edf_annotations(your_file.edf, edf_info, 3600, message_win)
+    python CEAMS_edfAnnot.py --gaps /path/to/*.edf
+
+Created on Sun Oct 18 11:02:45 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import argparse
+import CEAMS_edfLib
+import decimal
+import numpy as np
+import sys
+
+# Label of the annotation channels (edf and bdf files)
+ANNOT_LABEL = 'EDF Annotations'
+ANNOT_LABELS = (ANNOT_LABEL, 'BDF Annotations')
+# Separators of the TAL
+TAL_ONSET_SEP = b'\x15'
+TAL_TEXT_SEP = b'\x14'
+# Number of bytes read at the start of each data record to get the onset
+# of the timekeeping TAL
+TK_NBYTES = 32
+# Replacement of each byte of a scrubbed text
+SCRUB_BYTE = ord('X')
+# Number of bytes of the data records scrubbed (or read) at once
+SCRUB_BLOCK_NBYTES = 16*1024*1024
+
+
+def find_annot_chans(edf_info):
+    """Return the index of the annotation channels of the edf header."""
+    return [chan_i for chan_i, label in enumerate(edf_info.get('ch_labels')) \
+            if label.strip() in ANNOT_LABELS]
+
+
+def read_edf_annotations(fname, edf_info, message_win):
+    """Read the annotations of the EDF+ file "fname" and the start of each
+    data record (timekeeping TAL).  Only the annotation channels are read.
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF+ file.
+    edf_info : dict
+        edf info dictionary of the filename 'fname' (read_edf_header)
+
+    Returns
+    -----------
+    annotations : dict of numpy array (one item per annotation)
+        onset : float, onset in seconds from the start of the recording
+        duration : float, duration in seconds (nan if not specified)
+        text : object (str), annotation text
+        record : int, index of the data record of the annotation
+        None if the file has no annotation channel
+    record_onsets : numpy array of float
+        start in seconds of each data record (nan if not found)
+
+    Usage : annotations, record_onsets = read_edf_annotations(your_file.edf, edf_info, message_win)
+    """
+    annot_chans = find_annot_chans(edf_info)
+    if len(annot_chans) == 0:
+        message_win.append('{} has no "{}" channel'.format(fname, ANNOT_LABEL))
+        return None, None
+    onsets = []
+    durations = []
+    texts = []
+    records = []
+    with CEAMS_edfLib.EdfDataMap(fname, edf_info, message_win) as edf_map:
+        record_onsets = np.full(edf_map.n_records, np.nan)
+        for annot_i, chan_i in enumerate(annot_chans):
+            # Copy of the annotation bytes only (n_records x n_bytes)
+            annot_bytes = _read_chan_bytes(edf_map, chan_i)
+            tal_onsets, tal_durations, tal_texts, tal_records, first_in_rec = \
+                _parse_tals(annot_bytes)
+            if annot_i == 0:
+                # Timekeeping TAL : the first TAL of each data record
+                record_onsets[tal_records[first_in_rec]] = tal_onsets[first_in_rec]
+            # One annotation per text of each TAL
+            n_texts = np.array([len(tal_text) for tal_text in tal_texts], dtype=int)
+            onsets.append(np.repeat(tal_onsets, n_texts))
+            durations.append(np.repeat(tal_durations, n_texts))
+            records.append(np.repeat(tal_records, n_texts))
+            texts.extend([text for tal_text in tal_texts for text in tal_text])
+    text_array = np.empty(len(texts), dtype=object)
+    text_array[:] = texts
+    annotations = {'onset': np.concatenate(onsets),
+                   'duration': np.concatenate(durations),
+                   'text': text_array,
+                   'record': np.concatenate(records)}
+    if len(annot_chans) > 1:
+        # Annotations in the order of the data records
+        order = np.argsort(annotations['record'], kind='stable')
+        annotations = {key: val[order] for key, val in annotations.items()}
+    if np.any(np.isnan(record_onsets)):
+        message_win.append('WARNING : the timekeeping TAL is missing in {} data '\
+            'records of {}'.format(int(np.sum(np.isnan(record_onsets))), fname))
+    return annotations, record_onsets
+
+
+# Internal function to copy the bytes of the channel "chan_i" (the first
+# "n_bytes" of each data record if specified).  The data records are mapped
+# by blocks (EdfDataMap.map_records) then the pages of the file read are
+# released after each block.
+def _read_chan_bytes(edf_map, chan_i, n_bytes=None):
+    chan_slice = edf_map.chan_byte_slice(chan_i)
+    if n_bytes is not None:
+        chan_slice = slice(chan_slice.start, min(chan_slice.start + n_bytes, chan_slice.stop))
+    chan_bytes = np.empty((edf_map.n_records, chan_slice.stop - chan_slice.start), \
+                          dtype=np.uint8)
+    block_nrecords = max(SCRUB_BLOCK_NBYTES // max(edf_map.data_bytes.shape[1], 1), 1)
+    for rec_start in range(0, edf_map.n_records, block_nrecords):
+        rec_stop = min(rec_start + block_nrecords, edf_map.n_records)
+        block_bytes = edf_map.map_records(rec_start, rec_stop)
+        chan_bytes[rec_start:rec_stop] = block_bytes[:, chan_slice]
+        del block_bytes
+    return chan_bytes
+
+
+# Internal function to decode the TALs of the annotation bytes
+# (n_records x n_bytes).  The TAL boundaries (20 followed by 0) are found for
+# all the data records at once.
+# Returns the onset, the duration, the list of texts and the data record of
+# each TAL and True for the first TAL of each data record.
+def _parse_tals(annot_bytes):
+    n_records, rec_nbytes = annot_bytes.shape
+    flat = annot_bytes.reshape(-1)
+    if flat.size < 2:
+        tal_ends = np.zeros(0, dtype=int)
+    else:
+        tal_ends = np.flatnonzero((flat[:-1] == 20) & (flat[1:] == 0))
+        # A TAL ends in its data record
+        tal_ends = tal_ends[tal_ends % rec_nbytes != rec_nbytes - 1]
+    tal_records = tal_ends // rec_nbytes
+    first_in_rec = np.ones(len(tal_ends), dtype=bool)
+    first_in_rec[1:] = tal_records[1:] != tal_records[:-1]
+    # A TAL starts after the previous TAL of its data record
+    tal_starts = np.empty_like(tal_ends)
+    tal_starts[1:] = tal_ends[:-1] + 2
+    tal_starts[first_in_rec] = tal_records[first_in_rec] * rec_nbytes
+
+    data = flat.tobytes()
+    onset_strs = []
+    duration_strs = []
+    tal_texts = []
+    for tal_start, tal_end in zip(tal_starts.tolist(), tal_ends.tolist()):
+        tal_parts = data[tal_start:tal_end].lstrip(b'\x00').split(TAL_TEXT_SEP)
+        onset_duration = tal_parts[0].split(TAL_ONSET_SEP)
+        onset_strs.append(onset_duration[0])
+        duration_strs.append(onset_duration[1] if len(onset_duration) > 1 else b'nan')
+        tal_texts.append([text.decode('utf-8', errors='replace') \
+                          for text in tal_parts[1:] if text])
+    return _bytes_to_float(onset_strs), _bytes_to_float(duration_strs), \
+        tal_texts, tal_records, first_in_rec
+
+
+# Internal function to convert a list of ascii numbers (bytes) to a float
+# array, all at once when possible.  An invalid number is nan.
+def _bytes_to_float(num_strs):
+    if len(num_strs) == 0:
+        return np.zeros(0)
+    try:
+        return np.array(num_strs, dtype='S').astype(float)
+    except ValueError:
+        num_vals = np.full(len(num_strs), np.nan)
+        for i, num_str in enumerate(num_strs):
+            try:
+                num_vals[i] = float(num_str)
+            except ValueError:
+                pass
+        return num_vals
+
+
+def read_edf_record_onsets(fname, edf_info, message_win):
+    """Read the start of each data record of the EDF+ file "fname" (onset of
+    the timekeeping TAL).  Only the first bytes of the first annotation
+    channel of each data record are read and all the onsets are converted
+    at once.
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF+ file.
+    edf_info : dict
+        edf info dictionary of the filename 'fname' (read_edf_header)
+
+    Returns
+    -----------
+    record_onsets : numpy array of float
+        start in seconds of each data record (nan if not found), 
+        None if the file has no annotation channel
+
+    Usage : record_onsets = read_edf_record_onsets(your_file.edf, edf_info, message_win)
+    """
+    annot_chans = find_annot_chans(edf_info)
+    if len(annot_chans) == 0:
+        message_win.append('{} has no "{}" channel'.format(fname, ANNOT_LABEL))
+        return None
+    with CEAMS_edfLib.EdfDataMap(fname, edf_info, message_win) as edf_map:
+        # The first bytes of the annotation channel
+        tk_bytes = _read_chan_bytes(edf_map, annot_chans[0], TK_NBYTES)
+    if tk_bytes.shape[0] == 0:
+        return np.zeros(0)
+    # The onset ends at the first separator (20 or 21)
+    is_sep = (tk_bytes == 20) | (tk_bytes == 21)
+    has_sep = np.any(is_sep, axis=1)
+    onset_len = np.where(has_sep, np.argmax(is_sep, axis=1), 0)
+    tk_bytes = np.where(np.arange(tk_bytes.shape[1]) < onset_len[:, None], \
+                        tk_bytes, 0).astype(np.uint8)
+    onset_strs = tk_bytes.view('S{}'.format(tk_bytes.shape[1])).ravel()
+    record_onsets = _bytes_to_float(onset_strs.tolist())
+    record_onsets[~has_sep] = np.nan
+    if np.any(np.isnan(record_onsets)):
+        message_win.append('WARNING : the timekeeping TAL is missing in {} data '\
+            'records of {}'.format(int(np.sum(np.isnan(record_onsets))), fname))
+    return record_onsets
+
+
+def scrub_edf_annotations(fname, edf_info, message_win, keep_texts=()):
+    """Scrub in place the texts of the annotations of the EDF+ file "fname" :
+    each byte of a text is replaced by 'X' (the TALs keep their length and
+    their onsets).  The texts of "keep_texts" (ex. sleep stages) are kept.
+    The annotation channels are memory mapped and processed by blocks of data
+    records, only the data records with a text scrubbed are written.
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF+ file (modified).
+    edf_info : dict
+        edf info dictionary of the filename 'fname' (read_edf_header)
+    keep_texts : iterable of str, optional
+        texts not scrubbed (compared without the padding spaces)
+
+    Returns
+    -----------
+    n_scrubbed : int
+        number of texts scrubbed, None if the file could not be written
+
+    Usage : n_scrubbed = scrub_edf_annotations(your_file.edf, edf_info, message_win)
+    """
+    annot_chans = find_annot_chans(edf_info)
+    n_samps_record = np.array(edf_info.get('n_samps_record'), dtype=int)
+    # Offset in bytes of each channel in the data record
+    chan_offset = CEAMS_edfLib.samp_nbytes(edf_info) * \
+        np.concatenate(([0], np.cumsum(n_samps_record)))
+    n_records = int(edf_info.get('n_records_real'))
+    if len(annot_chans) == 0 or n_records == 0:
+        return 0
+    keep_texts = set(text.strip() for text in keep_texts)
+    try:
+        data_bytes = np.memmap(fname, dtype=np.uint8, mode='r+', \
+            offset=edf_info.get('hdr_nbytes'), shape=(n_records, int(chan_offset[-1])))
+    except (OSError, ValueError):
+        message_win.append('ERROR : {} could not open/write'.format(fname))
+        return None
+    n_scrubbed = 0
+    block_nrecords = max(SCRUB_BLOCK_NBYTES // data_bytes.shape[1], 1)
+    for chan_i in annot_chans:
+        annot_view = data_bytes[:, chan_offset[chan_i]:chan_offset[chan_i+1]]
+        for rec_start in range(0, n_records, block_nrecords):
+            annot_bytes = np.array(annot_view[rec_start:rec_start+block_nrecords])
+            text_mask = _tal_text_mask(annot_bytes)
+            if len(keep_texts) > 0:
+                _keep_texts(annot_bytes, text_mask, keep_texts)
+            # One text is a run of bytes of the mask
+            flat_mask = text_mask.reshape(-1)
+            n_scrubbed += int(np.count_nonzero(flat_mask[1:] & ~flat_mask[:-1])) \
+                + int(flat_mask[:1].sum())
+            scrub_recs = np.flatnonzero(np.any(text_mask, axis=1))
+            if scrub_recs.size > 0:
+                annot_bytes[text_mask] = SCRUB_BYTE
+                annot_view[rec_start+scrub_recs] = annot_bytes[scrub_recs]
+    data_bytes.flush()
+    del data_bytes
+    return n_scrubbed
+
+
+# Internal function to find the bytes of the texts of the TALs in the
+# annotation bytes (n_records x n_bytes) : the bytes after the first 20 of
+# each TAL that are not 20 or 0.  A TAL starts at the start of a data
+# record or after a 0.
+def _tal_text_mask(annot_bytes):
+    flat = annot_bytes.reshape(-1)
+    is_sep = flat == 20
+    sep_count = np.cumsum(is_sep)
+    tal_start = np.zeros(flat.size, dtype=bool)
+    tal_start[::annot_bytes.shape[1]] = True
+    tal_start[1:] |= flat[:-1] == 0
+    # Number of separators before the start of the TAL of each byte
+    sep_base = np.maximum.accumulate(np.where(tal_start, sep_count - is_sep, 0))
+    text_mask = (sep_count - sep_base > 0) & ~is_sep & (flat != 0)
+    return text_mask.reshape(annot_bytes.shape)
+
+
+# Internal function to remove from the mask the texts of "keep_texts".
+def _keep_texts(annot_bytes, text_mask, keep_texts):
+    flat = annot_bytes.reshape(-1)
+    flat_mask = text_mask.reshape(-1)
+    edges = np.diff(np.concatenate(([False], flat_mask, [False])).astype(np.int8))
+    for text_start, text_stop in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        text = flat[text_start:text_stop].tobytes().decode('utf-8', errors='replace')
+        if text.strip() in keep_texts:
+            flat_mask[text_start:text_stop] = False
+
+
+def shift_edf_annotations(fname, edf_info, shift_sec, message_win, rec_start=0, \
+                          rec_stop=None):
+    """Shift in place the onsets of the TALs of the EDF+ file "fname" by
+    "shift_sec" seconds, in the data records "rec_start" to "rec_stop".
+    Only the onsets are written again (added in decimal, the digits are
+    kept), the durations and the texts of the TALs are kept as is.
+    The annotation channels are memory mapped and processed by blocks of
+    data records.
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF+ file (modified).
+    edf_info : dict
+        edf info dictionary of the filename 'fname' (read_edf_header)
+    shift_sec : int or float
+        seconds added to each onset
+    rec_start : int, optional
+        first data record shifted (0 by default)
+    rec_stop : int, optional
+        last data record shifted + 1 (all the data records by default)
+
+    Returns
+    -----------
+    shifted : Bool, True if the onsets are shifted False otherwise (the file
+        could not be written, an onset could not be read or the TALs shifted
+        do not fit in their data record)
+
+    Usage : shifted = shift_edf_annotations(your_file.edf, edf_info, 3600, message_win)
+    """
+    annot_chans = find_annot_chans(edf_info)
+    n_samps_record = np.array(edf_info.get('n_samps_record'), dtype=int)
+    # Offset in bytes of each channel in the data record
+    chan_offset = CEAMS_edfLib.samp_nbytes(edf_info) * \
+        np.concatenate(([0], np.cumsum(n_samps_record)))
+    n_records = int(edf_info.get('n_records_real'))
+    rec_stop = n_records if rec_stop is None else min(rec_stop, n_records)
+    if len(annot_chans) == 0 or rec_start >= rec_stop or shift_sec == 0:
+        return True
+    shift = decimal.Decimal(str(shift_sec))
+    try:
+        data_bytes = np.memmap(fname, dtype=np.uint8, mode='r+', \
+            offset=edf_info.get('hdr_nbytes'), shape=(n_records, int(chan_offset[-1])))
+    except (OSError, ValueError):
+        message_win.append('ERROR : {} could not open/write'.format(fname))
+        return False
+    shifted = True
+    block_nrecords = max(SCRUB_BLOCK_NBYTES // data_bytes.shape[1], 1)
+    for chan_i in annot_chans:
+        annot_view = data_bytes[:, chan_offset[chan_i]:chan_offset[chan_i+1]]
+        for block_start in range(rec_start, rec_stop, block_nrecords):
+            block_stop = min(block_start + block_nrecords, rec_stop)
+            annot_bytes = np.array(annot_view[block_start:block_stop])
+            for rec_i, rec_bytes in enumerate(annot_bytes):
+                try:
+                    tal_bytes = _shift_tal_onsets(rec_bytes.tobytes(), shift)
+                except decimal.InvalidOperation:
+                    message_win.append('ERROR : an onset of the data record {} of {} '\
+                        'can not be read'.format(block_start + rec_i, fname))
+                    shifted = False
+                    break
+                if len(tal_bytes) > annot_bytes.shape[1]:
+                    message_win.append('ERROR : the TALs of the data record {} of {} '\
+                        'shifted by {} s do not fit in {} bytes'.format(\
+                            block_start + rec_i, fname, shift_sec, annot_bytes.shape[1]))
+                    shifted = False
+                    break
+                rec_bytes[:] = 0
+                rec_bytes[:len(tal_bytes)] = np.frombuffer(tal_bytes, dtype=np.uint8)
+            if not shifted:
+                break
+            annot_view[block_start:block_stop] = annot_bytes
+        if not shifted:
+            break
+    data_bytes.flush()
+    del data_bytes
+    return shifted
+
+
+# Internal function to shift the onset of each TAL of the bytes of a data
+# record "rec_bytes" by "shift" (Decimal).  A TAL ends with 20 followed by 0,
+# the padding after the last TAL is removed.
+# Returns the TALs shifted (bytes), raises decimal.InvalidOperation if an
+# onset can not be read.
+def _shift_tal_onsets(rec_bytes, shift):
+    tals = []
+    tal_start = 0
+    tal_end = rec_bytes.find(TAL_TEXT_SEP + b'\x00')
+    while tal_end >= 0:
+        tal = rec_bytes[tal_start:tal_end+2].lstrip(b'\x00')
+        # The onset ends at the first separator (20 or 21)
+        onset_end = min(sep_i for sep_i in (tal.find(TAL_ONSET_SEP), tal.find(TAL_TEXT_SEP)) \
+                        if sep_i >= 0)
+        onset = decimal.Decimal(tal[:onset_end].decode('ascii', errors='replace')) + shift
+        onset_str = format(onset, 'f')
+        if not onset_str.startswith('-'):
+            onset_str = '+' + onset_str
+        tals.append(onset_str.encode('ascii') + tal[onset_end:])
+        tal_start = tal_end + 2
+        tal_end = rec_bytes.find(TAL_TEXT_SEP + b'\x00', tal_start)
+    return b''.join(tals)
+
+
+def find_edf_discontinuities(record_onsets, record_length_sec, tolerance_sec=None):
+    """Find the discontinuities (gaps) between the data records and return
+    the continuous segments of the recording.
+
+    Parameters
+    -----------
+    record_onsets : numpy array of float
+        start in seconds of each data record (read_edf_record_onsets)
+    record_length_sec : float
+        duration of a data record in seconds
+    tolerance_sec : float, optional
+        a gap shorter than tolerance_sec is ignored 
+        (1 ms or 1/1000 of a data record by default)
+
+    Returns
+    -----------
+    segments : dict of numpy array (one item per continuous segment)
+        rec_start : int, first data record of the segment
+        rec_stop : int, last data record of the segment + 1
+        onset : float, start of the segment in seconds
+        duration : float, duration of the segment in seconds
+        gap_before : float, gap in seconds before the segment (0 for the first)
+    The data records without a timekeeping TAL (nan) are kept in the segment
+    of the previous data record.
+
+    Usage : segments = find_edf_discontinuities(record_onsets, edf_info['record_length_sec'])
+    """
+    if tolerance_sec is None:
+        tolerance_sec = max(1e-3, record_length_sec / 1000)
+    record_onsets = np.asarray(record_onsets, dtype=float)
+    n_records = len(record_onsets)
+    if n_records == 0:
+        return {'rec_start': np.zeros(0, dtype=int), 'rec_stop': np.zeros(0, dtype=int),\
+                'onset': np.zeros(0), 'duration': np.zeros(0), 'gap_before': np.zeros(0)}
+    # Records with an onset, the gap is computed from the previous record with an onset
+    valid = np.flatnonzero(~np.isnan(record_onsets))
+    gaps = np.diff(record_onsets[valid]) - np.diff(valid) * record_length_sec
+    breaks = np.flatnonzero(np.abs(gaps) > tolerance_sec)
+    rec_start = np.concatenate(([0], valid[breaks + 1])).astype(int)
+    rec_stop = np.concatenate((rec_start[1:], [n_records])).astype(int)
+    onset = np.full(len(rec_start), np.nan)
+    if len(valid) > 0:
+        onset[1:] = record_onsets[rec_start[1:]]
+        # The first segment starts at the first onset (shifted for the records before)
+        onset[0] = record_onsets[valid[0]] - valid[0] * record_length_sec
+    return {'rec_start': rec_start, 'rec_stop': rec_stop, 'onset': onset, 
+            'duration': (rec_stop - rec_start) * record_length_sec,
+            'gap_before': np.concatenate(([0.0], gaps[breaks]))}
+
+
+def edf_discontinuities(fname, edf_info, message_win):
+    """Return the continuous segments (find_edf_discontinuities) of the EDF+ 
+    file "fname" from the timekeeping TAL of each data record.
+    An EDF or EDF+C file is a single segment.
+
+    Usage : segments = edf_discontinuities(your_file.edf, edf_info, message_win)
+    """
+    if not edf_info.get('comment_44rsv').startswith('EDF+D'):
+        record_onsets = np.arange(edf_info.get('n_records_real')) * \
+            edf_info.get('record_length_sec')
+    else:
+        record_onsets = read_edf_record_onsets(fname, edf_info, message_win)
+        if record_onsets is None:
+            return None
+    return find_edf_discontinuities(record_onsets, edf_info.get('record_length_sec'))
+
+
+def find_record(record_onsets, time_sec):
+    """Return the index of the data record including the time "time_sec"
+    (in seconds from the start of the recording), time_sec can be an array.
+    The records onsets must be sorted (read_edf_annotations).
+
+    Usage : rec_i = find_record(record_onsets, 3600)
+    """
+    return np.searchsorted(record_onsets, time_sec, side='right') - 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List the annotations of '\
+        'an EDF+ file (onset, duration, text) or the continuous segments of '\
+        'EDF+ files (--gaps).')
+    parser.add_argument('fnames', nargs='+', help='EDF+ files')
+    parser.add_argument('--gaps', action='store_true', \
+        help='list the continuous segments of each file (file, rec_start, '\
+            'rec_stop, onset, duration, gap_before)')
+    args = parser.parse_args(argv)
+    message_win = []
+    exit_code = 0
+    if args.gaps:
+        print('filename,rec_start,rec_stop,onset,duration,gap_before')
+    for fname in args.fnames:
+        edf_info = CEAMS_edfLib.read_edf_header(fname, message_win)
+        if edf_info is None:
+            exit_code = 1
+            continue
+        if args.gaps:
+            segments = edf_discontinuities(fname, edf_info, message_win)
+            if segments is None:
+                exit_code = 1
+                continue
+            for seg_i in range(len(segments['rec_start'])):
+                print('"{}",{},{},{},{},{}'.format(fname, segments['rec_start'][seg_i], \
+                    segments['rec_stop'][seg_i], segments['onset'][seg_i], \
+                    segments['duration'][seg_i], segments['gap_before'][seg_i]))
+            continue
+        annotations, record_onsets = read_edf_annotations(fname, edf_info, message_win)
+        if annotations is None:
+            exit_code = 1
+            continue
+        print('onset,duration,text')
+        for onset, duration, text in zip(annotations['onset'], \
+                                         annotations['duration'], annotations['text']):
+            print('{},{},"{}"'.format(onset, '' if np.isnan(duration) else duration, \
+                                      text.replace('"', '""')))
+    if exit_code != 0:
+        print(*[message for message in message_win if not message.startswith('...')], \
+              sep="\n", file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
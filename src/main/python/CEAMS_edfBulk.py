@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk edit of the edf headers (without the GUI).
+The rules of a rule file (json) are applied to the header of many edf files.
+Each rule is validated once with the checks of CEAMS_edfLib (modify_edf_header
+and check_chan_texts), then the headers are read, modified and patched in place
+(patch_edf_hdr) in a pool of processes.  With --dry-run no file is written.
+The modifications (done or to do) are written in the diff report :
+    -Bulk Edit Report : edfBulkRep.csv (filename, field, channel, old, new, written)
+
+Rule file :
+    {"rules": [
+        {"field": "patient_id", "set": "X X X X"},
+        {"field": "ch_labels", "map": {"EEG Fpz-Cz": "Fpz-Cz", "EEG Pz-Oz": "Pz-Oz"}},
+        {"field": "prefiltering", "set": "HP:0.3Hz LP:35Hz", "labels": ["Fpz-Cz"]}
+    ]}
+    "set" : new value of the field (of each channel for the channel fields),
+        -1 is the default value of modify_edf_header (ex. "X X X X")
+    "map" : new value of each old value (channel fields only)
+    "labels" : the channels modified (channel fields only, all by default)
+The values and the labels are compared without the padding spaces.
+The rules are applied in the order of the file and the annotation channels
+("EDF Annotations" or "BDF Annotations") are never modified.
+
+Usage : python CEAMS_edfBulk.py rules.json /path/to/archive -o /path/to/reports --dry-run
+
+Created on Sun Oct 18 15:02:44 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import argparse
+import CEAMS_edfAnnot
+import CEAMS_edfLib
+import CEAMS_edfLog
+import CEAMS_edfReports
+import CEAMS_edfScan
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import sys
+
+# Fields of the file that can be modified by a rule ("set" only)
+FILE_RULE_FIELDS = ('patient_id', 'rec_id', 'startdate', 'starttime', 'comment_44rsv')
+# Fields of the channels that can be modified by a rule ("set" or "map")
+CHAN_RULE_FIELDS = ('ch_labels', 'transducer', 'units', 'prefiltering')
+# Number of files sent at once to a worker
+BULK_CHUNKSIZE = 16
+
+
+def read_rules(rules_fname, message_win):
+    """Read and validate the rules of the rule file "rules_fname" (json).
+
+    Parameters
+    -----------
+    rules_fname : str
+        Path to the rule file.
+
+    Returns
+    -----------
+    rules : list of dict or None
+        the rules validated, None if the file can not be read or if a rule
+        is not valid (no rule is applied)
+
+    Usage : rules = read_rules('rules.json', message_win)
+    """
+    try:
+        with open(rules_fname, 'r', encoding='utf-8') as fid:
+            rules = json.load(fid).get('rules')
+    except (OSError, ValueError, AttributeError) as err:
+        message_win.append('ERROR : {} could not be read ({})'.format(rules_fname, err))
+        return None
+    if not isinstance(rules, list):
+        message_win.append('ERROR : {} has no list of "rules"'.format(rules_fname))
+        return None
+    rules_valid = [validate_rule(rule, message_win) for rule in rules]
+    if not all(rules_valid):
+        message_win.append('ERROR : {} rules of {} are not valid, no file is '\
+            'modified'.format(rules_valid.count(False), rules_fname))
+        return None
+    return rules
+
+
+def validate_rule(rule, message_win):
+    """Validate the rule "rule" with the checks of CEAMS_edfLib.  The value -1
+    is replaced by the default value of the field in the rule.
+
+    Parameters
+    -----------
+    rule : dict
+        {"field": ..., "set": ...} or {"field": ..., "map": {...}}
+        with "labels" optional for the channel fields
+
+    Returns
+    -----------
+    rule_valid : Bool, True if the rule can be applied
+
+    Usage : rule_valid = validate_rule({'field': 'patient_id', 'set': 'X X X X'}, message_win)
+    """
+    field = rule.get('field') if isinstance(rule, dict) else None
+    if field not in FILE_RULE_FIELDS and field not in CHAN_RULE_FIELDS:
+        message_win.append('ERROR : the rule {} does not modify a field among {}'.\
+            format(rule, ', '.join(FILE_RULE_FIELDS + CHAN_RULE_FIELDS)))
+        return False
+    if ('set' in rule) == ('map' in rule):
+        message_win.append('ERROR : the rule {} needs "set" or "map"'.format(rule))
+        return False
+    if 'set' in rule:
+        rule['set'] = str(rule['set'])
+
+    # The fields of the file are validated by modify_edf_header
+    #   on an empty header (no other field is used)
+    if field in FILE_RULE_FIELDS:
+        if 'set' not in rule or 'labels' in rule:
+            message_win.append('ERROR : the rule {} can only "set" the {}'.\
+                format(rule, field))
+            return False
+        edf_info = CEAMS_edfLib.EdfHeader()
+        if not CEAMS_edfLib.modify_edf_header(edf_info, field, rule['set'], message_win):
+            return False
+        rule['set'] = edf_info[field]
+        return True
+
+    # The new values of the fields of the channels are checked by
+    #   check_chan_texts, as in _modify_text
+    if 'labels' in rule and not (isinstance(rule['labels'], list) and \
+        all(isinstance(label, str) for label in rule['labels'])):
+        message_win.append('ERROR : the "labels" of the rule {} must be a list '\
+            'of labels'.format(rule))
+        return False
+    if 'set' in rule:
+        if rule['set'] == '-1' and field != 'ch_labels':
+            rule['set'] = ''
+        old_vals = []
+        new_vals = [rule['set']]
+    else:
+        if not isinstance(rule['map'], dict):
+            message_win.append('ERROR : the "map" of the rule {} must be '\
+                '{{"old value": "new value"}}'.format(rule))
+            return False
+        old_vals = list(rule['map'])
+        new_vals = [str(new_val) for new_val in rule['map'].values()]
+        rule['map'] = {old_val.strip(): new_val for old_val, new_val in \
+                       zip(old_vals, new_vals)}
+    if field == 'ch_labels' and any(val.strip() in CEAMS_edfAnnot.ANNOT_LABELS \
+                                    for val in old_vals + new_vals):
+        message_win.append('ERROR : the rule {} modifies an annotation channel ({})'.\
+            format(rule, ', '.join(CEAMS_edfAnnot.ANNOT_LABELS)))
+        return False
+    return all(CEAMS_edfLib.check_chan_texts(new_vals, field, message_win))
+
+
+def apply_rules(edf_info, rules):
+    """Apply the rules (validated) to the edf header "edf_info" (in place).
+
+    Parameters
+    -----------
+    edf_info : dict
+        edf header (read_edf_header)
+    rules : list of dict
+        rules validated by validate_rule
+
+    Returns
+    -----------
+    changes : list of (str, str, str, str)
+        field, channel label ('' for the fields of the file), old value and
+        new value of each modification
+
+    Usage : changes = apply_rules(edf_info, rules)
+    """
+    changes = []
+    annot_chans = CEAMS_edfAnnot.find_annot_chans(edf_info)
+    for rule in rules:
+        field = rule['field']
+        if field in FILE_RULE_FIELDS:
+            old_val = edf_info.get(field)
+            if old_val.rstrip() != rule['set'].rstrip():
+                changes.append((field, '', old_val.strip(), rule['set']))
+                edf_info[field] = rule['set']
+            continue
+        ch_labels = [label.strip() for label in edf_info.get('ch_labels')]
+        chan_vals = list(edf_info.get(field))
+        n_changes = len(changes)
+        for chan_i, chan_val in enumerate(chan_vals):
+            if chan_i in annot_chans or ('labels' in rule and \
+                ch_labels[chan_i] not in rule['labels']):
+                continue
+            if 'set' in rule:
+                new_val = rule['set']
+            else:
+                new_val = rule['map'].get(chan_val.strip())
+            if new_val is not None and chan_val.rstrip() != new_val.rstrip():
+                changes.append((field, ch_labels[chan_i], chan_val.strip(), new_val))
+                chan_vals[chan_i] = new_val
+        if len(changes) > n_changes:
+            edf_info[field] = chan_vals
+    return changes
+
+
+# Internal function run by the workers : apply the rules to one edf file.
+# Returns (fname, changes, written, messages), the messages are an EdfLog.
+def _bulk_edit_file(fname, rules, dry_run, log_level=CEAMS_edfLog.DEBUG, trace=False):
+    message_win = CEAMS_edfLog.EdfLog(log_level, trace)
+    try:
+        edf_info = CEAMS_edfLib.read_edf_header(fname, message_win)
+    except (Exception, SystemExit) as err:
+        edf_info = None
+        message_win.append('ERROR : {} could not be read ({})'.format(fname, err))
+    if edf_info is None:
+        return fname, [], False, message_win
+    changes = apply_rules(edf_info, rules)
+    written = False
+    if len(changes) > 0 and not dry_run:
+        written = CEAMS_edfLib.patch_edf_hdr(fname, edf_info, message_win)
+    return fname, changes, written, message_win
+
+
+def bulk_edit(edf_files, rules, message_win, dry_run=False, n_workers=None):
+    """Apply the rules to the header of each edf file in a pool of processes,
+    the headers modified are patched in place (except with dry_run).
+
+    Parameters
+    -----------
+    edf_files : list of str
+        Path of the edf files.
+    rules : list of dict
+        rules validated (read_rules)
+    dry_run : Bool, optional
+        True to list the modifications without writing the files.
+    n_workers : int, optional
+        Number of processes (number of CPUs by default).
+
+    Returns
+    -----------
+    bulk_changes : list of (str, str, str, str, str, Bool)
+        filename, field, channel, old value, new value and written for each
+        modification
+    failures : list of str
+        Path of each edf file that could not be read or written
+
+    Usage : bulk_changes, failures = bulk_edit(edf_files, rules, message_win, dry_run=True)
+    """
+    bulk_changes = []
+    failures = []
+    # The workers keep the messages of the level of message_win (EdfLog)
+    log_level = getattr(message_win, 'level', CEAMS_edfLog.DEBUG)
+    trace = getattr(message_win, 'trace', False)
+    n_files = len(edf_files)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for fname, changes, written, file_messages in executor.map(_bulk_edit_file, \
+            edf_files, [rules]*n_files, [dry_run]*n_files, [log_level]*n_files, \
+                [trace]*n_files, chunksize=BULK_CHUNKSIZE):
+            message_win.extend(file_messages)
+            if any(message.startswith('ERROR') for message in file_messages) or \
+                (len(changes) > 0 and not dry_run and not written):
+                failures.append(fname)
+            bulk_changes.extend([(fname,) + change + (written,) for change in changes])
+    return bulk_changes, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply the rules of a rule file '\
+        'to the edf headers of files and directory trees.')
+    parser.add_argument('rules', help='rule file (json)')
+    parser.add_argument('paths', nargs='+', \
+        help='edf files or directories (scanned recursively)')
+    parser.add_argument('-o', '--output', required=True, \
+        help='directory to save the diff report')
+    parser.add_argument('-j', '--workers', type=int, default=None, \
+        help='number of processes (default : number of CPUs)')
+    parser.add_argument('--dry-run', action='store_true', \
+        help='write the diff report without modifying the files')
+    parser.add_argument('-v', '--verbose', action='store_true', \
+        help='print all the messages')
+    parser.add_argument('--profile', action='store_true', \
+        help='print the time spent in each phase (open, parse, validate, write)')
+    parser.add_argument('--trace', default=None, \
+        help='write the spans of each phase in a trace file (json)')
+    args = parser.parse_args(argv)
+
+    message_win = CEAMS_edfLog.EdfLog(CEAMS_edfLog.DEBUG if args.verbose else \
+                                      CEAMS_edfLog.INFO, args.trace is not None)
+    rules = read_rules(args.rules, message_win)
+    if rules is None:
+        print(*message_win, sep="\n", file=sys.stderr)
+        return 2
+    edf_files = [path for path in args.paths if os.path.isfile(path)] + \
+        CEAMS_edfScan.find_edf_files([path for path in args.paths if os.path.isdir(path)])
+    print('{} rules are applied to {} edf files{}'.format(len(rules), len(edf_files), \
+        ' (dry run)' if args.dry_run else ''))
+    bulk_changes, failures = bulk_edit(edf_files, rules, message_win, args.dry_run, \
+                                       args.workers)
+    n_files = len(set(change[0] for change in bulk_changes))
+    print('{} modifications in {} files, {} failures'.format(len(bulk_changes), \
+        n_files, len(failures)))
+
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    CEAMS_edfReports.write_bulk_rep(bulk_changes, args.output, message_win)
+    if args.verbose:
+        print(*message_win, sep="\n")
+    else:
+        print(*[message for message in message_win if 'written to' in message \
+                or message.startswith('ERROR')], sep="\n")
+    if args.profile:
+        print(*message_win.format_counters(), sep="\n")
+    if args.trace is not None:
+        message_win.write_trace(args.trace)
+        print('Trace is written to {}'.format(args.trace))
+    return 0 if len(failures) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
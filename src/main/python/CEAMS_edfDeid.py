@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+De-identification of edf files (without the GUI).
+For each edf file (modified in place) :
+    -patient_id is "X X X X" and rec_id is "Startdate X X X X"
+    -startdate and starttime are shifted by shift_sec (optional)
+    -the texts of the EDF+ annotations are scrubbed (optional, only the
+     bytes of the texts are written, see CEAMS_edfAnnot.scrub_edf_annotations)
+The files are processed in a pool of processes.  Each file is logged in the
+audit log (json lines) when it is started and when it is done or failed,
+the audit log does not include any value of the headers or annotations.
+The files already done are skipped when the de-identification is run again
+with the same audit log (resume).  A file started and never finished may
+have been modified : it is reported and not processed again.
+
+Usage : python CEAMS_edfDeid.py /path/to/archive -a deidAudit.jsonl --shift-days -365 --scrub-annotations
+
+Created on Sun Oct 18 16:20:13 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import argparse
+import CEAMS_edfAnnot
+import CEAMS_edfLib
+import CEAMS_edfLog
+import CEAMS_edfScan
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import json
+import os
+import sys
+
+# Number of files sent at once to a worker
+DEID_CHUNKSIZE = 4
+# Years that can be written in the startdate (clipping date of the edf specification)
+EDF_YEAR_MIN = 1985
+EDF_YEAR_MAX = 2084
+
+
+def shift_start(edf_info, shift_sec):
+    """Return the startdate and the starttime of the edf header shifted by
+    "shift_sec" seconds.
+
+    Parameters
+    -----------
+    edf_info : dict
+        edf info dictionary (read_edf_header)
+    shift_sec : float
+        shift in seconds (negative to move the recording back in time)
+
+    Returns
+    -----------
+    (startdate, starttime) : (str, str)
+        dd.mm.yy and hh.mm.ss, None if the start can not be read or if the
+        start shifted is out of the edf dates (1985-2084)
+
+    Usage : startdate, starttime = shift_start(edf_info, -86400*365)
+    """
+    start = CEAMS_edfLib.edf_start_datetime(edf_info)
+    if start is None:
+        return None
+    try:
+        start = start + datetime.timedelta(seconds=round(shift_sec))
+    except OverflowError:
+        return None
+    if start.year < EDF_YEAR_MIN or start.year > EDF_YEAR_MAX:
+        return None
+    return start.strftime('%d.%m.%y'), start.strftime('%H.%M.%S')
+
+
+def deid_edf_file(fname, message_win, shift_sec=0, scrub_annotations=False, \
+                  keep_texts=()):
+    """De-identify in place the edf file "fname".  The annotations are
+    scrubbed before the header is patched (the header is written last).
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF or EDF+ file (modified).
+    shift_sec : float, optional
+        shift of the startdate and starttime in seconds.
+    scrub_annotations : Bool, optional
+        True to scrub the texts of the annotations.
+    keep_texts : iterable of str, optional
+        texts of the annotations not scrubbed (ex. sleep stages)
+
+    Returns
+    -----------
+    audit : dict
+        status ('done' or 'failed'), fields (names of the fields modified),
+        n_texts_scrubbed and error (no value of the file)
+
+    Usage : audit = deid_edf_file(your_file.edf, message_win, shift_sec=-86400)
+    """
+    audit = {'status': 'failed', 'fields': [], 'n_texts_scrubbed': 0, 'error': ''}
+    try:
+        edf_info = CEAMS_edfLib.read_edf_header(fname, message_win)
+    except (Exception, SystemExit):
+        edf_info = None
+    if edf_info is None:
+        audit['error'] = 'header could not be read'
+        return audit
+    hdr_vals = {}
+    if shift_sec != 0:
+        start_shifted = shift_start(edf_info, shift_sec)
+        if start_shifted is None:
+            audit['error'] = 'start could not be shifted'
+            return audit
+        hdr_vals['startdate'], hdr_vals['starttime'] = start_shifted
+
+    if scrub_annotations:
+        n_scrubbed = CEAMS_edfAnnot.scrub_edf_annotations(fname, edf_info, \
+                                                          message_win, keep_texts)
+        if n_scrubbed is None:
+            audit['error'] = 'annotations could not be written'
+            return audit
+        audit['n_texts_scrubbed'] = n_scrubbed
+
+    # patient_id and rec_id are reset to the default values of modify_edf_header
+    for field in ('patient_id', 'rec_id'):
+        field_val = edf_info.get(field)
+        CEAMS_edfLib.modify_edf_header(edf_info, field, '-1', message_win)
+        if edf_info.get(field).rstrip() != field_val.rstrip():
+            audit['fields'].append(field)
+    for field, field_val in hdr_vals.items():
+        if edf_info.get(field) != field_val:
+            edf_info[field] = field_val
+            audit['fields'].append(field)
+    if len(audit['fields']) > 0 and not CEAMS_edfLib.patch_edf_hdr(fname, edf_info, \
+                                                                   message_win):
+        audit['error'] = 'header could not be written'
+        return audit
+    audit['status'] = 'done'
+    return audit
+
+
+def read_audit_log(audit_fname):
+    """Return the last status of each file of the audit log "audit_fname"
+    (dict of absolute path : status), empty if the log does not exist."""
+    file_status = {}
+    if not os.path.exists(audit_fname):
+        return file_status
+    with open(audit_fname, 'r', encoding='utf-8') as fid:
+        for line in fid:
+            try:
+                audit = json.loads(line)
+                file_status[audit['file']] = audit['status']
+            except (ValueError, KeyError, TypeError):
+                # Last line not finished (interrupted)
+                continue
+    return file_status
+
+
+# Internal function to append one line to the audit log.  Each line is
+# written with a single write in append mode (the workers share the log).
+def _append_audit(audit_fname, audit):
+    line = json.dumps(audit) + '\n'
+    fid = os.open(audit_fname, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fid, line.encode('utf-8'))
+    finally:
+        os.close(fid)
+
+
+# Internal function run by the workers : de-identify one edf file and log it.
+# Returns (fname, audit, messages), the messages are an EdfLog.
+def _deid_edf_file(fname, audit_fname, shift_sec, scrub_annotations, keep_texts, \
+                   log_level=CEAMS_edfLog.DEBUG, trace=False):
+    message_win = CEAMS_edfLog.EdfLog(log_level, trace)
+    _append_audit(audit_fname, {'file': fname, 'status': 'started', \
+        'time': datetime.datetime.now().isoformat(timespec='seconds')})
+    audit = deid_edf_file(fname, message_win, shift_sec, scrub_annotations, keep_texts)
+    audit = dict({'file': fname}, **audit)
+    audit['shift_sec'] = shift_sec
+    audit['time'] = datetime.datetime.now().isoformat(timespec='seconds')
+    _append_audit(audit_fname, audit)
+    return fname, audit, message_win
+
+
+def deid_edf_files(edf_files, audit_fname, message_win, shift_sec=0, \
+                   scrub_annotations=False, keep_texts=(), n_workers=None):
+    """De-identify in place the edf files in a pool of processes.  The files
+    done in the audit log are skipped (resume), the files started and not
+    finished are reported and skipped.
+
+    Parameters
+    -----------
+    edf_files : list of str
+        Path of the edf files.
+    audit_fname : str
+        Path of the audit log (json lines), created if needed.
+    shift_sec, scrub_annotations, keep_texts :
+        see deid_edf_file
+    n_workers : int, optional
+        Number of processes (number of CPUs by default).
+
+    Returns
+    -----------
+    audits : list of dict
+        audit of each file processed
+    skipped : dict
+        'done' : files already done, 'started' : files started and not finished
+
+    Usage : audits, skipped = deid_edf_files(edf_files, 'deidAudit.jsonl', message_win)
+    """
+    file_status = read_audit_log(audit_fname)
+    edf_files = [os.path.abspath(fname) for fname in edf_files]
+    skipped = {'done': [], 'started': []}
+    files_to_deid = []
+    for fname in edf_files:
+        if file_status.get(fname) in skipped:
+            skipped[file_status[fname]].append(fname)
+        else:
+            files_to_deid.append(fname)
+    for fname in skipped['started']:
+        message_win.append('ERROR : {} was started and not finished, it may be '\
+            'partially de-identified (not processed again)'.format(fname))
+
+    audits = []
+    n_files = len(files_to_deid)
+    # The workers keep the messages of the level of message_win (EdfLog)
+    log_level = getattr(message_win, 'level', CEAMS_edfLog.DEBUG)
+    trace = getattr(message_win, 'trace', False)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for fname, audit, file_messages in executor.map(_deid_edf_file, \
+            files_to_deid, [audit_fname]*n_files, [shift_sec]*n_files, \
+                [scrub_annotations]*n_files, [tuple(keep_texts)]*n_files, \
+                    [log_level]*n_files, [trace]*n_files, chunksize=DEID_CHUNKSIZE):
+            message_win.extend(file_messages)
+            if audit['status'] != 'done':
+                message_win.append('ERROR : {} {}'.format(fname, audit['error']))
+            audits.append(audit)
+    return audits, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='De-identify in place the edf '\
+        'files of files and directory trees (patient_id, rec_id, start and '\
+        'annotations).')
+    parser.add_argument('paths', nargs='+', \
+        help='edf files or directories (scanned recursively)')
+    parser.add_argument('-a', '--audit', required=True, \
+        help='audit log (json lines), the files already done are skipped')
+    parser.add_argument('-j', '--workers', type=int, default=None, \
+        help='number of processes (default : number of CPUs)')
+    parser.add_argument('--shift-days', type=float, default=0, \
+        help='shift of the startdate and starttime in days')
+    parser.add_argument('--shift-sec', type=float, default=0, \
+        help='shift of the startdate and starttime in seconds (added to --shift-days)')
+    parser.add_argument('--scrub-annotations', action='store_true', \
+        help='scrub the texts of the EDF+ annotations')
+    parser.add_argument('--keep-texts', default=None, \
+        help='file of the annotation texts not scrubbed (one text per line)')
+    parser.add_argument('-v', '--verbose', action='store_true', \
+        help='print all the messages')
+    parser.add_argument('--profile', action='store_true', \
+        help='print the time spent in each phase (open, parse, validate, write)')
+    parser.add_argument('--trace', default=None, \
+        help='write the spans of each phase in a trace file (json)')
+    args = parser.parse_args(argv)
+
+    message_win = CEAMS_edfLog.EdfLog(CEAMS_edfLog.DEBUG if args.verbose else \
+                                      CEAMS_edfLog.INFO, args.trace is not None)
+    keep_texts = []
+    if args.keep_texts is not None:
+        with open(args.keep_texts, 'r', encoding='utf-8') as fid:
+            keep_texts = [line.strip() for line in fid if line.strip()]
+    edf_files = [path for path in args.paths if os.path.isfile(path)] + \
+        CEAMS_edfScan.find_edf_files([path for path in args.paths if os.path.isdir(path)])
+    shift_sec = args.shift_days*86400 + args.shift_sec
+    audits, skipped = deid_edf_files(edf_files, args.audit, message_win, shift_sec, \
+        args.scrub_annotations, keep_texts, args.workers)
+    n_failed = sum(audit['status'] != 'done' for audit in audits)
+    print('{} edf files de-identified, {} failures, {} already done, {} not '\
+        'finished'.format(len(audits) - n_failed, n_failed, len(skipped['done']), \
+                          len(skipped['started'])))
+    if args.verbose:
+        print(*message_win, sep="\n")
+    else:
+        print(*[message for message in message_win if message.startswith('ERROR')], \
+              sep="\n")
+    if args.profile:
+        print(*message_win.format_counters(), sep="\n")
+    if args.trace is not None:
+        message_win.write_trace(args.trace)
+        print('Trace is written to {}'.format(args.trace))
+    return 0 if n_failed == 0 and len(skipped['started']) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
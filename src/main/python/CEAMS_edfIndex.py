@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent index (cache) of the edf headers read with read_edf_header.
+The index is a SQLite file, each header is saved with the absolute path,
+the size and the modification time of its edf file.  A header is read again
+from the edf file when the file is modified (size or mtime changed).
+The least recently used headers are removed when the index has more than
+"max_entries" headers.
+
+Usage :
+    hdr_index = EdfHdrIndex(default_index_fname())
+    edf_info = read_edf_header_cached(your_file.edf, message_win, hdr_index)
+    hdr_index.close()
+
+Created on Sat Oct 17 13:21:40 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import CEAMS_edfLib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Version of the index, the index is cleared when the version changes
+INDEX_VERSION = 3
+# Maximum number of headers in the index
+INDEX_MAX_ENTRIES = 200000
+
+
+def default_index_fname():
+    """Return the path of the index used by default
+    (~/.EdfHdr_RW/edfHdrIndex.sqlite)."""
+    return os.path.join(os.path.expanduser('~'), '.EdfHdr_RW', 'edfHdrIndex.sqlite')
+
+
+class EdfHdrIndex():
+    """SQLite index of the edf headers keyed by absolute path, size and mtime.
+    The modifications are saved by commit() or close().
+    The index can be shared between threads (ex. the loading threads of the GUI).
+    """
+    def __init__(self, index_fname, max_entries=INDEX_MAX_ENTRIES):
+        self.index_fname = index_fname
+        self.max_entries = max_entries
+        index_dir = os.path.dirname(index_fname)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        self.db_lock = threading.Lock()
+        self.db = sqlite3.connect(index_fname, timeout=30, check_same_thread=False)
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            self.db.execute('DROP TABLE IF EXISTS edf_hdr')
+            self.db.execute('PRAGMA user_version = {}'.format(INDEX_VERSION))
+        self.db.execute('CREATE TABLE IF NOT EXISTS edf_hdr (path TEXT PRIMARY KEY, '\
+            'size INTEGER, mtime_ns INTEGER, last_access REAL, edf_info BLOB, messages BLOB)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS edf_hdr_access ON edf_hdr (last_access)')
+        self.db.commit()
+
+
+    def get(self, fname, file_stat=None):
+        """Return (edf_info, messages) saved for the edf file "fname" or None
+        if the file is not in the index or was modified since.
+        """
+        path = os.path.abspath(fname)
+        if file_stat is None:
+            file_stat = os.stat(path)
+        with self.db_lock:
+            row = self.db.execute('SELECT size, mtime_ns, edf_info, messages FROM '\
+                                  'edf_hdr WHERE path = ?', (path,)).fetchone()
+            if row is None:
+                return None
+            if row[0] != file_stat.st_size or row[1] != file_stat.st_mtime_ns:
+                # The file was modified
+                self.db.execute('DELETE FROM edf_hdr WHERE path = ?', (path,))
+                return None
+            self.db.execute('UPDATE edf_hdr SET last_access = ? WHERE path = ?', \
+                            (time.time(), path))
+        return pickle.loads(row[2]), pickle.loads(row[3])
+
+
+    def put(self, fname, edf_info, messages, file_stat=None):
+        """Save the edf header "edf_info" and the messages of read_edf_header
+        for the edf file "fname".
+        """
+        path = os.path.abspath(fname)
+        if file_stat is None:
+            file_stat = os.stat(path)
+        edf_info_blob = pickle.dumps(edf_info, protocol=pickle.HIGHEST_PROTOCOL)
+        messages_blob = pickle.dumps(list(messages), protocol=pickle.HIGHEST_PROTOCOL)
+        with self.db_lock:
+            self.db.execute('INSERT OR REPLACE INTO edf_hdr VALUES (?, ?, ?, ?, ?, ?)', \
+                (path, file_stat.st_size, file_stat.st_mtime_ns, time.time(), \
+                 edf_info_blob, messages_blob))
+
+
+    def evict(self):
+        """Remove the least recently used headers to keep max_entries headers."""
+        with self.db_lock:
+            n_entries = self.db.execute('SELECT COUNT(*) FROM edf_hdr').fetchone()[0]
+            if n_entries > self.max_entries:
+                self.db.execute('DELETE FROM edf_hdr WHERE path IN (SELECT path FROM '\
+                    'edf_hdr ORDER BY last_access LIMIT ?)', (n_entries - self.max_entries,))
+
+
+    def commit(self):
+        """Evict the least recently used headers and save the index."""
+        self.evict()
+        with self.db_lock:
+            self.db.commit()
+
+
+    def close(self):
+        """Save and close the index."""
+        self.commit()
+        with self.db_lock:
+            self.db.close()
+
+
+def read_edf_header_cached(fname, message_win, hdr_index):
+    """Read the edf header from the index "hdr_index" or from the edf file
+    if it is not in the index (the header is then saved in the index).
+    The messages of read_edf_header are appended to message_win in both cases.
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF or EDF+ file.
+    hdr_index : EdfHdrIndex or None
+        Index of the edf headers, the file is read if None.
+
+    Returns
+    -----------
+    edf_info : EdfHeader
+        each field of the edf header are saved in edf_info
+
+    Usage : edf_info = read_edf_header_cached(your_file.edf, message_win, hdr_index)
+    """
+    if hdr_index is None:
+        return CEAMS_edfLib.read_edf_header(fname, message_win)
+    try:
+        file_stat = os.stat(fname)
+    except OSError:
+        return CEAMS_edfLib.read_edf_header(fname, message_win)
+    cached = hdr_index.get(fname, file_stat)
+    if cached is not None:
+        edf_info, messages = cached
+        for message in messages:
+            message_win.append(message)
+        return edf_info
+    messages = []
+    edf_info = CEAMS_edfLib.read_edf_header(fname, messages)
+    for message in messages:
+        message_win.append(message)
+    if edf_info is not None:
+        hdr_index.put(fname, edf_info, messages, file_stat)
+    return edf_info
@@ -3,28 +3,254 @@
 """
 A basic library to read, modify and write edf file.  
 Only specific fields of the edf header can be modified.
+The BDF files (24-bit samples, version "\xffBIOSEMI") are read and written 
+as the edf files, the number of bytes per sample is given by samp_nbytes.
 
 Created on Thu Oct 29 14:34:43 2020
 
 @author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
 """
 
+import CEAMS_edfAnnot
+import CEAMS_edfLog
+from collections.abc import MutableMapping
+import datetime
 import numpy as np
 import sys
 import os
 
+# Size of the chunks when the edf data is copied from a file to another
+COPY_CHUNK_NBYTES = 16*1024*1024
+# Version (8 ascii) and number of bytes per sample of the edf and bdf files
+EDF_VERSION = '0'
+BDF_VERSION = '\xffBIOSEMI'
+EDF_SAMP_NBYTES = 2
+BDF_SAMP_NBYTES = 3
+# Extensions of the files read
+EDF_EXTENSIONS = ('.edf', '.rec', '.bdf')
+
+
+class EdfHeader(MutableMapping):
+    """Header of an edf file (returned by read_edf_header).
+    The fields of the file are attributes and the fields of the channels are
+    saved in a single numpy structured array (one item per channel), the text
+    is kept in latin-1 bytes of the width of the field in the edf file.
+    The header is used as the former edf_info dict :
+        edf_info['ch_labels'], edf_info.get('nchan'), edf_info.items()...
+    the fields are in the order of the edf file, the text fields of the
+    channels are lists of str and the numeric fields of the channels are 
+    numpy arrays (views on the structured array).
+    Any other key is saved in a dict (extra).
+
+    Usage :
+        edf_info = read_edf_header(your_file.edf, message_win)
+        labels = edf_info.chan_labels()
+        label = edf_info.chan_value('ch_labels', 0)
+    """
+    # Fields of the file
+    FILE_FIELDS = ('version', 'patient_id', 'rec_id', 'startdate', 'starttime', \
+        'hdr_nbytes', 'comment_44rsv', 'n_records', 'record_length_sec', 'nchan')
+    # Fields of the channels : name of the field in the structured array
+    CHAN_FIELDS = {'ch_labels': 'label', 'transducer': 'transducer', 'units': 'units', \
+        'physical_min': 'physical_min', 'physical_max': 'physical_max', \
+        'digital_min': 'digital_min', 'digital_max': 'digital_max', \
+        'prefiltering': 'prefiltering', 'n_samps_record': 'n_samps_record', \
+        'comment_32rsv': 'comment_32rsv'}
+    # Fields computed from the file
+    REAL_FIELDS = ('hdr_nbytes_real', 'n_records_real')
+    # All the fields in the order of the edf file
+    FIELDS = FILE_FIELDS + tuple(CHAN_FIELDS) + REAL_FIELDS
+    CHAN_DTYPE = np.dtype([('label', 'S16'), ('transducer', 'S80'), ('units', 'S8'), \
+        ('physical_min', '<f8'), ('physical_max', '<f8'), ('digital_min', '<i8'), \
+        ('digital_max', '<i8'), ('prefiltering', 'S80'), ('n_samps_record', '<i8'), \
+        ('comment_32rsv', 'S32')])
+
+    __slots__ = FILE_FIELDS + REAL_FIELDS + ('chans', 'chan_keys', 'extra')
+
+    def __init__(self, edf_dict=None):
+        self.chans = np.zeros(0, dtype=self.CHAN_DTYPE)
+        # Fields of the channels set
+        self.chan_keys = set()
+        self.extra = {}
+        if edf_dict is not None:
+            self.update(edf_dict)
+
+
+    def __getitem__(self, key):
+        if key in self.CHAN_FIELDS:
+            if key not in self.chan_keys:
+                raise KeyError(key)
+            chan_vals = self.chans[self.CHAN_FIELDS[key]]
+            if chan_vals.dtype.kind == 'S':
+                return [chan_val.decode('latin-1') for chan_val in chan_vals.tolist()]
+            return chan_vals
+        if key in self.FILE_FIELDS or key in self.REAL_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return self.extra[key]
+
+
+    def __setitem__(self, key, value):
+        if key in self.CHAN_FIELDS:
+            # A single value is set for all the channels
+            if np.ndim(value) == 0:
+                value = [value]*len(self.chans)
+            n_chans = len(value)
+            if n_chans != len(self.chans):
+                self._resize_chans(n_chans)
+            chan_field = self.CHAN_FIELDS[key]
+            if self.CHAN_DTYPE[chan_field].kind == 'S':
+                if not (isinstance(value, np.ndarray) and value.dtype.kind == 'S'):
+                    value = [chan_val.encode('latin-1', errors='replace') \
+                             for chan_val in value]
+            if n_chans > 0:
+                self.chans[chan_field] = value
+            self.chan_keys.add(key)
+        elif key in self.FILE_FIELDS or key in self.REAL_FIELDS:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+
+    def __delitem__(self, key):
+        if key in self.CHAN_FIELDS:
+            if key not in self.chan_keys:
+                raise KeyError(key)
+            self.chan_keys.discard(key)
+        elif key in self.FILE_FIELDS or key in self.REAL_FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            del self.extra[key]
+
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if key in self:
+                yield key
+        yield from self.extra
+
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
+    def __contains__(self, key):
+        if key in self.CHAN_FIELDS:
+            return key in self.chan_keys
+        if key in self.FILE_FIELDS or key in self.REAL_FIELDS:
+            return hasattr(self, key)
+        return key in self.extra
+
+
+    def __repr__(self):
+        return 'EdfHeader({!r})'.format(dict(self.items()))
+
+
+    def copy(self):
+        """Return a copy of the header (the channels are copied)."""
+        edf_info = EdfHeader()
+        for key in self.FILE_FIELDS + self.REAL_FIELDS:
+            if hasattr(self, key):
+                setattr(edf_info, key, getattr(self, key))
+        edf_info.chans = self.chans.copy()
+        edf_info.chan_keys = set(self.chan_keys)
+        edf_info.extra = dict(self.extra)
+        return edf_info
+
+
+    def chan_value(self, key, chan_i):
+        """Return the value of the field "key" for the channel "chan_i"
+        (only the value of this channel is converted)."""
+        if key not in self.chan_keys:
+            raise KeyError(key)
+        chan_val = self.chans[chan_i][self.CHAN_FIELDS[key]]
+        if isinstance(chan_val, bytes):
+            return chan_val.decode('latin-1')
+        return chan_val
+
+
+    def chan_labels(self):
+        """Return the channel labels without the padding spaces."""
+        return [label.decode('latin-1').strip() for label in self.chans['label'].tolist()]
+
+
+    # Internal function to change the number of channels, 
+    # the values of the channels kept are not modified.
+    def _resize_chans(self, n_chans):
+        chans = np.zeros(max(n_chans, 0), dtype=self.CHAN_DTYPE)
+        n_kept = min(len(chans), len(self.chans))
+        chans[:n_kept] = self.chans[:n_kept]
+        self.chans = chans
+
+
+def is_bdf(edf_info):
+    """Return True if the header "edf_info" is the header of a BDF file
+    (version "\xffBIOSEMI")."""
+    version = edf_info.get('version')
+    return isinstance(version, str) and version.startswith(BDF_VERSION)
+
+
+def samp_nbytes(edf_info):
+    """Return the number of bytes per sample of the data records (3 for a
+    BDF file, 2 for an edf file)."""
+    return BDF_SAMP_NBYTES if is_bdf(edf_info) else EDF_SAMP_NBYTES
+
+
+def decode_bdf_samples(samp_bytes):
+    """Decode the 24-bit little-endian samples of a BDF file.
+
+    Parameters
+    -----------
+    samp_bytes : numpy array of uint8 (... x 3*n_samps)
+        bytes of the samples (ex. a view of the data records)
+
+    Returns
+    -----------
+    samps : numpy array of int32 (... x n_samps)
+        value of each sample
+
+    Usage : samps = decode_bdf_samples(edf_map.chan_bytes(0))
+    """
+    samp_bytes = np.asarray(samp_bytes, dtype=np.uint8)
+    samps_shape = samp_bytes.shape[:-1] + (samp_bytes.shape[-1] // BDF_SAMP_NBYTES,)
+    # The bytes are copied after one padding byte, then each sample is read 
+    #   as an int32 every 3 bytes (the padding or the previous byte + the 3 
+    #   bytes of the sample) and shifted to keep the sign of the 24 bits 
+    #   (vectorized, no loop on the samples)
+    padded = np.empty(samp_bytes.size + 1, dtype=np.uint8)
+    padded[0] = 0
+    padded[1:] = samp_bytes.reshape(-1)
+    n_samps = samp_bytes.size // BDF_SAMP_NBYTES
+    samps = np.ndarray((n_samps,), dtype='<i4', buffer=padded, \
+                       strides=(BDF_SAMP_NBYTES,))
+    return (samps >> 8).reshape(samps_shape)
+
+
+def encode_bdf_samples(samps):
+    """Encode the samples (int) in 24-bit little-endian bytes (... x 3*n_samps),
+    the inverse of decode_bdf_samples."""
+    samps = np.asarray(samps, dtype='<i4')
+    samp_bytes = samps[..., None].view(np.uint8)[..., :BDF_SAMP_NBYTES]
+    return np.ascontiguousarray(samp_bytes).reshape(samps.shape[:-1] + (-1,))
+
+
 def read_edf_header(fname, message_win):
     """Read header information from EDF+ based on https://www.edfplus.info/specs/edf.html
     
     Parameters
     -----------
     fname : str
-        Path to the EDF or EDF+ file.
+        Path to the EDF, EDF+, BDF or BDF+ file.
    
     Returns
     -----------
-    edf_info : dict 
-        each field of the edf header are saved in edf_info
+    edf_info : EdfHeader
+        each field of the edf header are saved in edf_info (used as a dict)
         
     Usage : edf_info = read_edf_header(your_file.edf, message_win)
     
@@ -32,35 +258,42 @@ def read_edf_header(fname, message_win):
     
     # General chec
     [file_name, file_ext] = os.path.splitext(fname)
-    if file_ext.lower() != '.edf' and file_ext.lower() != '.rec':    
-        err_message = '{} must be .edf or .rec format'.format(fname)
+    if file_ext.lower() not in EDF_EXTENSIONS:    
+        err_message = '{} must be .edf, .rec or .bdf format'.format(fname)
         message_win.append(err_message)
         print(err_message)
         sys.exit()
     else:
         try:
-            fid = open(fname, 'rb')
-            message_win.append('... opening {}'.format(fname))
-            edf_info = {}
+            with CEAMS_edfLog.span(message_win, 'open', fname=fname):
+                fid = open(fname, 'rb')
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, '... opening {}', fname)
+            parse_span = CEAMS_edfLog.span(message_win, 'parse', fname=fname)
+            edf_info = EdfHeader()
             with fid:
                 
+                # The fixed part of the header is read in one call
+                #   and each field is sliced from the buffer
+                hdr_fixed = fid.read(256)
+                
                 # 8 ascii : version of this data format (0)
-                fid.seek(8,0)  # version (unused here)
+                # 0xFF and BIOSEMI for a bdf file (24-bit samples)
+                edf_info['version'] = hdr_fixed[0:8].decode('latin-1').replace('\x00', ' ')
                 
                 # 80 ascii : local patient identification
-                edf_info['patient_id'] = fid.read(80).decode('latin-1').replace('\x00', ' ')
+                edf_info['patient_id'] = hdr_fixed[8:88].decode('latin-1').replace('\x00', ' ')
                 
                 # 80 ascii : local recording identification
-                edf_info['rec_id'] = fid.read(80).decode('latin-1').replace('\x00', ' ')
+                edf_info['rec_id'] = hdr_fixed[88:168].decode('latin-1').replace('\x00', ' ')
                 
                 # 8 ascii : startdate of recording (dd.mm.yy)
-                edf_info['startdate'] = fid.read(8).decode('latin-1').replace('\x00', ' ')
+                edf_info['startdate'] = hdr_fixed[168:176].decode('latin-1').replace('\x00', ' ')
                 
                 # 8 ascii : starttime of recording (hh.mm.ss)
-                edf_info['starttime'] = fid.read(8).decode('latin-1').replace('\x00', ' ')
+                edf_info['starttime'] = hdr_fixed[176:184].decode('latin-1').replace('\x00', ' ')
                 
                 # 8 ascii : number of bytes in header record
-                hdr_nbytes = fid.read(8)
+                hdr_nbytes = hdr_fixed[184:192]
                 try: 
                     edf_info['hdr_nbytes'] = int(hdr_nbytes.decode('latin-1').replace('\x00', '').strip())
                 except:
@@ -69,10 +302,10 @@ def read_edf_header(fname, message_win):
                     edf_info['hdr_nbytes'] = 0
                 
                 # 44 ascii : reserved
-                edf_info['comment_44rsv'] = fid.read(44).decode('latin-1').replace('\x00', ' ')
+                edf_info['comment_44rsv'] = hdr_fixed[192:236].decode('latin-1').replace('\x00', ' ')
                 
                 # 8 ascii : number of data records
-                n_records = fid.read(8)
+                n_records = hdr_fixed[236:244]
                 try:
                     edf_info['n_records'] = int(n_records.decode('latin-1').replace('\x00', '').strip())
                 except:
@@ -81,7 +314,7 @@ def read_edf_header(fname, message_win):
                     edf_info['n_records'] = 0
                 
                 # 8 ascii : duration of a data record, in seconds
-                record_length_sec = fid.read(8)
+                record_length_sec = hdr_fixed[244:252]
                 try:
                     edf_info['record_length_sec'] = float(record_length_sec.decode('latin-1').replace('\x00', '').strip())
                 except:
@@ -91,7 +324,7 @@ def read_edf_header(fname, message_win):
 
                 
                 # 4 ascii : number of signals (ns) in data record
-                nchan = fid.read(4)
+                nchan = hdr_fixed[252:256]
                 try:
                     edf_info['nchan'] = int(nchan.decode('latin-1').replace('\x00', '').strip())
                 except:
@@ -99,129 +332,78 @@ def read_edf_header(fname, message_win):
                     message_win.append(err_message)
                     edf_info['nchan'] = 0
                 
+                # The channel part of the header (ns * 256 ascii) is read in one call
+                #   each field is stored for all the channels before the next field
+                #   numeric fields are converted from the bytes, text fields are
+                #   kept in bytes (decoded by EdfHeader when they are used)
+                n_chans = edf_info.get('nchan')
+                hdr_chans = fid.read(n_chans*256)
+                hdr_chans_txt = hdr_chans.replace(b'\x00', b' ')
+                chan_fields = _split_chan_fields(n_chans)
+                
                 # ns * 16 ascii : ns * label
                 # e.g. EEG Fpz-Cz or Body temp
-                channels = list(range(edf_info.get('nchan')))
-                edf_info['ch_labels'] = [fid.read(16).decode('latin-1').replace('\x00', ' ') for ch in channels]
+                edf_info['ch_labels'] = _slice_chan_field(hdr_chans_txt, chan_fields['ch_labels'], n_chans)
                 
                 # ns * 80 ascii : ns * transducer type
                 # e.g. AgAgCl electrode
-                edf_info['transducer'] = [fid.read(80).decode('latin-1').replace('\x00', ' ') for ch in channels]
+                edf_info['transducer'] = _slice_chan_field(hdr_chans_txt, chan_fields['transducer'], n_chans)
                 
                 # ns * 8 ascii : ns * physical dimension
                 # e.g. uV or degreeC
-                edf_info['units'] = [fid.read(8).decode('latin-1').replace('\x00', ' ') for ch in channels]
                 # Replace µV by uV
-                for i, unit in enumerate(edf_info['units']):
-                    edf_info['units'][i] = unit.replace('µ', 'u')
+                units = _slice_chan_field(hdr_chans_txt, chan_fields['units'], n_chans).copy()
+                units_bytes = units.view(np.uint8)
+                units_bytes[units_bytes == ord('µ')] = ord('u')
+                edf_info['units'] = units
 
                 # ns * 8 ascii : ns * physical minimum 
                 # e.g. -500 or 34
-                # read first and then convert to float in order to catch the error
-                physical_mins = np.array([fid.read(8).decode('latin-1').replace('\x00', '').strip() for ch in channels]) 
-                edf_info['physical_min'] = np.zeros(len(physical_mins))
-                for i, physical_min in enumerate(physical_mins):
-                    if len(physical_min) > 0:
-                        try:
-                            edf_info['physical_min'][i] = float(physical_min)
-                        except:
-                            err_message = f"Error reading the physical minimum: {physical_min} for the channel {edf_info['ch_labels'][i]}"
-                            message_win.append(err_message)
-                    else:
-                        err_message = f"Error reading the physical minimum: {physical_min} for the channel {edf_info['ch_labels'][i]}"
-                        message_win.append(err_message)
-                        err_message = f"Value is replaced by 0"
-                        message_win.append(err_message)
-                # edf_info['physical_min'] = np.array([float(fid.read(8).decode('latin-1').replace('\x00', '').strip())
-                #                          for ch in channels])
+                # convert all the channels at once, the errors are caught channel per channel
+                edf_info['physical_min'] = _parse_chan_num(\
+                    _slice_chan_field(hdr_chans, chan_fields['physical_min'], n_chans), \
+                    float, "physical minimum", edf_info['ch_labels'], message_win)
+
                 # e.g. 500 or 40
-                # edf_info['physical_max'] = np.array([float(fid.read(8).decode('latin-1').replace('\x00', '').strip())
-                #                          for ch in channels])
-                physical_maxs = np.array([fid.read(8).decode('latin-1').replace('\x00', '').strip() for ch in channels]) 
-                edf_info['physical_max'] = np.zeros(len(physical_maxs))
-                for i, physical_max in enumerate(physical_maxs):
-                    if len(physical_max) > 0:
-                        try:
-                            edf_info['physical_max'][i] = float(physical_max)
-                        except:
-                            err_message = f"Error reading the physical maximum: {physical_max} for the channel {edf_info['ch_labels'][i]}"
-                            message_win.append(err_message)
-                    else:
-                        err_message = f"Error reading the physical maximum: {physical_max} for the channel {edf_info['ch_labels'][i]}"
-                        message_win.append(err_message)
-                        err_message = f"Value is replaced by 0"
-                        message_win.append(err_message)
+                edf_info['physical_max'] = _parse_chan_num(\
+                    _slice_chan_field(hdr_chans, chan_fields['physical_max'], n_chans), \
+                    float, "physical maximum", edf_info['ch_labels'], message_win)
                 
                 # e.g. -2048
-                digital_mins = np.array([fid.read(8).decode('latin-1').replace('\x00', '').strip() for ch in channels])
-                edf_info['digital_min'] = np.zeros(len(digital_mins), dtype=int)
-                for i, digital_min in enumerate(digital_mins):
-                    if len(digital_min) > 0:
-                        try:
-                            edf_info['digital_min'][i] = int(float(digital_min))
-                        except:
-                            err_message = f"Error reading the digital minimum: {digital_min} for the channel {edf_info['ch_labels'][i]}"
-                            message_win.append(err_message)
-                    else:
-                        err_message = f"Error reading the digital minimum: {digital_min} for the channel {edf_info['ch_labels'][i]}"
-                        message_win.append(err_message)
-                        err_message = f"Value is replaced by 0"
-                        message_win.append(err_message)
-                edf_info['digital_min'].astype(int)
+                edf_info['digital_min'] = _parse_chan_num(\
+                    _slice_chan_field(hdr_chans, chan_fields['digital_min'], n_chans), \
+                    int, "digital minimum", edf_info['ch_labels'], message_win, \
+                    from_float=True)
 
                 # e.g. 2047
-                digital_maxs = np.array([fid.read(8).decode('latin-1').replace('\x00', '').strip() for ch in channels])
-                edf_info['digital_max'] = np.zeros(len(digital_maxs), dtype=int)
-                for i, digital_max in enumerate(digital_maxs):
-                    if len(digital_max) > 0:
-                        try:
-                            edf_info['digital_max'][i] = int(float(digital_max))
-                        except:
-                            err_message = f"Error reading the digital maximum: {digital_max} for the channel {edf_info['ch_labels'][i]}"
-                            message_win.append(err_message)
-                    else:
-                        err_message = f"Error reading the digital maximum: {digital_max} for the channel {edf_info['ch_labels'][i]}"
-                        message_win.append(err_message)
-                        err_message = f"Value is replaced by 0"
-                        message_win.append(err_message)
-                edf_info['digital_max'].astype(int)
+                edf_info['digital_max'] = _parse_chan_num(\
+                    _slice_chan_field(hdr_chans, chan_fields['digital_max'], n_chans), \
+                    int, "digital maximum", edf_info['ch_labels'], message_win, \
+                    from_float=True)
 
                 # ns * 80 ascii : ns * prefiltering
                 # e.g. HP:0.1Hz LP:75Hz
-                edf_info['prefiltering'] = [fid.read(80).decode('latin-1').replace('\x00', ' ') for ch in channels][:]
+                edf_info['prefiltering'] = _slice_chan_field(hdr_chans_txt, chan_fields['prefiltering'], n_chans)
             
                 # number of samples per record
-                n_samps_record = np.array([fid.read(8).decode('latin-1').replace('\x00', '').strip() for ch in channels])
-                edf_info['n_samps_record'] = np.zeros(len(n_samps_record), dtype=int)
-                for i, n_samp in enumerate(n_samps_record):
-                    if len(n_samp) > 0:
-                        try:
-                            edf_info['n_samps_record'][i] = int(n_samp)
-                        except ValueError:
-                            err_message = f"Error reading the number of samples per record: {n_samp} for the channel {edf_info['ch_labels'][i]}"
-                            message_win.append(err_message)
-                    else:
-                        err_message = f"Error reading the number of samples per record: {n_samp} for the channel {edf_info['ch_labels'][i]}"
-                        message_win.append(err_message)
-                        err_message = f"Value is replaced by 0"
-                        message_win.append(err_message)
+                edf_info['n_samps_record'] = _parse_chan_num(\
+                    _slice_chan_field(hdr_chans, chan_fields['n_samps_record'], n_chans), \
+                    int, "number of samples per record", edf_info['ch_labels'], message_win)
                 
                 # Last access of the edf header
                 # 32 reserved for each chan
-                comment_32rsv = []
-                for ch in channels:
-                    comment_32rsv.append(fid.read(32).decode('latin-1').replace('\x00', ' '))
-                edf_info['comment_32rsv'] = comment_32rsv
+                edf_info['comment_32rsv'] = _slice_chan_field(hdr_chans_txt, chan_fields['comment_32rsv'], n_chans)
                 
                 # Save the real number of bytes in the header
                 edf_info['hdr_nbytes_real'] = fid.tell()
                 
                 # Verify the file size written in the edf header
-                fid.seek(0, 2) # 0 offset from the end of the file
-                n_bytes = fid.tell()
+                n_bytes = os.fstat(fid.fileno()).st_size
                 n_data_bytes = n_bytes - edf_info.get('hdr_nbytes')
-                total_samps = n_data_bytes // 2 # why 2 !!!
-                read_records = total_samps // np.sum(edf_info.get('n_samps_record'))
+                # 2 bytes per sample (3 for a bdf file)
+                total_samps = n_data_bytes // samp_nbytes(edf_info)
+                n_samps_total = int(np.sum(edf_info.get('n_samps_record')))
+                read_records = total_samps // n_samps_total if n_samps_total > 0 else 0
                 edf_info['n_records_real'] = read_records
                 if edf_info.get('n_records') != read_records:
                     err_message = 'Number of records from the header ({}) ' \
@@ -231,6 +413,7 @@ def read_edf_header(fname, message_win):
                     
                 fid.close()
                 
+            parse_span.end()
             return edf_info            
             
         except OSError:
@@ -238,6 +421,100 @@ def read_edf_header(fname, message_win):
             message_win.append(err_message)
 
 
+
+# Internal function to compute the position of each channel field in the 
+# channel part of the edf header (ns * 256 ascii).
+# Returns a dict of field : (offset, number of ascii per channel)
+def _split_chan_fields(nchan):
+    chan_fields = {}
+    offset = 0
+    for field, n_ascii in (('ch_labels', 16), ('transducer', 80), ('units', 8), \
+        ('physical_min', 8), ('physical_max', 8), ('digital_min', 8), \
+        ('digital_max', 8), ('prefiltering', 80), ('n_samps_record', 8), \
+        ('comment_32rsv', 32)):
+        chan_fields[field] = (offset, n_ascii)
+        offset = offset + n_ascii*nchan
+    return chan_fields
+
+
+# Internal function to slice the value of each channel for one field 
+# from the channel part of the edf header (bytes).
+# Returns a numpy array of fixed width bytes (one item per channel).
+def _slice_chan_field(hdr_chans, chan_field, nchan):
+    offset, n_ascii = chan_field
+    if nchan > 0 and len(hdr_chans) >= offset + n_ascii*nchan:
+        # View the field of all the channels as a fixed width array
+        #   (trailing null characters are dropped by numpy)
+        return np.frombuffer(hdr_chans, dtype='S{}'.format(n_ascii), \
+                             count=nchan, offset=offset)
+    # The header is truncated (or no channel)
+    return np.array([hdr_chans[offset+ch*n_ascii:offset+(ch+1)*n_ascii] \
+                     for ch in range(nchan)], dtype='S{}'.format(n_ascii))
+
+
+# Internal function to convert the numeric values of a channel field.
+# All the channels are converted at once (numpy) and the conversion is done
+# channel per channel only when a value is empty or not valid, in order to 
+# report which channel is not valid.
+#   from_float : the value is converted to float before to be converted 
+#       to int (ex. digital min and max).
+def _parse_chan_num(chan_vals, dtype, field_name, ch_labels, message_win, from_float=False):
+    if len(chan_vals) > 0:
+        try:
+            if from_float:
+                float_vals = chan_vals.astype(float)
+                if np.all(np.abs(float_vals) < 2**63):
+                    return float_vals.astype(dtype)
+            else:
+                return chan_vals.astype(dtype)
+        except (ValueError, OverflowError):
+            pass
+    num_vals = np.zeros(len(chan_vals), dtype=dtype)
+    for i, chan_val in enumerate(chan_vals):
+        chan_val = chan_val.decode('latin-1').replace('\x00', '').strip()
+        if len(chan_val) > 0:
+            try:
+                if from_float:
+                    num_vals[i] = dtype(float(chan_val))
+                else:
+                    num_vals[i] = dtype(chan_val)
+            except (ValueError, OverflowError):
+                err_message = f"Error reading the {field_name}: {chan_val} for the channel {ch_labels[i]}"
+                message_win.append(err_message)
+        else:
+            err_message = f"Error reading the {field_name}: {chan_val} for the channel {ch_labels[i]}"
+            message_win.append(err_message)
+            err_message = f"Value is replaced by 0"
+            message_win.append(err_message)
+    return num_vals
+
+
+def edf_start_datetime(edf_info):
+    """Return the start of the recording (startdate and starttime of the edf
+    header) as a datetime.  The years 85-99 are 1985-1999 and the years
+    00-84 are 2000-2084 (clipping date of the edf specification).
+
+    Parameters
+    -----------
+    edf_info : dict
+        edf info dictionary (read_edf_header)
+
+    Returns
+    -----------
+    start : datetime.datetime or None
+        None if the startdate or the starttime can not be read.
+
+    Usage : start = edf_start_datetime(edf_info)
+    """
+    try:
+        day, month, year = [int(val) for val in edf_info.get('startdate').split('.')]
+        hour, minute, sec = [int(val) for val in edf_info.get('starttime').split('.')]
+        year += 1900 if year >= 85 else 2000
+        return datetime.datetime(year, month, day, hour, minute, sec)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
 def read_edf_data(fname, hdr_nbytes, message_win):
     """Read the data chunk from EDF+, read and return all the bytes from 
     the last byte in the edf header until EOF 
@@ -276,26 +553,11 @@ def read_edf_data(fname, hdr_nbytes, message_win):
     return edf_data
 
 
-# Internal function to create or erase the file with the filename "fname".
-# Only the encoding is set. 
-def _erase_file(fname, message_win):
-    # Erase the file
-    with open(fname, 'wb') as fid:
-        try:
-            # 8 ascii : version of this data format (0)
-            fid.write(bytes(str(0).ljust(8),encoding='latin-1'))
-            fid.close()
-        except OSError:
-            # Eventually all the message will be report in a text file
-            # especially in batch with many files
-            err_message = '{} could not open/write'.format(fname)
-            message_win.append(err_message)
-            sys.exit()     
-
-
 def write_edf_hdr(fname, edf_info, message_win):
     """Create or erase the file with the filename "fname" and write the edf 
-    header "edf_info".
+    header "edf_info".  The header is packed in a single buffer (_pack_edf_hdr)
+    and written at once, nothing is written if a value does not fit in its
+    field.
     
     Parameters
     -----------
@@ -303,93 +565,209 @@ def write_edf_hdr(fname, edf_info, message_win):
         Path to the EDF or EDF+ file.
     edf_info : dict 
         each field of the edf header are saved in edf_info
+
+    Returns
+    -----------
+    hdr_written : Bool, True if the header is written False otherwise
         
     Usage : write_edf_hdr('fname.edf', edf_info, message_win)
     """
-    
-    # Open the file in write mode to fix the encoding and clode it
-    _erase_file(fname, message_win)
-    
-    with open(fname, 'ab') as fid:      
-        with fid:
-            
-            # 80 ascii : local patient identification
-            fid.write(bytes(edf_info.get('patient_id').ljust(80),encoding='latin-1'))
-            
-            # 80 ascii : local recording identification
-            fid.write(bytes(edf_info.get('rec_id').ljust(80),encoding='latin-1'))
-            
-            # 8 ascii : startdate of recording (dd.mm.yy)
-            fid.write(bytes(edf_info.get('startdate').ljust(8),encoding='latin-1'))
-            
-            # 8 ascii : starttime of recording (hh.mm.ss)
-            fid.write(bytes(edf_info.get('starttime').ljust(8),encoding='latin-1'))
-            
-            # 8 ascii : number of bytes in header record
-            fid.write(bytes(str(edf_info.get('hdr_nbytes')).ljust(8),encoding='latin-1'))
-            
-            # 44 ascii : reserved
-            fid.write(bytes(edf_info.get('comment_44rsv').ljust(44),encoding='latin-1'))
-            
-            # 8 ascii : number of data records
-            # if -1 change it !!!
-            fid.write(bytes(str(edf_info.get('n_records')).ljust(8),encoding='latin-1'))
-            
-            # 8 ascii : duration of a data record, in seconds
-            fid.write(bytes(str(edf_info.get('record_length_sec')).ljust(8),encoding='latin-1'))
-            
-            # 4 ascii : number of signals (ns) in data record
-            fid.write(bytes(str(edf_info.get('nchan')).ljust(4),encoding='latin-1'))
-            
-            # ns * 16 ascii : ns * label
-            # e.g. EEG Fpz-Cz or Body temp
-            channels = list(range(edf_info.get('nchan')))
-            for ch in channels:
-                fid.write(bytes(edf_info.get('ch_labels')[ch].ljust(16),encoding='latin-1'))
-            
-            # ns * 80 ascii : ns * transducer type
-            # e.g. AgAgCl electrode
-            for ch in channels:
-                fid.write(bytes(edf_info.get('transducer')[ch].ljust(80),encoding='latin-1'))
-            
-            # ns * 8 ascii : ns * physical dimension
-            # e.g. uV or degreeC
-            for ch in channels:
-                fid.write(bytes(edf_info.get('units')[ch].ljust(8),encoding='latin-1'))       
-        
-            # ns * 8 ascii : ns * physical minimum 
-            # e.g. -500 or 34
-            for ch in channels:
-                fid.write(bytes(str(edf_info.get('physical_min')[ch]).ljust(8),encoding='latin-1'))
-    
-            # e.g. 500 or 40
-            for ch in channels:
-                fid.write(bytes(str(edf_info.get('physical_max')[ch]).ljust(8),encoding='latin-1'))
-    
-            # e.g. -2048
-            for ch in channels:
-                fid.write(bytes(str(edf_info.get('digital_min')[ch]).ljust(8),encoding='latin-1'))   
-    
-            # e.g. 2047
-            for ch in channels:
-                fid.write(bytes(str(edf_info.get('digital_max')[ch]).ljust(8),encoding='latin-1'))    
-    
-            # ns * 80 ascii : ns * prefiltering
-            # e.g. HP:0.1Hz LP:75Hz
-            for ch in channels:
-                fid.write(bytes(edf_info.get('prefiltering')[ch].ljust(80),encoding='latin-1'))            
-        
-            # number of samples per record
-            for ch in channels:
-                fid.write(bytes(str(edf_info.get('n_samps_record')[ch]).ljust(8),encoding='latin-1')) 
-            
-            # 32 ascii x nchan: reserved
-            for ch in channels:
-                fid.write(bytes(edf_info.get('comment_32rsv')[ch].ljust(32),encoding='latin-1'))  
-                
-            fid.close()
-                
-            
+    try:
+        hdr_bytes = _pack_edf_hdr(edf_info)
+    except ValueError as err:
+        message_win.append('ERROR : {}, {} is not written'.format(err, fname))
+        return False
+    try:
+        with open(fname, 'wb') as fid:
+            fid.write(hdr_bytes)
+    except OSError:
+        err_message = '{} could not open/write'.format(fname)
+        message_win.append(err_message)
+        return False
+    return True
+
+
+# Internal function to return the version written in the header "edf_info" :
+# 0xFF BIOSEMI for a bdf file, 0 otherwise.
+def _edf_version(edf_info):
+    return BDF_VERSION if is_bdf(edf_info) else EDF_VERSION
+
+
+# Fields of the file after the version : (field, number of ascii, numeric)
+_HDR_FILE_FIELDS = (('patient_id', 80, False), ('rec_id', 80, False), \
+    ('startdate', 8, False), ('starttime', 8, False), ('hdr_nbytes', 8, True), \
+    ('comment_44rsv', 44, False), ('n_records', 8, True), \
+    ('record_length_sec', 8, True), ('nchan', 4, True))
+# Numeric fields of the channels
+_HDR_CHAN_NUM_FIELDS = ('physical_min', 'physical_max', 'digital_min', 'digital_max', \
+                        'n_samps_record')
+
+
+# Internal function to format the numbers "num_vals" in "n_ascii" characters.
+# The integers are written as is and the floats with the most decimals that
+# fit (shortest-fit rounding, trailing zeros removed), for all the values
+# at once.
+# Returns a numpy array of bytes (S), raises ValueError if a value can not fit
+# or if a value not 0 is rounded to 0.
+def _format_edf_nums(num_vals, n_ascii, field):
+    num_vals = np.atleast_1d(np.asarray(num_vals))
+    if num_vals.dtype.kind in 'iub':
+        num_strs = num_vals.astype(np.int64).astype('U')
+    else:
+        try:
+            num_vals = num_vals.astype(float)
+        except (TypeError, ValueError):
+            raise ValueError('the {} values are not numbers'.format(field)) from None
+        if not np.all(np.isfinite(num_vals)):
+            raise ValueError('the {} values are not all finite'.format(field))
+        num_strs = np.char.mod('%.0f', num_vals)
+        # The precision increases as long as the value fits
+        for precision in range(1, n_ascii-1):
+            prec_strs = np.char.rstrip(np.char.rstrip(\
+                np.char.mod('%.{}f'.format(precision), num_vals), '0'), '.')
+            num_strs = np.where(np.char.str_len(prec_strs) <= n_ascii, prec_strs, num_strs)
+        num_strs = np.where(num_strs == '-0', '0', num_strs)
+        rounded_to_0 = (num_strs.astype(float) == 0) & (num_vals != 0)
+        if np.any(rounded_to_0):
+            raise ValueError('the {} value {} is rounded to 0 in {} characters'.format(\
+                field, num_vals[rounded_to_0][0], n_ascii))
+    too_long = np.char.str_len(num_strs) > n_ascii
+    if np.any(too_long):
+        raise ValueError('the {} value {} does not fit in {} characters'.format(\
+            field, num_vals[too_long][0], n_ascii))
+    return num_strs.astype('S{}'.format(n_ascii))
+
+
+# Internal function to return the text "text_vals" (str or list of str) in
+# latin-1 bytes of "n_ascii" characters.
+# Raises ValueError if a text is too long.
+def _format_edf_texts(text_vals, n_ascii, field):
+    if isinstance(text_vals, np.ndarray) and text_vals.dtype.kind == 'S':
+        text_bytes = text_vals
+    else:
+        if isinstance(text_vals, str):
+            text_vals = [text_vals]
+        text_bytes = np.array([text_val.encode('latin-1', errors='replace') \
+                               for text_val in text_vals], dtype='S')
+    if text_bytes.dtype.itemsize > n_ascii:
+        too_long = np.char.str_len(text_bytes) > n_ascii
+        raise ValueError('the {} value {} does not fit in {} characters'.format(\
+            field, text_bytes[too_long][0].decode('latin-1'), n_ascii))
+    return text_bytes.astype('S{}'.format(n_ascii))
+
+
+# Internal function to pack the edf header "edf_info" into bytes.
+# The header is written in one preallocated buffer (filled with spaces),
+# each field of all the channels is formatted at once.
+# Raises ValueError if a value does not fit in its field, or if the physical
+# min and max of a channel are the same once rounded (nothing is packed).
+def _pack_edf_hdr(edf_info):
+    n_chans = edf_info.get('nchan')
+    hdr_bytes = bytearray(b' ' * (256*(n_chans+1)))
+    # 8 ascii : version of this data format (0 or 0xFF BIOSEMI)
+    hdr_bytes[0:8] = _edf_version(edf_info).ljust(8).encode('latin-1')
+    offset = 8
+    for field, n_ascii, numeric in _HDR_FILE_FIELDS:
+        if numeric:
+            field_bytes = _format_edf_nums(edf_info.get(field), n_ascii, field)
+        else:
+            field_bytes = _format_edf_texts(edf_info.get(field), n_ascii, field)
+        hdr_bytes[offset:offset+n_ascii] = np.char.ljust(field_bytes, n_ascii).tobytes()
+        offset = offset + n_ascii
+    # Each field is stored for all the channels before the next field
+    chan_nums = {}
+    for field, (chan_offset, n_ascii) in _split_chan_fields(n_chans).items():
+        if isinstance(edf_info, EdfHeader) and field in edf_info.chan_keys:
+            # The channels of an EdfHeader are already numbers or latin-1 bytes
+            field_vals = edf_info.chans[EdfHeader.CHAN_FIELDS[field]]
+        else:
+            field_vals = edf_info.get(field)
+        if len(field_vals) != n_chans:
+            raise ValueError('{} {} values for {} channels'.format(\
+                len(field_vals), field, n_chans))
+        if n_chans == 0:
+            continue
+        if field in _HDR_CHAN_NUM_FIELDS:
+            field_bytes = _format_edf_nums(field_vals, n_ascii, field)
+            chan_nums[field] = (np.asarray(field_vals), field_bytes)
+        else:
+            field_bytes = _format_edf_texts(field_vals, n_ascii, field)
+        if field == 'physical_max':
+            # The samples can not be scaled if the rounding makes the
+            #   physical min and max the same
+            (min_vals, min_bytes), (max_vals, max_bytes) = \
+                chan_nums['physical_min'], chan_nums['physical_max']
+            same_range = (min_bytes == max_bytes) & (min_vals != max_vals)
+            if np.any(same_range):
+                raise ValueError('the physical_min {} and physical_max {} are '\
+                    'both {} in {} characters'.format(min_vals[same_range][0], \
+                        max_vals[same_range][0], min_bytes[same_range][0].decode(), n_ascii))
+        hdr_bytes[256+chan_offset:256+chan_offset+n_ascii*n_chans] = \
+            np.char.ljust(field_bytes, n_ascii).tobytes()
+    return bytes(hdr_bytes)
+
+
+def patch_edf_hdr(fname, edf_info, message_win):
+    """Rewrite in place the edf header of the existing file "fname" with
+    the header "edf_info".  The data records are not read nor written when
+    the size of the header does not change, only the header bytes are
+    overwritten.  Otherwise, the header and the data records are copied
+    by chunks into a new file that replaces "fname".
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF or EDF+ file to patch.
+    edf_info : dict
+        each field of the edf header are saved in edf_info
+        edf_info must have been read from "fname" (hdr_nbytes_real is the
+        number of bytes of the header currently in the file)
+
+    Returns
+    -----------
+    hdr_patched : Bool, True if the header is written False otherwise
+
+    Usage : hdr_patched = patch_edf_hdr('fname.edf', edf_info, message_win)
+    """
+    # Number of bytes of the header in the file and in edf_info
+    hdr_nbytes_file = edf_info.get('hdr_nbytes_real')
+    try:
+        hdr_bytes = _pack_edf_hdr(edf_info)
+        # The number of bytes of the header written is the size packed
+        if edf_info.get('hdr_nbytes') != len(hdr_bytes):
+            edf_info['hdr_nbytes'] = len(hdr_bytes)
+            hdr_bytes = _pack_edf_hdr(edf_info)
+    except ValueError as err:
+        message_win.append('ERROR : {}, {} is not patched'.format(err, fname))
+        return False
+
+    write_span = CEAMS_edfLog.span(message_win, 'write', fname=fname)
+    try:
+        if len(hdr_bytes) == hdr_nbytes_file:
+            # Same header size : overwrite only the header
+            with open(fname, 'r+b') as fid:
+                fid.seek(0, 0)
+                fid.write(hdr_bytes)
+            message_win.append('{} header is patched in place'.format(fname))
+        else:
+            # The header size changed : the data records need to be moved
+            message_win.append('WARNING : the header size changed from {} to {} '\
+                'bytes, {} is rewritten'.format(hdr_nbytes_file, len(hdr_bytes), fname))
+            fname_tmp = fname + '.tmp'
+            with open(fname, 'rb') as fid_src, open(fname_tmp, 'wb') as fid_dst:
+                fid_dst.write(hdr_bytes)
+                _copy_edf_bytes(fid_src, hdr_nbytes_file, fid_dst)
+            os.replace(fname_tmp, fname)
+            edf_info['hdr_nbytes_real'] = len(hdr_bytes)
+    except OSError:
+        err_message = '{} could not open/write'.format(fname)
+        message_win.append(err_message)
+        return False
+    finally:
+        write_span.end()
+    return True
+
+
 def write_edf_data(fname, edf_info, edf_data, message_win):
     """Write the edf data chunk (already organized as data records) into the 
     edf file with the filename "fname".  The file has to exist and have a valid 
@@ -413,26 +791,34 @@ def write_edf_data(fname, edf_info, edf_data, message_win):
         with fid:
             
             # Write the data
-            fid.write(bytes(edf_data))
+            #   the memoryview avoids a copy of the data chunk
+            if isinstance(edf_data, int):
+                edf_data = bytes(edf_data)
+            fid.write(memoryview(edf_data))
             
             # Verify the file size written in the edf header
-            fid.seek(0, 2)
-            n_bytes_eof = fid.tell()
-            n_data_bytes = n_bytes_eof - edf_info.get('hdr_nbytes')
-            
-            # why 2 ? -> precision header = 8, and precision TS = 16 ? 
-            total_samps = n_data_bytes // 2 
-            
-            read_records = total_samps // np.sum(edf_info.get('n_samps_record'))
-            if edf_info.get('n_records') != read_records:
-                err_message = 'Number of records from the header ({}) ' \
-                'does not match the file size ({})' .format(edf_info.get('n_records'), \
-                    read_records)
-                message_win.append(err_message)     
+            _verify_n_records(fid.tell(), edf_info, message_win)
                 
             fid.close()
 
 
+# Internal function to verify the number of data records written in the 
+# edf header with the size (number of bytes) of the edf file.
+def _verify_n_records(n_bytes_eof, edf_info, message_win):
+    n_data_bytes = n_bytes_eof - edf_info.get('hdr_nbytes')
+    
+    # 16-bit samples (24-bit for a bdf file)
+    total_samps = n_data_bytes // samp_nbytes(edf_info)
+    
+    n_samps_total = int(np.sum(edf_info.get('n_samps_record')))
+    read_records = total_samps // n_samps_total if n_samps_total > 0 else 0
+    if edf_info.get('n_records') != read_records:
+        err_message = 'Number of records from the header ({}) ' \
+        'does not match the file size ({})' .format(edf_info.get('n_records'), \
+            read_records)
+        message_win.append(err_message)     
+
+
 def write_edf_file(fname, edf_info, edf_data, message_win):
     """Write the edf header and the edf data chunk in an EDF+ file.
     
@@ -450,10 +836,307 @@ def write_edf_file(fname, edf_info, edf_data, message_win):
     Usage : write_edf_file(your_file.edf, edf_info, edf_data ,message_win)    
     
     """    
-    # open the file in dump mode, write the edf header and close it
-    write_edf_hdr(fname, edf_info, message_win)
-    # open the file in dump mode, write the edf data and close it 
-    write_edf_data(fname, edf_info, edf_data, message_win)
+    with CEAMS_edfLog.span(message_win, 'write', fname=fname):
+        # open the file in dump mode, write the edf header and close it
+        if not write_edf_hdr(fname, edf_info, message_win):
+            return
+        # open the file in dump mode, write the edf data and close it 
+        write_edf_data(fname, edf_info, edf_data, message_win)
+    
+
+# Internal function to copy the bytes of the file "fid_src" from the offset
+# "offset_src" until EOF (or "n_bytes" bytes) at the current position of the 
+# file "fid_dst".
+# The copy is done by chunks of "chunk_nbytes" (zero-copy with os.sendfile 
+# when the platform supports it) then the memory used is bounded.
+# progress_callback(n_bytes_copied, n_bytes_total) is called after each chunk.
+# Returns the number of bytes copied.
+def _copy_edf_bytes(fid_src, offset_src, fid_dst, progress_callback=None, \
+                    chunk_nbytes=COPY_CHUNK_NBYTES, n_bytes=None):
+    n_bytes_total = max(os.fstat(fid_src.fileno()).st_size - offset_src, 0)
+    if n_bytes is not None:
+        n_bytes_total = min(n_bytes_total, n_bytes)
+    n_bytes_copied = 0
+    fid_dst.flush()
+    
+    # Zero-copy : the bytes are copied by the kernel
+    if hasattr(os, 'sendfile'):
+        offset_dst = fid_dst.tell()
+        try:
+            while n_bytes_copied < n_bytes_total:
+                n_bytes_sent = os.sendfile(fid_dst.fileno(), fid_src.fileno(), \
+                    offset_src + n_bytes_copied, \
+                    min(chunk_nbytes, n_bytes_total - n_bytes_copied))
+                if n_bytes_sent == 0:
+                    break
+                n_bytes_copied = n_bytes_copied + n_bytes_sent
+                if progress_callback is not None:
+                    progress_callback(n_bytes_copied, n_bytes_total)
+            fid_dst.seek(offset_dst + n_bytes_copied, 0)
+            return n_bytes_copied
+        except OSError:
+            # sendfile is not supported between these files, copy by chunks
+            # from where sendfile stopped
+            fid_dst.seek(offset_dst + n_bytes_copied, 0)
+            
+    # Copy by chunks with a single buffer
+    data_chunk = bytearray(min(chunk_nbytes, max(n_bytes_total, 1)))
+    data_view = memoryview(data_chunk)
+    fid_src.seek(offset_src + n_bytes_copied, 0)
+    while n_bytes_copied < n_bytes_total:
+        n_bytes_read = fid_src.readinto(data_view)
+        if not n_bytes_read:
+            break
+        fid_dst.write(data_view[:n_bytes_read])
+        n_bytes_copied = n_bytes_copied + n_bytes_read
+        if progress_callback is not None:
+            progress_callback(n_bytes_copied, n_bytes_total)
+    return n_bytes_copied
+
+
+def copy_edf_data(fname_src, hdr_nbytes_src, fname, edf_info, message_win, \
+                  progress_callback=None):
+    """Copy the edf data chunk (the data records) of the file "fname_src" into 
+    the edf file "fname".  The data is copied by chunks, it is never loaded 
+    completely in memory.  The file "fname" has to exist and have a valid 
+    edf header that matches the edf data chunk.  This function needs to be 
+    called after write_edf_hdr.
+    
+    Parameters
+    -----------
+    fname_src : str
+        Path to the EDF or EDF+ file to copy the data from.
+    hdr_nbytes_src : int
+        Number of bytes in the edf header of fname_src
+    fname : str
+        Path to the EDF or EDF+ file to write.
+    edf_info : dict 
+        each field of the edf header are saved in edf_info
+    progress_callback : function, optional
+        Called after each chunk as progress_callback(n_bytes_copied, n_bytes_total)
+        
+    Usage : copy_edf_data('your_file.edf', 7424, 'fname.edf', edf_info, message_win)
+    """
+    try:
+        # r+b instead of ab because sendfile does not support the append mode
+        with open(fname_src, 'rb') as fid_src, open(fname, 'r+b') as fid:
+            fid.seek(0, 2)
+            _copy_edf_bytes(fid_src, hdr_nbytes_src, fid, progress_callback)
+            # Verify the file size written in the edf header
+            _verify_n_records(fid.tell(), edf_info, message_win)
+    except OSError:
+        err_message = '{} could not be copied into {}'.format(fname_src, fname)
+        message_win.append(err_message)
+        return False
+    return True
+
+
+def write_edf_file_from(fname, edf_info, fname_src, message_win, \
+                        progress_callback=None):
+    """Write the edf header and copy the edf data chunk of the file "fname_src"
+    in an EDF+ file.  The data is copied by chunks, then the memory used does 
+    not depend on the size of the file.
+    
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF or EDF+ file to write.
+    edf_info : dict
+        dict of each edf header field (read from fname_src and modified)
+    fname_src : str
+        Path to the EDF or EDF+ file to copy the data from.
+    progress_callback : function, optional
+        Called after each chunk as progress_callback(n_bytes_copied, n_bytes_total)
+        
+    Usage : write_edf_file_from('fname.edf', edf_info, 'your_file.edf', message_win)
+    
+    """
+    # The data starts after the header of the source file
+    hdr_nbytes_src = edf_info.get('hdr_nbytes_real')
+    with CEAMS_edfLog.span(message_win, 'write', fname=fname):
+        # open the file in dump mode, write the edf header and close it
+        if not write_edf_hdr(fname, edf_info, message_win):
+            return False
+        # copy the edf data by chunks
+        return copy_edf_data(fname_src, hdr_nbytes_src, fname, edf_info, \
+                             message_win, progress_callback)
+    
+
+def concat_edf_files(fnames, fname, message_win, progress_callback=None):
+    """Concatenate the edf files "fnames" into the edf file "fname".
+    The files are ordered by their start (startdate and starttime) and
+    their headers must be compatible (same patient_id, channels, 
+    sampling...).  The header of the first file is written with the total 
+    number of data records, then the data records of each file are copied 
+    by chunks : the memory used does not depend on the length of the 
+    recordings.
+    The onsets of the TALs of the EDF+ (or BDF+) files are shifted by the
+    start of each file from the start of the first file 
+    (CEAMS_edfAnnot.shift_edf_annotations).  When there are gaps between the
+    files, the EDF+ file written is discontinuous (EDF+D) and its onsets are
+    the real onsets ; the gaps of an EDF file are lost (WARNING).
+    
+    Parameters
+    -----------
+    fnames : list of str
+        Path to the EDF or EDF+ files to concatenate (any order).
+    fname : str
+        Path to the EDF or EDF+ file to write.
+    progress_callback : function, optional
+        Called after each chunk as progress_callback(n_bytes_copied, n_bytes_total)
+        
+    Returns
+    -----------
+    True if the files are concatenated False otherwise
+        
+    Usage : concat_edf_files(['file1.edf', 'file2.edf'], 'fname.edf', message_win)
+    """
+    if len(fnames) < 2:
+        message_win.append("At least 2 files are needed to concatenate")
+        return False
+    edf_hdr_lst = []
+    for fname_src in fnames:
+        edf_hdr = read_edf_header(fname_src, message_win)
+        if edf_hdr is None:
+            message_win.append("Files could not be concatenated")
+            return False
+        edf_hdr_lst.append(edf_hdr)
+
+    # Order the files by their start
+    starts = [edf_start_datetime(edf_hdr) for edf_hdr in edf_hdr_lst]
+    if any(start is None for start in starts):
+        message_win.append("The startdate or the starttime can not be read, "\
+                           "files could not be concatenated")
+        return False
+    start_sec = np.array([(start - datetime.datetime(1985, 1, 1)).total_seconds() \
+                          for start in starts])
+    file_order = np.argsort(start_sec, kind='stable')
+    if np.any(np.diff(start_sec[file_order]) == 0):
+        message_win.append("Startdate and starttime are the same")
+        message_win.append("Files could not be concatenated")
+        return False
+    edf_hdr_lst = [edf_hdr_lst[i] for i in file_order]
+    fnames = [fnames[i] for i in file_order]
+    start_sec = start_sec[file_order]
+
+    if not _concat_compatible(edf_hdr_lst, message_win):
+        message_win.append("Files could not be concatenated")
+        return False
+
+    # Only the complete data records are copied
+    n_records = np.array([edf_hdr.get('n_records_real') for edf_hdr in edf_hdr_lst])
+    for fname_src, edf_hdr in zip(fnames, edf_hdr_lst):
+        if edf_hdr.get('n_records') != edf_hdr.get('n_records_real'):
+            message_win.append("WARNING : {} {} data records are copied".format(\
+                fname_src, edf_hdr.get('n_records_real')))
+    # EDF+ files : the channels are the same, the annotation channels too
+    edf_plus = len(CEAMS_edfAnnot.find_annot_chans(edf_hdr_lst[0])) > 0
+    discontinuous = [_edf_plus_discontinuous(edf_hdr) for edf_hdr in edf_hdr_lst]
+    # Verify the files do not overlap in time
+    record_length_sec = edf_hdr_lst[0].get('record_length_sec')
+    stop_sec = start_sec + n_records * record_length_sec
+    for i_file, (fname_src, edf_hdr) in enumerate(zip(fnames, edf_hdr_lst)):
+        # The last data record of an EDF+D file ends after its last onset
+        if edf_plus and discontinuous[i_file] and n_records[i_file] > 0:
+            record_onsets = CEAMS_edfAnnot.read_edf_record_onsets(fname_src, \
+                                                                  edf_hdr, message_win)
+            stop_sec[i_file] = max(stop_sec[i_file], start_sec[i_file] + \
+                np.nanmax(record_onsets[:n_records[i_file]]) + record_length_sec)
+    # The gaps shorter than the tolerance of CEAMS_edfAnnot are ignored
+    gap_sec = start_sec[1:] - stop_sec[:-1]
+    gap_sec[np.abs(gap_sec) <= max(1e-3, record_length_sec / 1000)] = 0
+    if np.any(gap_sec < 0):
+        message_win.append("{} overlaps the previous file, files could not be "\
+            "concatenated".format(fnames[1 + int(np.argmax(gap_sec < 0))]))
+        return False
+
+    # The header of the first file with the total number of data records
+    edf_info = edf_hdr_lst[0].copy()
+    edf_info['n_records'] = int(n_records.sum())
+    if edf_plus and (np.any(gap_sec > 0) or any(discontinuous)):
+        # The gaps are kept by the onsets of the timekeeping TALs
+        comment_44rsv = edf_info.get('comment_44rsv')
+        edf_plus_d = ('BDF' if is_bdf(edf_info) else 'EDF') + '+D'
+        if comment_44rsv[:4] in ('EDF+', 'BDF+'):
+            edf_info['comment_44rsv'] = edf_plus_d + comment_44rsv[5:]
+        else:
+            edf_info['comment_44rsv'] = edf_plus_d
+        if np.any(gap_sec > 0):
+            message_win.append("WARNING : there are gaps between the files ({} s), "\
+                "{} is discontinuous ({})".format(round(float(gap_sec.sum()), 6), fname, \
+                    edf_info['comment_44rsv'].strip()))
+    elif np.any(gap_sec > 0):
+        message_win.append("WARNING : there are gaps between the files ({} s), "\
+            "the data records are written without gaps".format(gap_sec.sum()))
+    record_nbytes = samp_nbytes(edf_info) * int(np.sum(edf_info.get('n_samps_record')))
+    n_bytes_total = int(n_records.sum()) * record_nbytes
+    write_span = CEAMS_edfLog.span(message_win, 'write', fname=fname)
+    if not write_edf_hdr(fname, edf_info, message_win):
+        write_span.end()
+        return False
+    try:
+        # r+b instead of ab because sendfile does not support the append mode
+        with open(fname, 'r+b') as fid:
+            fid.seek(0, 2)
+            n_bytes_done = 0
+            for fname_src, edf_hdr, n_records_src in zip(fnames, edf_hdr_lst, n_records):
+                if progress_callback is not None:
+                    file_callback = lambda n_copied, n_total, n_done=n_bytes_done: \
+                        progress_callback(n_done + n_copied, n_bytes_total)
+                else:
+                    file_callback = None
+                with open(fname_src, 'rb') as fid_src:
+                    n_bytes_done += _copy_edf_bytes(fid_src, edf_hdr.get('hdr_nbytes_real'), \
+                        fid, file_callback, n_bytes=int(n_records_src)*record_nbytes)
+            # Verify the file size written in the edf header
+            _verify_n_records(fid.tell(), edf_info, message_win)
+        if edf_plus:
+            # The onsets of each file are shifted by its start from the first file
+            edf_info['n_records_real'] = int(n_records.sum())
+            rec_starts = np.concatenate(([0], np.cumsum(n_records))).astype(int)
+            for i_file in range(1, len(fnames)):
+                if not CEAMS_edfAnnot.shift_edf_annotations(fname, edf_info, \
+                    int(round(start_sec[i_file] - start_sec[0])), message_win, \
+                        rec_starts[i_file], rec_starts[i_file+1]):
+                    message_win.append("Files could not be concatenated")
+                    return False
+    except OSError:
+        message_win.append('{} could not be written'.format(fname))
+        return False
+    finally:
+        write_span.end()
+    message_win.append("{} files are concatenated into {}".format(len(fnames), fname))
+    return True
+
+
+# Internal function to return True if the reserved field of the EDF+ (or 
+# BDF+) header "edf_info" starts with EDF+D (or BDF+D).
+def _edf_plus_discontinuous(edf_info):
+    return edf_info.get('comment_44rsv')[:5] in ('EDF+D', 'BDF+D')
+
+
+# Internal function to verify that the edf headers "edf_hdr_lst" can be
+# concatenated : the fields that define the data records have to be the same.
+# Each field is compared through all the files at once.
+def _concat_compatible(edf_hdr_lst, message_win):
+    scalar_fields = ['version', 'patient_id', 'hdr_nbytes', 'record_length_sec', 'nchan']
+    chan_fields = ['ch_labels', 'physical_min', 'physical_max', 'digital_min', \
+                   'digital_max', 'prefiltering', 'n_samps_record']
+    concat_true = True
+    for field in scalar_fields:
+        field_vals = np.array([edf_hdr.get(field) for edf_hdr in edf_hdr_lst])
+        if np.any(field_vals != field_vals[0]):
+            message_win.append(field + " is not the same through the files to concatenate")
+            concat_true = False
+    if not concat_true:
+        return False
+    for field in chan_fields:
+        # files x channels
+        field_vals = np.array([np.asarray(edf_hdr.get(field)) for edf_hdr in edf_hdr_lst])
+        if field_vals.ndim != 2 or np.any(field_vals != field_vals[0]):
+            message_win.append(field + " is not the same through the files to concatenate")
+            concat_true = False
+    return concat_true
     
 
 def _modify_patient_id(val_to_mod, message_win):
@@ -469,10 +1152,13 @@ def _modify_patient_id(val_to_mod, message_win):
         True if the field can be modified False otherwise 
         
     """
-    message_win.append("You want to modify patient_id field to :'{}'\n".format(val_to_mod))
+    CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+        "You want to modify patient_id field to :'{}'\n", val_to_mod)
     # Print the specification info from 
     #   https://www.edfplus.info/specs/edfplus.html#additionalspecs
-    message_win.append("-------------------------------------------------------------------\n"\
+    #   (dropped when the DEBUG messages are not kept)
+    CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+          "-------------------------------------------------------------------\n"\
           " Information from edf specification\n"
           "-------------------------------------------------------------------\n"\
           "The 'local patient identification' field must start with the "\
@@ -534,10 +1220,13 @@ def _modify_rec_id(val_to_mod, message_win):
         True if the field can be modified False otherwise 
         
     """
-    message_win.append("You want to modify rec_id field to :'{}'\n".format(val_to_mod))
+    CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+        "You want to modify rec_id field to :'{}'\n", val_to_mod)
     # Print the specification info from 
     #   https://www.edfplus.info/specs/edfplus.html#additionalspecs
-    message_win.append("-------------------------------------------------------------------\n"\
+    #   (dropped when the DEBUG messages are not kept)
+    CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+          "-------------------------------------------------------------------\n"\
           " Information from edf specification\n"
           "-------------------------------------------------------------------\n"\
           "The 'local recording identification' field must start with the subfields\n"\
@@ -598,10 +1287,13 @@ def _modify_startdate(val_to_mod, message_win):
         True if the field can be modified False otherwise 
         
     """
-    message_win.append("You want to modify startdate or starttime field to :'{}'\n".format(val_to_mod))
+    CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+        "You want to modify startdate or starttime field to :'{}'\n", val_to_mod)
     # Print the specification info from 
     #   https://www.edfplus.info/specs/edfplus.html#additionalspecs
-    message_win.append("-------------------------------------------------------------------\n"\
+    #   (dropped when the DEBUG messages are not kept)
+    CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+          "-------------------------------------------------------------------\n"\
           " Information from edf specification\n"
           "-------------------------------------------------------------------\n"\
           "The 'startdate' and 'starttime' fields in the header should "\
@@ -624,6 +1316,51 @@ def _modify_startdate(val_to_mod, message_win):
     return field_mod
 
 
+def check_chan_texts(text_vals, field_to_mod, message_win):
+    """Check the text values "text_vals" of the channel field "field_to_mod"
+    (ch_labels, transducer, units or prefiltering) : each value is a text
+    that fits in the field and can be written in latin-1.  The checks of
+    _modify_text and of the rules of CEAMS_edfBulk.
+
+    Parameters
+    -----------
+    text_vals : list of str
+        Values to check (one per channel or any number of values).
+    field_to_mod : str
+        The channel field of the values.
+
+    Returns
+    -----------
+    texts_valid : list of Bool, True for each value that can be written
+
+    Usage : texts_valid = check_chan_texts(['EEG C3-A2'], 'ch_labels', message_win)
+    """
+    if field_to_mod not in ('ch_labels', 'transducer', 'units', 'prefiltering'):
+        message_win.append("ERROR : {} is an unexpected field".format(field_to_mod))
+        return [False]*len(text_vals)
+    max_ascii_char = _split_chan_fields(1)[field_to_mod][1]
+    texts_valid = []
+    for itext in text_vals:
+        # look if the text respects the max ascii char
+        if not isinstance(itext, str):
+            message_win.append("ERROR : the {} value={} is not a text".format(\
+                field_to_mod, itext))
+            texts_valid.append(False)
+        elif len(itext) > max_ascii_char:
+            message_win.append("ERROR : the {} value={} is {} long and the max is {} ASCII"\
+                .format(field_to_mod, itext, len(itext), max_ascii_char))
+            texts_valid.append(False)
+        else:
+            try:
+                itext.encode('latin-1')
+                texts_valid.append(True)
+            except UnicodeEncodeError:
+                message_win.append("ERROR : the {} value={} can not be written in "\
+                    "latin-1".format(field_to_mod, itext))
+                texts_valid.append(False)
+    return texts_valid
+
+
 def _modify_text(val_to_mod, field_to_mod, nchan, ch_labels, message_win):
     """Modify the text label for each channel from the edf header.
         
@@ -660,9 +1397,13 @@ def _modify_text(val_to_mod, field_to_mod, nchan, ch_labels, message_win):
     else:
         message_win.append("ERROR : {} is an unexpected field".format(field_to_mod))
     
-    message_win.append("You want to modify the {} to:".format(field_to_mod))
-    for i, itext in enumerate(val_to_mod):
-        message_win.append("{} ({})\t{}".format(i, ch_labels[i], val_to_mod[i]))
+    # The value of each channel is printed only if the messages are read
+    if CEAMS_edfLog.is_enabled(message_win, CEAMS_edfLog.DEBUG):
+        CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+            "You want to modify the {} to:", field_to_mod)
+        for i, itext in enumerate(val_to_mod):
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                "{} ({})\t{}", i, ch_labels[i], val_to_mod[i])
         
     # Extract the Annotations channel if any
     if ch_labels.count('EDF Annotations'.ljust(LABELS_ASCII))>0:
@@ -675,7 +1416,8 @@ def _modify_text(val_to_mod, field_to_mod, nchan, ch_labels, message_win):
         # Print the specification info from 
         if field_to_mod == "ch_labels":
             #   https://www.edfplus.info/specs/edfplus.html#additionalspecs
-            message_win.append("-------------------------------------------------------------------\n"\
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                  "-------------------------------------------------------------------\n"\
                   " Information from edf specification\n"\
                   "-------------------------------------------------------------------\n"\
                   "The {} field offers {} ASCII characters. The standard structure "\
@@ -690,30 +1432,33 @@ def _modify_text(val_to_mod, field_to_mod, nchan, ch_labels, message_win):
                   "specify the starttime of each datarecord\n"\
                   " MAKE SURE YOU RESPECT THE MAX OF {} ASCII CHAR\n"\
                   " see : https://www.edfplus.info/specs/edftexts.html#signals\n"\
-                  "-------------------------------------------------------------------\n"\
-                      .format(field_to_mod, max_ascii_char, max_ascii_char))
+                  "-------------------------------------------------------------------\n", \
+                      field_to_mod, max_ascii_char, max_ascii_char)
         elif field_to_mod == "transducer":
-            message_win.append("-------------------------------------------------------------------\n"\
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                  "-------------------------------------------------------------------\n"\
                   " Information from edf specification\n"\
                   "-------------------------------------------------------------------\n"\
                   "The {} field offers {} ASCII characters.  It should "\
                   "specify the applied sensor, such as 'AgAgCl electrode' or 'thermistor'.\n\n"\
                   "*{} of the 'EDF Annotations' channel must be filled with spaces\n"\
                   " MAKE SURE YOU RESPECT THE MAX OF {} ASCII CHAR\n"\
-                  "-------------------------------------------------------------------\n"\
-                      .format(field_to_mod, max_ascii_char, field_to_mod, max_ascii_char))       
+                  "-------------------------------------------------------------------\n", \
+                      field_to_mod, max_ascii_char, field_to_mod, max_ascii_char)       
         elif field_to_mod == "units":
-            message_win.append("-------------------------------------------------------------------\n"\
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                  "-------------------------------------------------------------------\n"\
                   " Information from edf specification\n"\
                   "-------------------------------------------------------------------\n"\
                   "The {} field offers {} ASCII characters. ex: uV for an EEG channel.\n"\
                   "see https://www.edfplus.info/specs/edftexts.html#label_physidim"\
                   "*{} of the 'EDF Annotations' channel must be filled with spaces\n"\
                   " MAKE SURE YOU RESPECT THE MAX OF {} ASCII CHAR\n"\
-                  "-------------------------------------------------------------------\n"\
-                      .format(field_to_mod, max_ascii_char, field_to_mod, max_ascii_char))               
+                  "-------------------------------------------------------------------\n", \
+                      field_to_mod, max_ascii_char, field_to_mod, max_ascii_char)               
         elif field_to_mod == "prefiltering":
-            message_win.append("-------------------------------------------------------------------\n"\
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                  "-------------------------------------------------------------------\n"\
                   " Information from edf specification\n"\
                   "-------------------------------------------------------------------\n"\
                   "The {} field offers {} ASCII characters. Specify filter as follow:\n"\
@@ -722,19 +1467,10 @@ def _modify_text(val_to_mod, field_to_mod, nchan, ch_labels, message_win):
                   "see https://www.edfplus.info/specs/edftexts.html#additionalspecs\n"\
                   "*{} of the 'EDF Annotations' channel must be filled with spaces\n"\
                   " MAKE SURE YOU RESPECT THE MAX OF {} ASCII CHAR\n"\
-                  "-------------------------------------------------------------------\n"\
-                      .format(field_to_mod, max_ascii_char, field_to_mod, max_ascii_char))           
+                  "-------------------------------------------------------------------\n", \
+                      field_to_mod, max_ascii_char, field_to_mod, max_ascii_char)           
         
-        field_mod_ch = []
-        for itext in val_to_mod:
-            # look if the text respects the max ascii char
-            if len(itext) <= max_ascii_char:
-                field_mod_ch.append(True)
-            else:
-                field_mod_ch.append(False)
-                err_message = "ERROR : the {} value={} is {} long and the max is {} ASCII"\
-                      .format(field_to_mod, itext, len(itext), max_ascii_char)
-                message_win.append(err_message)
+        field_mod_ch = check_chan_texts(val_to_mod, field_to_mod, message_win)
         # Special case for the EDF Annotations channel
         # Make sure that the EDF Annotations channel is filled with spaces
         if field_to_mod != 'ch_labels' and annot_ch_i>-1:
@@ -786,24 +1522,29 @@ def _modify_physical_val(val_to_mod, field_to_mod, nchan, ch_labels, message_win
     """
     PHYVAL_ASCII = 8
     
-    message_win.append("You want to modify the {} to:".format(field_to_mod))
-    for i, itext in enumerate(val_to_mod):
-        message_win.append("{} ({})\t{}".format(i, ch_labels[i], val_to_mod[i]))
+    # The value of each channel is printed only if the messages are read
+    if CEAMS_edfLog.is_enabled(message_win, CEAMS_edfLog.DEBUG):
+        CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+            "You want to modify the {} to:", field_to_mod)
+        for i, itext in enumerate(val_to_mod):
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                "{} ({})\t{}", i, ch_labels[i], val_to_mod[i])
         
     # verify the nchan
     if len(val_to_mod) == nchan:
         # Print the specification info from 
         if field_to_mod == "physical_min" or field_to_mod == "physical_max":
             #   https://www.edfplus.info/specs/edfplus.html#additionalspecs
-            message_win.append("-------------------------------------------------------------------\n"\
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                  "-------------------------------------------------------------------\n"\
                   " Information from edf specification\n"\
                   "-------------------------------------------------------------------\n"\
                   "The {} field offers {} ASCII characters. Ex: -1000\n"\
                   "physical minimum and physical maximum must be different\n"\
                   " MAKE SURE YOU RESPECT THE MAX OF {} ASCII CHAR\n"\
                   " see : https://www.edfplus.info/specs/edf.html\n"\
-                  "-------------------------------------------------------------------\n"\
-                      .format(field_to_mod, PHYVAL_ASCII, PHYVAL_ASCII))           
+                  "-------------------------------------------------------------------\n", \
+                      field_to_mod, PHYVAL_ASCII, PHYVAL_ASCII)           
         
         field_mod_ch = []
         for itext in val_to_mod:
@@ -849,16 +1590,21 @@ def _modify_digital_val(val_to_mod, field_to_mod, nchan, ch_labels, message_win)
     
     field_mod = False
     
-    message_win.append("You want to modify the {} to:".format(field_to_mod))
-    for i, itext in enumerate(val_to_mod):
-        message_win.append("{} ({})\t{}".format(i, ch_labels[i], val_to_mod[i]))
+    # The value of each channel is printed only if the messages are read
+    if CEAMS_edfLog.is_enabled(message_win, CEAMS_edfLog.DEBUG):
+        CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+            "You want to modify the {} to:", field_to_mod)
+        for i, itext in enumerate(val_to_mod):
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                "{} ({})\t{}", i, ch_labels[i], val_to_mod[i])
         
     # verify the nchan
     if len(val_to_mod) == nchan:
         # Print the specification info from 
         if field_to_mod == "digital_min" or field_to_mod == "digital_max":
             #   https://www.edfplus.info/specs/edfplus.html#additionalspecs
-            message_win.append("-------------------------------------------------------------------\n"\
+            CEAMS_edfLog.log_message(message_win, CEAMS_edfLog.DEBUG, \
+                  "-------------------------------------------------------------------\n"\
                   " Information from edf specification\n"\
                   "-------------------------------------------------------------------\n"\
                   "The {} field offers {} ASCII characters. Ex: -2048\n"\
@@ -866,8 +1612,8 @@ def _modify_digital_val(val_to_mod, field_to_mod, nchan, ch_labels, message_win)
                   "digital min and max must be integer\n"\
                   " MAKE SURE YOU RESPECT THE MAX OF {} ASCII CHAR\n"\
                   " see : https://www.edfplus.info/specs/edf.html\n"\
-                  "-------------------------------------------------------------------\n"\
-                      .format(field_to_mod, DIGVAL_ASCII, DIGVAL_ASCII))           
+                  "-------------------------------------------------------------------\n", \
+                      field_to_mod, DIGVAL_ASCII, DIGVAL_ASCII)           
                 
         field_mod_ch = []
         for ichan, idigval in enumerate(val_to_mod):
@@ -926,6 +1672,7 @@ def modify_edf_header(edf_info, field_to_mod, val_to_mod, message_win):
                                 'CEAMS: Startdate 01-Jan-2000 x x x x ')    
     
     """    
+    validate_span = CEAMS_edfLog.span(message_win, 'validate', field=field_to_mod)
     field_mod = False
     
     #-------------------------------------------------------------------------
@@ -1048,14 +1795,16 @@ def modify_edf_header(edf_info, field_to_mod, val_to_mod, message_win):
         
     # Modify the duration of a data record, in seconds
     elif field_to_mod == "record_length_sec":
-        err_message = "ERROR : You can not change for now the {}, use the pyedflib to modify the edf data"\
-              .format(field_to_mod)
+        err_message = "ERROR : You can not change the {} in the header, a new file "\
+            "is written with the data records merged or split "\
+                "(CEAMS_edfRewrite.reblock_edf_records)".format(field_to_mod)
         message_win.append(err_message)
     
     # Modify the number of signals (ns) in data record
     elif field_to_mod == "nchan":
-        err_message = "ERROR : You can not change for now the {}, use the pyedflib to modify the edf data"\
-              .format(field_to_mod)
+        err_message = "ERROR : You can not change the {} in the header, a new file "\
+            "is written with the channels selected (File -> Select Channels, "\
+                "CEAMS_edfRewrite.select_edf_chans)".format(field_to_mod)
         message_win.append(err_message)
     
     #-------------------------------------------------------------------------
@@ -1161,19 +1910,191 @@ def modify_edf_header(edf_info, field_to_mod, val_to_mod, message_win):
                 edf_info[field_to_mod] = val_to_mod
                 field_mod = True
                 
+    # The version defines the format of the samples (edf or bdf)
+    elif field_to_mod == "version":
+        err_message = "ERROR : You can not change the {}, it defines the "\
+            "format of the samples (edf or bdf)".format(field_to_mod)
+        message_win.append(err_message)
+
     # You cannot modify the number of samples in each data record for each channel
     elif field_to_mod == "n_samps_record":
-        err_message = "ERROR : You can not change for now the {}, "\
-            "use the pyedflib to modify the edf data".format(field_to_mod)
+        err_message = "ERROR : You can not change the {} in the header, a new file "\
+            "is written with the channels resampled "\
+                "(CEAMS_edfRewrite.resample_edf_chans)".format(field_to_mod)
         message_win.append(err_message)
             
     # Return the modified edf_info otherwise False
+    validate_span.end()
     return field_mod
     
     
+class EdfDataMap():
+    """Lazy access to the edf data records of an EDF, EDF+, BDF or BDF+ file.
+    The data records are memory mapped (numpy.memmap) then only the 
+    samples requested are read from the file.  The header must have been
+    read with read_edf_header.
+    
+    The data records are viewed as an array of bytes (n_records x 
+    samp_nbytes*n_samps_tot) and the bytes of each channel are a strided view
+    (chan_bytes).  For an edf file, the samples of each channel are a strided 
+    view (n_records x n_samps_record[chan]), for a bdf file the 24-bit 
+    samples of the channel are decoded in int32 (decode_bdf_samples).
+    
+    Usage : 
+        edf_map = EdfDataMap(your_file.edf, edf_info, message_win)
+        # 30 s of the first channel in physical values 
+        chan_data = edf_map.chan_time(0, 3600, 30, physical=True)
+        edf_map.close()
+    """
+    def __init__(self, fname, edf_info, message_win):
+        self.fname = fname
+        self.message_win = message_win
+        self.n_samps_record = np.array(edf_info.get('n_samps_record'), dtype=int)
+        self.record_length_sec = edf_info.get('record_length_sec')
+        self.ch_labels = [label.strip() for label in edf_info.get('ch_labels')]
+        self.is_bdf = is_bdf(edf_info)
+        self.samp_nbytes = samp_nbytes(edf_info)
+        self.hdr_nbytes = int(edf_info.get('hdr_nbytes'))
+        # To compute the offset of each channel in the datarecord
+        self.chan_offset = np.concatenate(([0], np.cumsum(self.n_samps_record))).astype(int)
+        n_samps_tot = int(self.chan_offset[-1])
+        
+        # Physical scaling : physical = gain * digital + offset
+        digital_range = np.array(edf_info.get('digital_max'), dtype=float) \
+            - np.array(edf_info.get('digital_min'), dtype=float)
+        physical_range = np.array(edf_info.get('physical_max'), dtype=float) \
+            - np.array(edf_info.get('physical_min'), dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.gain = np.where(digital_range != 0, physical_range / digital_range, 1.0)
+        self.offset = np.array(edf_info.get('physical_max'), dtype=float) \
+            - self.gain * np.array(edf_info.get('digital_max'), dtype=float)
+        
+        # The number of records is limited by the file size
+        self.n_records = int(edf_info.get('n_records_real'))
+        if edf_info.get('n_records') != self.n_records:
+            message_win.append('WARNING : {} data records are mapped from {} '\
+                '(header : {})'.format(self.n_records, fname, edf_info.get('n_records')))
+        if self.n_records > 0 and n_samps_tot > 0:
+            self.data_bytes = np.memmap(fname, dtype=np.uint8, mode='r', \
+                offset=self.hdr_nbytes, \
+                    shape=(self.n_records, self.samp_nbytes*n_samps_tot))
+        else:
+            self.data_bytes = np.zeros((0, self.samp_nbytes*n_samps_tot), dtype=np.uint8)
+        # The 16-bit samples of an edf file are viewed without any copy
+        if not self.is_bdf:
+            self.data_records = self.data_bytes.view('<i2')
+            
+            
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
+        
+    def close(self):
+        """Release the memory map of the file."""
+        self.data_bytes = np.zeros((0, self.samp_nbytes*int(self.chan_offset[-1])), \
+                                   dtype=np.uint8)
+        if not self.is_bdf:
+            self.data_records = self.data_bytes.view('<i2')
+        
+        
+    def chan_index(self, chan):
+        """Return the index of the channel "chan" (index or label)."""
+        if isinstance(chan, str):
+            return self.ch_labels.index(chan.strip())
+        return int(chan)
+        
+        
+    def chan_byte_slice(self, chan):
+        """Return the slice of the bytes of the channel "chan" in a data record."""
+        chan_i = self.chan_index(chan)
+        return slice(self.samp_nbytes*int(self.chan_offset[chan_i]), \
+                     self.samp_nbytes*int(self.chan_offset[chan_i+1]))
+        
+        
+    def chan_bytes(self, chan, rec_start=0, rec_stop=None):
+        """Return the view of the bytes (n_records x samp_nbytes*n_samps_record)
+        of the channel "chan" for the data records [rec_start, rec_stop[ 
+        (ex. the TALs of an annotation channel).  No byte is read from the 
+        file until the view is used.
+        """
+        return self.data_bytes[rec_start:rec_stop, self.chan_byte_slice(chan)]
+        
+        
+    def map_records(self, rec_start, rec_stop):
+        """Return the bytes (n_records x record_nbytes) of the data records 
+        [rec_start, rec_stop[ in their own memory map.  The pages read are 
+        released when the block is deleted, then a pass on the whole file by 
+        blocks keeps the memory used bounded by the size of a block.
+        """
+        rec_stop = min(rec_stop, self.n_records)
+        if rec_stop <= rec_start or self.data_bytes.shape[1] == 0:
+            return self.data_bytes[0:0]
+        record_nbytes = self.data_bytes.shape[1]
+        return np.memmap(self.fname, dtype=np.uint8, mode='r', \
+            offset=self.hdr_nbytes + rec_start*record_nbytes, \
+                shape=(rec_stop - rec_start, record_nbytes))
+        
+        
+    def chan_records(self, chan, rec_start=0, rec_stop=None):
+        """Return the samples (n_records x n_samps_record) of the channel "chan" 
+        for the data records [rec_start, rec_stop[.  For an edf file, it is a 
+        view and no sample is read from the file until the view is used, for 
+        a bdf file only the bytes of these samples are read and decoded.
+        """
+        chan_i = self.chan_index(chan)
+        if self.is_bdf:
+            return decode_bdf_samples(self.chan_bytes(chan_i, rec_start, rec_stop))
+        return self.data_records[rec_start:rec_stop, \
+            self.chan_offset[chan_i]:self.chan_offset[chan_i+1]]
+        
+        
+    def chan_data(self, chan, rec_start=0, rec_stop=None, physical=False):
+        """Return the signal of the channel "chan" for the data records 
+        [rec_start, rec_stop[ in digital values (int) or in physical values 
+        (float) if physical is True.  Only these samples are read from the file.
+        """
+        chan_i = self.chan_index(chan)
+        return self._scale(chan_i, self.chan_records(chan_i, rec_start, rec_stop)\
+                           .reshape(-1), physical)
+    
+    
+    def chan_time(self, chan, start_sec, duration_sec, physical=False):
+        """Return the signal of the channel "chan" from "start_sec" for 
+        "duration_sec" seconds in digital values (int) or in physical values 
+        (float) if physical is True.  Only the data records including
+        the requested samples are read from the file.
+        """
+        chan_i = self.chan_index(chan)
+        n_samps = self.n_samps_record[chan_i]
+        samp_rate = n_samps / self.record_length_sec
+        samp_start = max(int(round(start_sec*samp_rate)), 0)
+        samp_stop = min(int(round((start_sec+duration_sec)*samp_rate)), \
+                        self.n_records*n_samps)
+        if samp_stop <= samp_start:
+            return self._scale(chan_i, self.chan_records(chan_i, 0, 0).reshape(-1), physical)
+        rec_start = samp_start // n_samps
+        rec_stop = (samp_stop - 1) // n_samps + 1
+        chan_data = self.chan_records(chan_i, rec_start, rec_stop).reshape(-1)
+        return self._scale(chan_i, chan_data[samp_start-rec_start*n_samps:\
+                                             samp_stop-rec_start*n_samps], physical)
+    
+    
+    # Internal function to convert the digital values in physical values.
+    def _scale(self, chan_i, chan_data, physical):
+        if physical:
+            return np.asarray(chan_data) * self.gain[chan_i] + self.offset[chan_i]
+        return np.array(chan_data)
+
+
 def extract_edf_data(fname, edf_info, message_win):    
-    """Read the data from EDF+ and convert it to a list of signals (one per channel)
-    in digital value (int).  The file must have been already read for the info header.
+    """Read the data from EDF+ (or BDF+) and convert it to a list of signals 
+    (one per channel) in digital value (int).  The file must have been already 
+    read for the info header.
+    Use EdfDataMap to read only some channels or some data records.
     
     Parameters
     -----------
@@ -1184,38 +2105,19 @@ def extract_edf_data(fname, edf_info, message_win):
    
     Returns
     -----------
-    edf_data : bytes
-        the whole chunk of data in binary format
+    chan_data_lst : list of numpy array
+        the signal of each channel in digital values
         
-    Usage : edf_data = extract_edf_data(your_file.edf, edf_info, message_win)    
+    Usage : chan_data_lst = extract_edf_data(your_file.edf, edf_info, message_win)    
     
     """    
-    # https://numpy.org/doc/stable/reference/generated/numpy.fromfile.html
-    # type should be based on the digital max- digital min
-    data_chunk_int = np.fromfile(fname, dtype='int16', offset=edf_info.get('hdr_nbytes'))
-    # Total number of samples in a data record
-    tot_smp_record = np.sum(edf_info.get('n_samps_record'))
-    # Total number of data records
-    records_count = edf_info.get('n_records')
-    # To compute the offset of each channel in the datarecord
-    cum_samps_rec_count = np.cumsum(edf_info.get('n_samps_record'))
-    cum_samps_rec_count = np.concatenate((np.zeros(1),cum_samps_rec_count), axis=0)
-    cum_samps_rec_count = cum_samps_rec_count.astype(int)
-    if tot_smp_record*records_count == len(data_chunk_int):
-        data_per_record = data_chunk_int.reshape((records_count,tot_smp_record))
-        chan_data_lst = []
-        for chan_index in range(edf_info.get('nchan')):
-            cur_samps_rec_count = edf_info.get('n_samps_record')[chan_index]
-            # Preallocation
-            cur_chan_data = np.zeros(records_count*cur_samps_rec_count)
-            # Extract the data record for the current channel
-            cur_chan_data = data_per_record[0:,cum_samps_rec_count[chan_index]:\
-                        cum_samps_rec_count[chan_index] + cur_samps_rec_count]
-            # Flat to have all the data record concatenated
-            cur_chan_data = cur_chan_data.flatten()
-            chan_data_lst.append(cur_chan_data)
-    else:
+    if edf_info.get('n_records') != edf_info.get('n_records_real'):
         message_win.append('ERROR : file dimension does not respect the edf header')
+    chan_data_lst = []
+    with EdfDataMap(fname, edf_info, message_win) as edf_map:
+        for chan_index in range(edf_info.get('nchan')):
+            chan_data_lst.append(edf_map.chan_data(chan_index))
+    return chan_data_lst
     
 
 def main():
@@ -1387,12 +2289,10 @@ def main():
     
     # If the field was modified sucessfully
     if hdr_mod:
-        # Read edf data
-        edf_data = read_edf_data(fname, edf_info_mod.get('hdr_nbytes'), message_win)
-        # Write the edf file
+        # Write the edf file (edf data is copied by chunks)
         print("\nAttempt to write {} into {}_mod{}...".format(field_name, \
                                                             file_name, file_ext))
-        write_edf_file(fname_to_write, edf_info_mod, edf_data, message_win)
+        write_edf_file_from(fname_to_write, edf_info_mod, fname, message_win)
         print("{}_mod{} is written with the field {}".format(file_name, \
                                                               file_ext, field_name))        
     else:
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log of the messages and the timing spans of the edf functions.
+An EdfLog is used as the message_win list of the library (append, extend,
+iteration, len...) :
+    -each message has a level (DEBUG, INFO, WARNING, ERROR), the messages
+     below the level of the log are dropped
+    -the message is formatted only when it is read (log_message keeps the
+     format and its arguments), then the information of the edf specification
+     printed by the _modify_* functions costs nothing in the batch jobs
+    -the timing spans (open, parse, validate, write...) are summed in counters
+     and can be written in a trace file (json of the Chrome trace event
+     format, opened with chrome://tracing or https://ui.perfetto.dev)
+The functions log_message, is_enabled and span accept an EdfLog or a plain
+list (the GUI) : a plain list keeps all the messages formatted and the spans
+are not timed.
+
+Usage :
+    message_win = EdfLog(level=INFO, trace=True)
+    edf_info = CEAMS_edfLib.read_edf_header(your_file.edf, message_win)
+    print(message_win.counters())
+    message_win.write_trace('edfTrace.json')
+
+Created on Sun Oct 18 17:05:31 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import json
+import os
+import threading
+import time
+
+# Levels of the messages (same values as the logging module)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+
+# Internal function to find the level of a message appended as a str.
+def _message_level(message):
+    if message.startswith('ERROR'):
+        return ERROR
+    if message.startswith('WARNING'):
+        return WARNING
+    return INFO
+
+
+class EdfSpan():
+    """Timing span of a phase (ex. 'parse'), ended by end() or by the end of
+    the with block.  The span of a plain list is not timed."""
+    __slots__ = ('log', 'name', 'args', 'start_sec', 'start_ts')
+
+    def __init__(self, log, name, args):
+        self.log = log
+        self.name = name
+        self.args = args
+        if log is not None:
+            self.start_ts = time.time()
+            self.start_sec = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
+
+    def end(self):
+        """End the span (once) and add its duration to the log."""
+        if self.log is not None:
+            self.log._add_span(self, time.perf_counter() - self.start_sec)
+            self.log = None
+
+
+class EdfLog():
+    """Messages and timing spans of the edf functions, used as message_win.
+
+    Parameters
+    -----------
+    level : int, optional
+        Level of the messages kept (DEBUG, INFO, WARNING or ERROR).
+    trace : Bool, optional
+        True to keep each span for the trace file (the counters are always
+        kept).
+    """
+
+    def __init__(self, level=DEBUG, trace=False):
+        self.level = level
+        self.trace = trace
+        # (level, format, arguments) of each message, formatted when read
+        self.records = []
+        # name : [count, total_sec, max_sec] of the spans
+        self.span_counters = {}
+        # Events of the trace (Chrome trace event format)
+        self.trace_events = []
+        self._lock = threading.Lock()
+
+    def log(self, level, message_fmt, *args):
+        """Add a message, formatted (message_fmt.format(*args)) only when it
+        is read."""
+        if level >= self.level:
+            self.records.append((level, message_fmt, args))
+
+    def debug(self, message_fmt, *args):
+        self.log(DEBUG, message_fmt, *args)
+
+    def info(self, message_fmt, *args):
+        self.log(INFO, message_fmt, *args)
+
+    def warning(self, message_fmt, *args):
+        self.log(WARNING, message_fmt, *args)
+
+    def error(self, message_fmt, *args):
+        self.log(ERROR, message_fmt, *args)
+
+    def append(self, message):
+        """Add a message already formatted (message_win.append), the level is
+        ERROR or WARNING if the message starts with it, INFO otherwise."""
+        level = _message_level(message)
+        if level >= self.level:
+            self.records.append((level, message, None))
+
+    def extend(self, messages):
+        """Add the messages of a list or of an EdfLog (ex. the log of a worker),
+        the spans of an EdfLog are added too."""
+        if not isinstance(messages, EdfLog):
+            for message in messages:
+                self.append(message)
+            return
+        self.records.extend([record for record in messages.records \
+                             if record[0] >= self.level])
+        with self._lock:
+            for name, (count, total_sec, max_sec) in messages.span_counters.items():
+                counter = self.span_counters.setdefault(name, [0, 0.0, 0.0])
+                counter[0] += count
+                counter[1] += total_sec
+                counter[2] = max(counter[2], max_sec)
+            if self.trace:
+                self.trace_events.extend(messages.trace_events)
+
+    def span(self, name, **args):
+        """Return a timing span of the phase "name" (with block or end())."""
+        return EdfSpan(self, name, args)
+
+    def _add_span(self, span, duration_sec):
+        with self._lock:
+            counter = self.span_counters.setdefault(span.name, [0, 0.0, 0.0])
+            counter[0] += 1
+            counter[1] += duration_sec
+            counter[2] = max(counter[2], duration_sec)
+            if self.trace:
+                self.trace_events.append({'name': span.name, 'cat': 'edf', 'ph': 'X', \
+                    'ts': span.start_ts*1e6, 'dur': duration_sec*1e6, \
+                    'pid': os.getpid(), 'tid': threading.get_ident(), 'args': span.args})
+
+    def messages(self, level=DEBUG):
+        """Return the messages (formatted) of level "level" and above."""
+        return [_format_record(record) for record in self.records if record[0] >= level]
+
+    def counters(self):
+        """Return the counters of the spans and of the messages :
+        {'spans': {name: {count, total_sec, max_sec}}, 'messages': {level: count}}"""
+        span_counters = {name: {'count': count, 'total_sec': total_sec, 'max_sec': max_sec} \
+                         for name, (count, total_sec, max_sec) in self.span_counters.items()}
+        message_counters = {}
+        for record in self.records:
+            level_name = LEVEL_NAMES.get(record[0], str(record[0]))
+            message_counters[level_name] = message_counters.get(level_name, 0) + 1
+        return {'spans': span_counters, 'messages': message_counters}
+
+    def format_counters(self):
+        """Return the counters of the spans as lines of text (one per span)."""
+        return ['{:10s} {:8d} spans {:10.3f} s total {:10.3f} ms mean {:10.3f} ms max'.format(\
+            name, count, total_sec, 1000*total_sec/count, 1000*max_sec) \
+                for name, (count, total_sec, max_sec) in self.span_counters.items()]
+
+    def write_trace(self, fname):
+        """Write the spans in the trace file "fname" (Chrome trace event format)."""
+        with open(fname, 'w') as fid:
+            json.dump({'traceEvents': self.trace_events, 'displayTimeUnit': 'ms'}, fid)
+
+    def __iter__(self):
+        return (_format_record(record) for record in self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_format_record(record) for record in self.records[index]]
+        return _format_record(self.records[index])
+
+    def __getstate__(self):
+        # The lock is not sent to the parent process
+        return {key: val for key, val in self.__dict__.items() if key != '_lock'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# Internal function to format the message of a record.
+def _format_record(record):
+    level, message_fmt, args = record
+    if not args:
+        return message_fmt
+    return message_fmt.format(*args)
+
+
+def log_message(message_win, level, message_fmt, *args):
+    """Add a message to message_win (EdfLog or list), formatted only when it
+    is read for an EdfLog.
+
+    Usage : log_message(message_win, DEBUG, 'You want to modify {} to {}', field, val)
+    """
+    if isinstance(message_win, EdfLog):
+        message_win.log(level, message_fmt, *args)
+    else:
+        message_win.append(message_fmt.format(*args) if args else message_fmt)
+
+
+def is_enabled(message_win, level):
+    """Return True if the messages of "level" are kept by message_win
+    (always True for a list)."""
+    return not isinstance(message_win, EdfLog) or level >= message_win.level
+
+
+def span(message_win, name, **args):
+    """Return a timing span of the phase "name" (with block or end()), the
+    span of a list is not timed.
+
+    Usage :
+        with span(message_win, 'write', fname=fname):
+            ...
+    """
+    if isinstance(message_win, EdfLog):
+        return EdfSpan(message_win, name, args)
+    return _NO_SPAN
+
+
+# Span of the plain lists (not timed)
+_NO_SPAN = EdfSpan(None, None, None)
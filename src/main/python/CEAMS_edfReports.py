@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reports (csv files) on the edf headers of many edf files.
+These reports are generated from the GUI (Generate menu) and from the 
+batch scanner (CEAMS_edfScan.py).
+    -EDF header Report : edfHdrRep.csv
+    -Channel Count Report : chanCountRep.csv
+    -Complete Channels reports : EdfHdr_RW_chans_rep/*_rep.csv
+    -Data Validation Report : edfDataRep.csv (CEAMS_edfValid)
+    -Columnar tables : edfHdrTable and edfChanTable (.parquet or .feather)
+    -Bulk Edit Report : edfBulkRep.csv (CEAMS_edfBulk)
+The channel reports are built from a single channel table (build_chan_table),
+one row per channel of each edf file.  The columnar tables (file table and
+channel table) keep the type of each column, pyarrow is needed to write them.
+
+Created on Sat Oct 17 10:12:31 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import CEAMS_edfLib
+import numpy as np
+import os
+import pandas as pd
+
+# Extension of the columnar tables for each format
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'feather': '.feather'}
+
+
+def build_chan_table(edf_hdr_list, edf_file_names):
+    """Build the channel table : one row per channel of each edf file
+    (long format) with the channel fields of the edf header.  The table is
+    built in one pass and shared by the channel reports.
+    
+    Parameters
+    -----------
+    edf_hdr_list : list of dict
+        edf_info of each edf file (from read_edf_header)
+    edf_file_names : list of str
+        file name of each edf file (same order as edf_hdr_list)
+        
+    Returns
+    -----------
+    chan_table : pandas.DataFrame
+        columns : file_i (index of the edf file), label (channel label 
+        stripped), filename and each channel field (ch_labels, transducer, ...)
+        
+    Usage : chan_table = build_chan_table(edf_hdr_list, edf_file_names)
+    """
+    # The channel fields (list or array) in the order of the edf header
+    chan_fields = []
+    for edf_hdr_dict in edf_hdr_list:
+        for field_key, field_val in edf_hdr_dict.items():
+            if isinstance(field_val, (list, np.ndarray)) and field_key not in chan_fields:
+                chan_fields.append(field_key)
+    n_chans = np.array([len(edf_hdr_dict.get('ch_labels')) for edf_hdr_dict \
+                        in edf_hdr_list], dtype=np.int64)
+    chan_table = {'file_i': np.repeat(np.arange(len(edf_hdr_list)), n_chans), 
+                  'label': [label.strip() for edf_hdr_dict in edf_hdr_list \
+                            for label in edf_hdr_dict.get('ch_labels')],
+                  'filename': np.repeat(np.array(edf_file_names, dtype=object), n_chans)}
+    for field_key in chan_fields:
+        field_vals = [_chan_values(edf_hdr_dict.get(field_key), n_chan) for \
+                      edf_hdr_dict, n_chan in zip(edf_hdr_list, n_chans)]
+        if len(field_vals) > 0:
+            chan_table[field_key] = np.concatenate(field_vals)
+        else:
+            chan_table[field_key] = []
+    return pd.DataFrame(chan_table)
+
+
+def build_hdr_table(edf_hdr_list, edf_file_names):
+    """Build the file table : one row per edf file with the fields of the
+    edf header that are not specific to a channel and the start of the 
+    recording (datetime, NaT if the startdate or starttime is not valid).
+    
+    Parameters
+    -----------
+    edf_hdr_list : list of dict
+        edf_info of each edf file (from read_edf_header)
+    edf_file_names : list of str
+        file name of each edf file (same order as edf_hdr_list)
+        
+    Returns
+    -----------
+    hdr_table : pandas.DataFrame
+        columns : filename, each field of the file (patient_id, ...) and start
+        
+    Usage : hdr_table = build_hdr_table(edf_hdr_list, edf_file_names)
+    """
+    # The fields of the file (not list or array) in the order of the edf header
+    hdr_fields = []
+    for edf_hdr_dict in edf_hdr_list:
+        for field_key, field_val in edf_hdr_dict.items():
+            if not isinstance(field_val, (list, np.ndarray)) and field_key not in hdr_fields:
+                hdr_fields.append(field_key)
+    hdr_table = {'filename': pd.Series(list(edf_file_names), dtype=object)}
+    for field_key in hdr_fields:
+        # The type of the column is inferred from all the files
+        hdr_table[field_key] = pd.Series([edf_hdr_dict.get(field_key) for \
+                                          edf_hdr_dict in edf_hdr_list]).infer_objects()
+    hdr_table['start'] = pd.to_datetime(pd.Series([CEAMS_edfLib.edf_start_datetime(\
+        edf_hdr_dict) for edf_hdr_dict in edf_hdr_list], dtype=object))
+    return pd.DataFrame(hdr_table)
+
+
+# Internal function to get the values of a channel field for n_chan channels.
+# A missing value is NaN (as in a DataFrame built from dicts).
+def _chan_values(field_val, n_chan):
+    if field_val is None:
+        return np.full(n_chan, np.nan)
+    if isinstance(field_val, list):
+        list_val = field_val
+        field_val = np.empty(len(list_val), dtype=object)
+        field_val[:] = list_val
+    if len(field_val) < n_chan:
+        missing = np.full(n_chan - len(field_val), np.nan)
+        return np.concatenate([np.asarray(field_val, dtype=object), missing])
+    return field_val[:n_chan]
+
+
+def write_chan_count(edf_hdr_list, directory_name, message_win, chan_table=None):
+    """Write the channel count report : the occurrence of each channel label
+    through the edf files.
+    
+    Parameters
+    -----------
+    edf_hdr_list : list of dict
+        edf_info of each edf file (from read_edf_header)
+    directory_name : str
+        Path of the directory to save the report.
+    chan_table : pandas.DataFrame, optional
+        channel table of edf_hdr_list (from build_chan_table)
+        
+    Usage : write_chan_count(edf_hdr_list, directory_name, message_win)
+    """
+    if chan_table is None:
+        chan_table = build_chan_table(edf_hdr_list, [''] * len(edf_hdr_list))
+    # Count the occurrence of each channel labels (sorted by label)
+    occur_count = chan_table['label'].value_counts(sort=False).sort_index()
+    # Create a dataframe from the count
+    df = occur_count.to_frame()
+    # Write the DataFrame into a cvs file
+    chanCount_rep_fname = directory_name + "/chanCountRep.csv"  
+    # Write the DataFrame into a cvs file
+    df.to_csv(chanCount_rep_fname, index_label='channel', header=['count'])        
+    # Plot debug message
+    message_win.append( "Channel Count Report is written to {}".\
+                    format(chanCount_rep_fname))
+        
+        
+def write_chan_reports(edf_hdr_list, edf_file_names, directory_name, message_win, \
+                       chan_table=None):
+    """Write the channels reports : one report per channel with the channel
+    fields of each edf file including this channel.
+    
+    Parameters
+    -----------
+    edf_hdr_list : list of dict
+        edf_info of each edf file (from read_edf_header)
+    edf_file_names : list of str
+        file name of each edf file (same order as edf_hdr_list)
+    directory_name : str
+        Path of the directory to save the reports 
+        (saved in the subfolder EdfHdr_RW_chans_rep).
+    chan_table : pandas.DataFrame, optional
+        channel table of edf_hdr_list (from build_chan_table)
+        
+    Usage : write_chan_reports(edf_hdr_list, edf_file_names, directory_name, message_win)
+    """
+    # Create a subfolder to save all the reports if it does not exist
+    if not os.path.exists(directory_name + "/EdfHdr_RW_chans_rep"):
+        os.mkdir(directory_name + "/EdfHdr_RW_chans_rep")
+    
+    if chan_table is None:
+        chan_table = build_chan_table(edf_hdr_list, edf_file_names)
+    # Only the first channel with a label is reported for each edf file
+    chan_table = chan_table.drop_duplicates(['file_i', 'label'])
+    report_cols = [col for col in chan_table.columns if col not in ('file_i', 'label')]
+    
+    # For each channel label (the edf files are kept in the same order)
+    for chan_label, chan_rows in chan_table.groupby('label', sort=True):
+        # Write the current channel report
+        dp = chan_rows[report_cols].reset_index(drop=True)
+        # Write the DataFrame into a cvs file
+        chan_reps_filen = directory_name + "/EdfHdr_RW_chans_rep/" + \
+            chan_label + "_rep.csv"
+        dp.to_csv(chan_reps_filen)
+        
+    # Plot debug message
+    message_win.append( "Channels header reports are written to {}".\
+                    format(directory_name + "/EdfHdr_RW_chans_rep/")) 
+    
+        
+def write_hdr_rep(edf_hdr_list, edf_file_names, directory_name, message_win):
+    """Write the edf header report : all the edf fields (channel fields 
+    excluded) of each edf file.
+    
+    Parameters
+    -----------
+    edf_hdr_list : list of dict
+        edf_info of each edf file (from read_edf_header)
+    edf_file_names : list of str
+        file name of each edf file (same order as edf_hdr_list)
+    directory_name : str
+        Path of the directory to save the report.
+        
+    Usage : write_hdr_rep(edf_hdr_list, edf_file_names, directory_name, message_win)
+    """
+    # Create an empty list of dicts (to extract only single field)
+    # A single field does not include fields specific to channels (no array)
+    edf_hdr_s_all = []
+    # Loop through the dicts of loaded files
+    file_i = 0
+    for edf_hdr_dict in edf_hdr_list:
+        # Dict of single field
+        # Add the filename into the dict
+        edf_hdr_single = {'filename': edf_file_names[file_i]}
+        for field_key, field_val in edf_hdr_dict.items():
+            if isinstance(field_val, str) or isinstance(field_val, int) or \
+                isinstance(field_val, float):
+                    # Construct a dict with only single values
+                    # one edf_hdr_single dist per edf file
+                    edf_hdr_single.update({field_key: field_val})
+        # Add the single dict into a list
+        edf_hdr_s_all.append(edf_hdr_single)
+        file_i +=1
+    # Create a dataframe from the list of dicts
+    dp = pd.DataFrame(edf_hdr_s_all)
+    # Write the DataFrame into a cvs file
+    hdr_rep_fname = directory_name + "/edfHdrRep.csv"
+    dp.to_csv(hdr_rep_fname)
+    # Plot debug message
+    message_win.append( "EDF header Report is written to {}".format(hdr_rep_fname)) 
+
+
+def write_data_rep(data_valid_list, edf_file_names, directory_name, message_win):
+    """Write the data validation report : clipping, out of range and flatline
+    of each channel of each edf file (one row per channel).
+    
+    Parameters
+    -----------
+    data_valid_list : list of list of dict
+        result of CEAMS_edfValid.validate_edf_data for each edf file
+    edf_file_names : list of str
+        file name of each edf file (same order as data_valid_list)
+    directory_name : str
+        Path of the directory to save the report.
+        
+    Usage : write_data_rep(data_valid_list, edf_file_names, directory_name, message_win)
+    """
+    n_chans = [len(chan_valid_lst) for chan_valid_lst in data_valid_list]
+    dp = pd.DataFrame([chan_valid for chan_valid_lst in data_valid_list \
+                       for chan_valid in chan_valid_lst])
+    dp.insert(0, 'filename', np.repeat(np.array(edf_file_names, dtype=object), n_chans))
+    # Write the DataFrame into a cvs file
+    data_rep_fname = directory_name + "/edfDataRep.csv"
+    dp.to_csv(data_rep_fname)
+    # Plot debug message
+    message_win.append( "Data Validation Report is written to {}".format(data_rep_fname))
+
+
+def write_bulk_rep(bulk_changes, directory_name, message_win):
+    """Write the bulk edit report (diff) : one row per modification of a
+    field (of a channel) of an edf file.
+    
+    Parameters
+    -----------
+    bulk_changes : list of tuple
+        filename, field, channel, old value, new value and written of each
+        modification (CEAMS_edfBulk.bulk_edit)
+    directory_name : str
+        Path of the directory to save the report.
+        
+    Usage : write_bulk_rep(bulk_changes, directory_name, message_win)
+    """
+    dp = pd.DataFrame(bulk_changes, columns=['filename', 'field', 'channel', \
+                                             'old', 'new', 'written'])
+    # Write the DataFrame into a cvs file
+    bulk_rep_fname = directory_name + "/edfBulkRep.csv"
+    dp.to_csv(bulk_rep_fname)
+    # Plot debug message
+    message_win.append( "Bulk Edit Report is written to {}".format(bulk_rep_fname))
+
+
+def write_columnar_rep(edf_hdr_list, edf_file_names, directory_name, message_win, \
+                       chan_table=None, file_format='parquet'):
+    """Write the columnar tables : the file table (build_hdr_table) and the
+    channel table (build_chan_table) of all the edf files, in two files
+    (edfHdrTable and edfChanTable) that keep the type of each column.
+    The optional package pyarrow is needed.
+    
+    Parameters
+    -----------
+    edf_hdr_list : list of dict
+        edf_info of each edf file (from read_edf_header)
+    edf_file_names : list of str
+        file name of each edf file (same order as edf_hdr_list)
+    directory_name : str
+        Path of the directory to save the tables.
+    chan_table : pandas.DataFrame, optional
+        channel table of edf_hdr_list (from build_chan_table)
+    file_format : str, optional
+        'parquet' (default) or 'feather'
+        
+    Usage : write_columnar_rep(edf_hdr_list, edf_file_names, directory_name, message_win)
+    """
+    if file_format not in COLUMNAR_FORMATS:
+        message_win.append("ERROR : {} is not a columnar format ({})".format(\
+            file_format, ', '.join(COLUMNAR_FORMATS)))
+        return
+    hdr_table = build_hdr_table(edf_hdr_list, edf_file_names)
+    if chan_table is None:
+        chan_table = build_chan_table(edf_hdr_list, edf_file_names)
+    hdr_table_fname = directory_name + "/edfHdrTable" + COLUMNAR_FORMATS[file_format]
+    chan_table_fname = directory_name + "/edfChanTable" + COLUMNAR_FORMATS[file_format]
+    try:
+        for table, table_fname in ((hdr_table, hdr_table_fname), \
+                                   (chan_table, chan_table_fname)):
+            if file_format == 'feather':
+                table.to_feather(table_fname)
+            else:
+                table.to_parquet(table_fname, index=False)
+    except ImportError:
+        message_win.append("ERROR : the {} tables could not be written, the package "\
+                           "pyarrow is needed (pip install pyarrow)".format(file_format))
+        return
+    # Plot debug message
+    message_win.append( "Columnar tables are written to {} and {}".format(\
+        hdr_table_fname, chan_table_fname))
@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rewriter of the data records of edf files : the fields of the header that
+define the data records (nchan, ...) can not be modified in place, a new
+edf file is written from the edf file loaded.
+    -select_edf_chans : the channels selected (subset and/or reordered)
+    -reblock_edf_records : the data records merged or split to a new
+     duration (record_length_sec), the timekeeping TALs are written again
+    -resample_edf_chans : the channels selected resampled to a new sampling
+     rate (n_samps_record), polyphase filter applied by blocks of data 
+     records (PolyphaseResampler), one channel per process
+
+The source file is processed by blocks of data records, each block is
+memory mapped (EdfDataMap.map_records) and the bytes of each channel are
+copied from strided views of the block, then the memory used does not
+depend on the size of the file.
+The bytes of the samples are copied as is, the edf and bdf files are both
+supported.
+
+Usage :
+    select_edf_chans(your_file.edf, edf_info, ['EEG C3-A2', 'EEG C4-A1'], new_file.edf, message_win)
+    reblock_edf_records(your_file.edf, edf_info, 1, new_file.edf, message_win)
+    resample_edf_chans(your_file.edf, edf_info, 256, new_file.edf, message_win)
+    python CEAMS_edfRewrite.py your_file.edf new_file.edf --chans "EEG C3-A2,EEG C4-A1"
+    python CEAMS_edfRewrite.py your_file.edf new_file.edf --record-sec 1
+    python CEAMS_edfRewrite.py your_file.edf new_file.edf --rate 256 -j 8
+
+Created on Sun Oct 18 19:12:08 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import argparse
+import CEAMS_edfAnnot
+import CEAMS_edfLib
+import CEAMS_edfLog
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fractions import Fraction
+import numpy as np
+import os
+import sys
+
+# Number of bytes of the data records read at once
+REWRITE_BLOCK_NBYTES = 16*1024*1024
+# Largest denominator of the ratio of the durations of the data records
+#   (ex. 0.1 s to 1 s is 10/1)
+RECORD_RATIO_MAX_DEN = 1000000
+# Number of decimals of the onsets written in the TALs
+TAL_ONSET_DECIMALS = 9
+# Anti-aliasing filter of the resampling : half length (in samples of the 
+#   slowest of the two rates) and beta of the Kaiser window
+RESAMPLE_HALF_LEN = 10
+RESAMPLE_KAISER_BETA = 5.0
+
+
+def select_edf_chans(fname_src, edf_info, chans, fname, message_win, \
+                     progress_callback=None):
+    """Write the edf file "fname" with only the channels "chans" of the edf
+    file "fname_src", in the order of "chans".  The data records are copied
+    by blocks, the bytes of each channel selected are copied from a strided
+    view of the memory mapped block.  The annotation channel should be
+    selected to keep an EDF+ file, otherwise the reserved field (EDF+C or 
+    EDF+D) is blanked.
+
+    Parameters
+    -----------
+    fname_src : str
+        Path to the EDF or EDF+ file to copy the channels from.
+    edf_info : dict
+        edf info dictionary of the filename 'fname_src' (read_edf_header)
+    chans : list of int or str
+        index or label of the channels to keep, in the order of the new file
+    fname : str
+        Path to the EDF or EDF+ file to write.
+    progress_callback : function, optional
+        Called after each block as progress_callback(n_bytes_copied, n_bytes_total)
+
+    Returns
+    -----------
+    file_written : Bool, True if the file is written False otherwise
+
+    Usage : select_edf_chans('your_file.edf', edf_info, [2, 0, 'EDF Annotations'], \
+                             'new_file.edf', message_win)
+    """
+    if _same_file(fname_src, fname):
+        message_win.append('ERROR : {} can not be rewritten in place'.format(fname))
+        return False
+    chan_idx = _chan_indexes(edf_info, chans, message_win)
+    if chan_idx is None:
+        return False
+    annot_chans = CEAMS_edfAnnot.find_annot_chans(edf_info)
+    edf_out = _select_hdr_chans(edf_info, chan_idx)
+    if len(annot_chans) > 0 and not np.isin(annot_chans, chan_idx).any():
+        # An EDF file : the reserved field does not start with EDF+C or EDF+D
+        message_win.append('WARNING : the annotation channel is not selected, '\
+            '{} is not an EDF+ file (the reserved field "{}" is blanked{})'.format(\
+                fname, edf_info.get('comment_44rsv').strip(), ', the gaps are lost' \
+                    if edf_info.get('comment_44rsv')[3:5] == '+D' else ''))
+        edf_out['comment_44rsv'] = ''
+
+    with CEAMS_edfLib.EdfDataMap(fname_src, edf_info, message_win) as edf_map:
+        # Offset in bytes of each channel selected in the new data record
+        chan_nbytes = edf_map.samp_nbytes * edf_map.n_samps_record[chan_idx]
+        out_offset = np.concatenate(([0], np.cumsum(chan_nbytes))).astype(int)
+        n_bytes_total = edf_map.n_records * int(out_offset[-1])
+        def record_blocks():
+            for rec_start, rec_stop in _record_blocks(edf_map):
+                block_bytes = edf_map.map_records(rec_start, rec_stop)
+                out_bytes = np.empty((rec_stop - rec_start, out_offset[-1]), dtype=np.uint8)
+                for out_i, chan_i in enumerate(chan_idx):
+                    out_bytes[:, out_offset[out_i]:out_offset[out_i+1]] = \
+                        block_bytes[:, edf_map.chan_byte_slice(chan_i)]
+                # The pages of the block are released
+                del block_bytes
+                if progress_callback is not None:
+                    progress_callback(rec_stop*int(out_offset[-1]), n_bytes_total)
+                yield out_bytes
+        file_written = _write_edf_records(fname, edf_out, record_blocks(), message_win)
+    if file_written:
+        message_win.append('{} channels of {} are written into {}'.format(\
+            len(chan_idx), fname_src, fname))
+    return file_written
+
+
+def reblock_edf_records(fname_src, edf_info, record_length_sec, fname, message_win, \
+                        progress_callback=None):
+    """Write the edf file "fname" with the data records of the edf file 
+    "fname_src" merged or split to a duration of "record_length_sec" seconds.
+    The old and new durations define groups of data records (ex. 10 records
+    of 0.1 s are 1 record of 1 s, 2 records of 1.5 s are 3 records of 1 s) : 
+    the samples of each channel of a group are reshaped in the new data 
+    records, by blocks of groups (numpy reshape of a memory mapped block).
+    n_samps_record, n_records and record_length_sec are written accordingly.
+    
+    The annotations are read first (annotation channels only) and written 
+    again in the first annotation channel : the timekeeping TAL of each new 
+    data record then the annotations of the old data records (onsets kept).
+    The other annotation channels are empty.  The discontinuities of an 
+    EDF+D file have to fall at the start of a new data record.
+    The last old data records that do not fill a new data record are not
+    written (WARNING).
+
+    Parameters
+    -----------
+    fname_src : str
+        Path to the EDF or EDF+ file to read.
+    edf_info : dict
+        edf info dictionary of the filename 'fname_src' (read_edf_header)
+    record_length_sec : float
+        duration of the new data records in seconds
+    fname : str
+        Path to the EDF or EDF+ file to write.
+    progress_callback : function, optional
+        Called after each block as progress_callback(n_bytes_written, n_bytes_total)
+
+    Returns
+    -----------
+    file_written : Bool, True if the file is written False otherwise
+
+    Usage : reblock_edf_records('your_file.edf', edf_info, 1, 'new_file.edf', message_win)
+    """
+    if _same_file(fname_src, fname):
+        message_win.append('ERROR : {} can not be rewritten in place'.format(fname))
+        return False
+    record_ratio = _record_ratio(edf_info.get('record_length_sec'), record_length_sec, \
+                                 message_win)
+    if record_ratio is None:
+        return False
+    # "n_old" data records of the file are "n_new" new data records
+    n_old, n_new = record_ratio.numerator, record_ratio.denominator
+    n_samps_record = np.array(edf_info.get('n_samps_record'), dtype=int)
+    annot_chans = CEAMS_edfAnnot.find_annot_chans(edf_info)
+    sig_chans = np.flatnonzero(~np.isin(np.arange(len(n_samps_record)), annot_chans))
+    not_split = sig_chans[(n_samps_record[sig_chans]*n_old) % n_new != 0]
+    if len(not_split) > 0:
+        message_win.append('ERROR : the {} samples per data record of {} can not be '\
+            'written in data records of {} s'.format(n_samps_record[not_split[0]], \
+                edf_info.get('ch_labels')[not_split[0]].strip(), record_length_sec))
+        return False
+    n_samps_new = -(-n_samps_record*n_old // n_new)
+    
+    n_records = int(edf_info.get('n_records_real'))
+    n_groups = n_records // n_old
+    if n_groups == 0:
+        message_win.append('ERROR : {} is shorter than a data record of {} s'.format(\
+            fname_src, record_length_sec))
+        return False
+    if n_records % n_old != 0:
+        message_win.append('WARNING : the last {} data records of {} do not fill a '\
+            'data record of {} s, they are not written'.format(n_records % n_old, \
+                fname_src, record_length_sec))
+    if len(annot_chans) > 0:
+        tals = _reblock_tals(fname_src, edf_info, n_old, n_new, n_groups, \
+                             record_length_sec, message_win)
+        if tals is None:
+            return False
+        # The first annotation channel has to hold the longest TALs
+        samp_nbytes = CEAMS_edfLib.samp_nbytes(edf_info)
+        tal_nsamps = -(-max(len(tal) for tal in tals) // samp_nbytes)
+        n_samps_new[annot_chans[0]] = max(n_samps_new[annot_chans[0]], tal_nsamps)
+    
+    edf_out = edf_info.copy()
+    edf_out['hdr_nbytes'] = 256*(len(n_samps_record)+1)
+    edf_out['record_length_sec'] = record_length_sec
+    edf_out['n_samps_record'] = n_samps_new
+    edf_out['n_records'] = n_groups*n_new
+    with CEAMS_edfLib.EdfDataMap(fname_src, edf_info, message_win) as edf_map:
+        # Offset in bytes of each channel in the new data record
+        out_offset = np.concatenate(([0], np.cumsum(edf_map.samp_nbytes*n_samps_new)))\
+            .astype(int)
+        n_bytes_total = n_groups*n_new*int(out_offset[-1])
+        def record_blocks():
+            for rec_start, rec_stop in _record_blocks(edf_map, n_old, n_groups*n_old):
+                block_bytes = edf_map.map_records(rec_start, rec_stop)
+                out_start = rec_start // n_old * n_new
+                out_stop = rec_stop // n_old * n_new
+                out_bytes = np.zeros((out_stop - out_start, out_offset[-1]), dtype=np.uint8)
+                # The samples of each channel are continuous through the data records
+                for chan_i in sig_chans:
+                    out_bytes[:, out_offset[chan_i]:out_offset[chan_i+1]] = \
+                        np.ascontiguousarray(block_bytes[:, edf_map.chan_byte_slice(chan_i)])\
+                            .reshape(out_stop - out_start, -1)
+                del block_bytes
+                if len(annot_chans) > 0:
+                    tal_nbytes = out_offset[annot_chans[0]+1] - out_offset[annot_chans[0]]
+                    out_bytes[:, out_offset[annot_chans[0]]:out_offset[annot_chans[0]+1]] = \
+                        np.frombuffer(b''.join([tal.ljust(tal_nbytes, b'\x00') \
+                            for tal in tals[out_start:out_stop]]), dtype=np.uint8)\
+                                .reshape(-1, tal_nbytes)
+                if progress_callback is not None:
+                    progress_callback(out_stop*int(out_offset[-1]), n_bytes_total)
+                yield out_bytes
+        file_written = _write_edf_records(fname, edf_out, record_blocks(), message_win)
+    if file_written:
+        message_win.append('{} data records of {} s of {} are written into {} ({} data '\
+            'records of {} s)'.format(n_groups*n_old, edf_info.get('record_length_sec'), \
+                fname_src, fname, n_groups*n_new, record_length_sec))
+    return file_written
+
+
+# Internal function to return the ratio (Fraction) of the new duration of 
+# the data records on the old one, None if a duration is not valid.
+def _record_ratio(record_length_old, record_length_new, message_win):
+    try:
+        record_ratio = Fraction(float(record_length_new)).limit_denominator(\
+            RECORD_RATIO_MAX_DEN) / Fraction(float(record_length_old))\
+                .limit_denominator(RECORD_RATIO_MAX_DEN)
+    except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+        record_ratio = None
+    if record_ratio is None or record_ratio <= 0 or not np.isfinite(float(record_length_new)):
+        message_win.append('ERROR : the data records of {} s can not be written in data '\
+            'records of {} s'.format(record_length_old, record_length_new))
+        return None
+    return record_ratio
+
+
+# Internal function to return the TALs (bytes) of each new data record : the
+# timekeeping TAL then one TAL per annotation of the old data records of the
+# new data record.  Returns None if a discontinuity is inside a new data record.
+def _reblock_tals(fname_src, edf_info, n_old, n_new, n_groups, record_length_sec, \
+                  message_win):
+    record_length_old = edf_info.get('record_length_sec')
+    annotations, record_onsets = CEAMS_edfAnnot.read_edf_annotations(fname_src, \
+                                                                     edf_info, message_win)
+    # A data record without timekeeping TAL follows the previous data records
+    rec_old = np.arange(len(record_onsets))
+    record_onsets = np.where(np.isnan(record_onsets), rec_old*record_length_old, \
+                             record_onsets)
+    segments = CEAMS_edfAnnot.find_edf_discontinuities(record_onsets, record_length_old)
+    if np.any(segments['rec_start'] % n_old != 0):
+        message_win.append('ERROR : a discontinuity of {} is inside a data record of '\
+            '{} s'.format(fname_src, record_length_sec))
+        return None
+    # Onset of the new data records : onset of the group + new records before
+    rec_new = np.arange(n_groups*n_new)
+    new_onsets = record_onsets[rec_new // n_new * n_old] + \
+        (rec_new % n_new) * float(record_length_sec)
+    tals = [_format_tal_num(onset, True) + b'\x14\x14\x00' for onset in new_onsets]
+    # New data record of each annotation (the last one for the old data records
+    # not written)
+    annot_recs = annotations['record'] // n_old * n_new + \
+        (annotations['record'] % n_old) * n_new // n_old
+    annot_recs = np.minimum(annot_recs, len(tals) - 1)
+    for annot_rec, onset, duration, text in zip(annot_recs.tolist(), \
+            annotations['onset'], annotations['duration'], annotations['text']):
+        tal = _format_tal_num(onset, True)
+        if not np.isnan(duration):
+            tal = tal + CEAMS_edfAnnot.TAL_ONSET_SEP + _format_tal_num(duration)
+        tals[annot_rec] = tals[annot_rec] + tal + CEAMS_edfAnnot.TAL_TEXT_SEP + \
+            text.encode('utf-8') + CEAMS_edfAnnot.TAL_TEXT_SEP + b'\x00'
+    return tals
+
+
+# Internal function to format a number of a TAL (onset or duration) : the 
+# shortest decimal representation, without exponent ("+" added to an onset).
+def _format_tal_num(num_val, onset=False):
+    num_str = np.format_float_positional(round(float(num_val), TAL_ONSET_DECIMALS), \
+                                         trim='-')
+    if onset and not num_str.startswith('-'):
+        num_str = '+' + num_str
+    return num_str.encode('ascii')
+
+
+class PolyphaseResampler():
+    """Resampler of a signal by up/down (integers), the signal is given by 
+    chunks and the state of the filter (the last input samples) is carried 
+    from one chunk to the next : the output of all the chunks is the output
+    of the whole signal.
+    The anti-aliasing filter is a windowed sinc (Kaiser), centered (no 
+    delay) and applied by phase : each output sample is computed from the 
+    input samples only (the zeros of the upsampling are never computed).
+
+    Parameters
+    -----------
+    up, down : int
+        the sampling rate is multiplied by up / down
+        
+    Usage :
+        resampler = PolyphaseResampler(25, 32)
+        for chunk in chunks:
+            samps_out = resampler.process(chunk)
+        samps_out = resampler.process(last_chunk, final=True)
+    """
+    def __init__(self, up, down):
+        samp_ratio = Fraction(int(up), int(down))
+        self.up, self.down = samp_ratio.numerator, samp_ratio.denominator
+        # Low pass at the nyquist of the slowest rate (upsampled signal)
+        max_rate = max(self.up, self.down)
+        self.half_len = RESAMPLE_HALF_LEN * max_rate
+        n_taps = 2*self.half_len + 1
+        taps = np.sinc((np.arange(n_taps) - self.half_len) / max_rate) * \
+            np.kaiser(n_taps, RESAMPLE_KAISER_BETA)
+        taps = taps * (self.up / taps.sum())
+        # Taps of each phase : phase_taps[phase, j] = taps[phase + j*up]
+        self.n_phase_taps = -(-n_taps // self.up)
+        phase_taps = np.zeros(self.n_phase_taps*self.up)
+        phase_taps[:n_taps] = taps
+        self.phase_taps = phase_taps.reshape(self.n_phase_taps, self.up).T.copy()
+        # Input samples kept (the zeros before the signal are the first ones)
+        self.samps_in = np.zeros(self.n_phase_taps - 1)
+        # Index of the first sample kept in the signal, number of input
+        #   samples and of output samples
+        self.first_in = -(self.n_phase_taps - 1)
+        self.n_in = 0
+        self.n_out = 0
+        
+        
+    def process(self, samps, final=False):
+        """Return the output samples computed with the input samples "samps"
+        (the next chunk of the signal).  With final=True, the signal ends 
+        with samps and the last output samples are returned."""
+        samps = np.asarray(samps, dtype=float).reshape(-1)
+        self.samps_in = np.concatenate((self.samps_in, samps))
+        self.n_in = self.n_in + len(samps)
+        if final:
+            # The signal is followed by zeros
+            n_out_stop = -(-self.n_in*self.up // self.down)
+            n_pad = (((n_out_stop - 1)*self.down + self.half_len) // self.up) \
+                - (self.first_in + len(self.samps_in)) + 1
+            if n_pad > 0:
+                self.samps_in = np.concatenate((self.samps_in, np.zeros(n_pad)))
+        else:
+            # The output sample n needs the input sample (n*down + half_len) // up
+            n_out_stop = max((self.n_in*self.up - 1 - self.half_len) // self.down + 1, 0)
+        if n_out_stop <= self.n_out:
+            return np.zeros(0)
+        out_i = np.arange(self.n_out, n_out_stop)
+        pos_up = out_i*self.down + self.half_len
+        in_i = pos_up // self.up - self.first_in
+        phase_taps = self.phase_taps[pos_up % self.up]
+        samps_out = np.zeros(len(out_i))
+        for tap_j in range(self.n_phase_taps):
+            samps_out += phase_taps[:, tap_j] * self.samps_in[in_i - tap_j]
+        self.n_out = n_out_stop
+        # The samples before the first input sample of the next output are dropped
+        next_in = (self.n_out*self.down + self.half_len) // self.up - \
+            (self.n_phase_taps - 1)
+        if next_in > self.first_in:
+            self.samps_in = self.samps_in[next_in - self.first_in:]
+            self.first_in = next_in
+        return samps_out
+
+
+def resample_edf_chans(fname_src, edf_info, samp_rate, fname, message_win, chans=None, \
+                       n_workers=None, progress_callback=None):
+    """Write the edf file "fname" with the channels "chans" of the edf file
+    "fname_src" resampled to "samp_rate" Hz (n_samps_record is updated), the
+    other channels are copied as is.  Each channel is resampled by a process
+    of a pool : the data records are read by blocks (memory mapped) and the
+    polyphase filter (PolyphaseResampler) is applied block by block, its 
+    state carried from one block to the next.  The samples of the channel
+    are written in the data records of the new file (memory mapped by 
+    blocks), then no file is ever loaded completely in memory.
+    The digital values are resampled and clipped to the digital min/max, the 
+    physical scaling of the channels is not modified.
+
+    Parameters
+    -----------
+    fname_src : str
+        Path to the EDF or EDF+ file to read.
+    edf_info : dict
+        edf info dictionary of the filename 'fname_src' (read_edf_header)
+    samp_rate : float
+        new sampling rate in Hz, samp_rate*record_length_sec has to be an integer
+    fname : str
+        Path to the EDF or EDF+ file to write.
+    chans : list of int or str, optional
+        index or label of the channels to resample (all the channels except 
+        the annotation channels by default)
+    n_workers : int, optional
+        Number of processes (number of CPUs by default).
+    progress_callback : function, optional
+        Called after each channel as progress_callback(n_bytes_written, n_bytes_total)
+
+    Returns
+    -----------
+    file_written : Bool, True if the file is written False otherwise
+
+    Usage : resample_edf_chans('your_file.edf', edf_info, 256, 'new_file.edf', message_win)
+    """
+    if _same_file(fname_src, fname):
+        message_win.append('ERROR : {} can not be rewritten in place'.format(fname))
+        return False
+    annot_chans = CEAMS_edfAnnot.find_annot_chans(edf_info)
+    if chans is None:
+        chan_idx = np.flatnonzero(~np.isin(np.arange(edf_info.get('nchan')), annot_chans))
+    else:
+        chan_idx = _chan_indexes(edf_info, chans, message_win)
+        if chan_idx is None:
+            return False
+    if np.isin(chan_idx, annot_chans).any():
+        message_win.append('ERROR : an annotation channel can not be resampled')
+        return False
+    record_length_sec = float(edf_info.get('record_length_sec'))
+    n_samps_new = samp_rate * record_length_sec
+    if not np.isfinite(n_samps_new) or n_samps_new < 1 or \
+        abs(n_samps_new - round(n_samps_new)) > 1e-6:
+        message_win.append('ERROR : {} Hz is not an integer number of samples per data '\
+            'record of {} s (see reblock_edf_records)'.format(samp_rate, record_length_sec))
+        return False
+    n_samps_record = np.array(edf_info.get('n_samps_record'), dtype=int)
+    n_samps_out = n_samps_record.copy()
+    n_samps_out[chan_idx] = int(round(n_samps_new))
+    # Only the channels at another rate are resampled
+    chan_idx = chan_idx[n_samps_out[chan_idx] != n_samps_record[chan_idx]]
+    
+    edf_out = edf_info.copy()
+    edf_out['hdr_nbytes'] = 256*(len(n_samps_record)+1)
+    edf_out['n_samps_record'] = n_samps_out
+    edf_out['n_records'] = int(edf_info.get('n_records_real'))
+    samp_nbytes = CEAMS_edfLib.samp_nbytes(edf_info)
+    out_offset = samp_nbytes*np.concatenate(([0], np.cumsum(n_samps_out))).astype(int)
+    n_bytes_total = edf_out['n_records']*int(out_offset[-1])
+    write_span = CEAMS_edfLog.span(message_win, 'write', fname=fname)
+    if not CEAMS_edfLib.write_edf_hdr(fname, edf_out, message_win):
+        write_span.end()
+        return False
+    try:
+        # The file is sized, each process writes its channel in the data records
+        with open(fname, 'r+b') as fid:
+            fid.truncate(edf_out['hdr_nbytes'] + n_bytes_total)
+        copy_idx = np.flatnonzero(~np.isin(np.arange(len(n_samps_record)), chan_idx))
+        # The messages of the processes are kept at the level of message_win (EdfLog)
+        log_level = getattr(message_win, 'level', CEAMS_edfLog.DEBUG)
+        trace = getattr(message_win, 'trace', False)
+        n_bytes_done = 0
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {executor.submit(_resample_chan, fname_src, edf_info, fname, \
+                edf_out, chan_i, log_level, trace): chan_i for chan_i in chan_idx}
+            if len(copy_idx) > 0:
+                futures[executor.submit(_copy_chans, fname_src, edf_info, fname, edf_out, \
+                    copy_idx, log_level, trace)] = -1
+            for future in as_completed(futures):
+                chan_messages = future.result()
+                message_win.extend(chan_messages)
+                chan_i = futures[future]
+                if chan_i >= 0:
+                    n_bytes_done += edf_out['n_records']*samp_nbytes*int(n_samps_out[chan_i])
+                else:
+                    n_bytes_done += edf_out['n_records']*samp_nbytes*\
+                        int(n_samps_out[copy_idx].sum())
+                if progress_callback is not None:
+                    progress_callback(n_bytes_done, n_bytes_total)
+        with open(fname, 'rb') as fid:
+            fid.seek(0, 2)
+            # Verify the file size written in the edf header
+            CEAMS_edfLib._verify_n_records(fid.tell(), edf_out, message_win)
+    except OSError:
+        message_win.append('{} could not open/write'.format(fname))
+        return False
+    finally:
+        write_span.end()
+    message_win.append('{} channels of {} are resampled to {} Hz into {}'.format(\
+        len(chan_idx), fname_src, samp_rate, fname))
+    return True
+
+
+# Internal function run by the processes : resample the channel "chan_i" of
+# "fname_src" by blocks of data records and write it in the data records of
+# "fname" (header edf_out).  Returns the messages (EdfLog).
+def _resample_chan(fname_src, edf_info, fname, edf_out, chan_i, \
+                   log_level=CEAMS_edfLog.DEBUG, trace=False):
+    message_win = CEAMS_edfLog.EdfLog(log_level, trace)
+    n_samps_in = int(edf_info.get('n_samps_record')[chan_i])
+    n_samps_out = int(edf_out.get('n_samps_record')[chan_i])
+    resampler = PolyphaseResampler(n_samps_out, n_samps_in)
+    digital_min = int(edf_info.get('digital_min')[chan_i])
+    digital_max = int(edf_info.get('digital_max')[chan_i])
+    with CEAMS_edfLog.span(message_win, 'resample', chan=chan_i), \
+        CEAMS_edfLib.EdfDataMap(fname_src, edf_info, message_win) as edf_map, \
+            CEAMS_edfLib.EdfDataMap(fname, edf_out, message_win) as out_map:
+        chan_slice = edf_map.chan_byte_slice(chan_i)
+        out_slice = out_map.chan_byte_slice(chan_i)
+        n_records = min(edf_map.n_records, out_map.n_records)
+        # Output samples not written yet (they fill a data record)
+        samps_pending = np.zeros(0)
+        out_rec = 0
+        rec_blocks = _record_blocks(edf_map, 1, n_records)
+        for block_i, (rec_start, rec_stop) in enumerate(rec_blocks):
+            block_bytes = edf_map.map_records(rec_start, rec_stop)
+            samps = _decode_samples(block_bytes[:, chan_slice], edf_map.samp_nbytes)
+            del block_bytes
+            samps_pending = np.concatenate((samps_pending, resampler.process(samps, \
+                final=block_i == len(rec_blocks) - 1)))
+            n_out_records = min(len(samps_pending) // n_samps_out, n_records - out_rec)
+            if n_out_records == 0:
+                continue
+            samps_out = np.clip(np.rint(samps_pending[:n_out_records*n_samps_out]), \
+                                digital_min, digital_max)
+            samps_pending = samps_pending[n_out_records*n_samps_out:]
+            out_bytes = _open_out_records(fname, out_map, out_rec, out_rec + n_out_records)
+            out_bytes[:, out_slice] = _encode_samples(samps_out.reshape(n_out_records, -1), \
+                                                      edf_map.samp_nbytes)
+            out_bytes.flush()
+            del out_bytes
+            out_rec = out_rec + n_out_records
+    return message_win
+
+
+# Internal function run by the processes : copy the channels "copy_idx" of
+# "fname_src" as is in the data records of "fname" (header edf_out).
+# Returns the messages (EdfLog).
+def _copy_chans(fname_src, edf_info, fname, edf_out, copy_idx, \
+                log_level=CEAMS_edfLog.DEBUG, trace=False):
+    message_win = CEAMS_edfLog.EdfLog(log_level, trace)
+    with CEAMS_edfLog.span(message_win, 'copy', n_chans=len(copy_idx)), \
+        CEAMS_edfLib.EdfDataMap(fname_src, edf_info, message_win) as edf_map, \
+            CEAMS_edfLib.EdfDataMap(fname, edf_out, message_win) as out_map:
+        n_records = min(edf_map.n_records, out_map.n_records)
+        for rec_start, rec_stop in _record_blocks(edf_map, 1, n_records):
+            block_bytes = edf_map.map_records(rec_start, rec_stop)
+            out_bytes = _open_out_records(fname, out_map, rec_start, rec_stop)
+            for chan_i in copy_idx:
+                out_bytes[:, out_map.chan_byte_slice(chan_i)] = \
+                    block_bytes[:, edf_map.chan_byte_slice(chan_i)]
+            out_bytes.flush()
+            del block_bytes, out_bytes
+    return message_win
+
+
+# Internal function to memory map the data records [rec_start, rec_stop[ of
+# the file "fname" (out_map) to write them.
+def _open_out_records(fname, out_map, rec_start, rec_stop):
+    record_nbytes = out_map.data_bytes.shape[1]
+    return np.memmap(fname, dtype=np.uint8, mode='r+', \
+        offset=out_map.hdr_nbytes + rec_start*record_nbytes, \
+            shape=(rec_stop - rec_start, record_nbytes))
+
+
+# Internal function to decode the samples of the bytes of a channel 
+# (n_records x samp_nbytes*n_samps) in a continuous signal.
+def _decode_samples(chan_bytes, samp_nbytes):
+    if samp_nbytes == CEAMS_edfLib.BDF_SAMP_NBYTES:
+        return CEAMS_edfLib.decode_bdf_samples(chan_bytes).reshape(-1)
+    return np.ascontiguousarray(chan_bytes).view('<i2').reshape(-1)
+
+
+# Internal function to encode the samples (n_records x n_samps) in the bytes
+# of the data records (n_records x samp_nbytes*n_samps).
+def _encode_samples(samps, samp_nbytes):
+    if samp_nbytes == CEAMS_edfLib.BDF_SAMP_NBYTES:
+        return CEAMS_edfLib.encode_bdf_samples(samps)
+    return samps.astype('<i2').view(np.uint8)
+
+
+# Internal function to return True if "fname" is the file "fname_src".
+def _same_file(fname_src, fname):
+    return os.path.exists(fname) and os.path.samefile(fname_src, fname)
+
+
+# Internal function to return the index of each channel of "chans" (label or
+# index, a str of digits is an index if it is not a label), None if a channel
+# is not in the header.
+def _chan_indexes(edf_info, chans, message_win):
+    ch_labels = [label.strip() for label in edf_info.get('ch_labels')]
+    nchan = edf_info.get('nchan')
+    chan_idx = []
+    for chan in chans:
+        if isinstance(chan, str) and chan.strip() in ch_labels:
+            chan_idx.append(ch_labels.index(chan.strip()))
+        elif isinstance(chan, str) and not chan.strip().isdigit():
+            message_win.append('ERROR : {} is not a channel of the file'.format(chan))
+            return None
+        elif 0 <= int(chan) < nchan:
+            chan_idx.append(int(chan))
+        else:
+            message_win.append('ERROR : the channel {} is out of range (nchan={})'\
+                               .format(chan, nchan))
+            return None
+    if len(chan_idx) == 0:
+        message_win.append('ERROR : no channel is selected')
+        return None
+    return np.array(chan_idx, dtype=int)
+
+
+# Internal function to return a copy of the header "edf_info" with only the
+# channels "chan_idx" (the number of channels and of bytes of the header
+# follow).
+def _select_hdr_chans(edf_info, chan_idx):
+    edf_out = edf_info.copy()
+    if isinstance(edf_info, CEAMS_edfLib.EdfHeader):
+        edf_out.chans = edf_info.chans[chan_idx]
+    else:
+        for field in CEAMS_edfLib.EdfHeader.CHAN_FIELDS:
+            if field in edf_info:
+                edf_out[field] = [edf_info.get(field)[chan_i] for chan_i in chan_idx]
+    edf_out['nchan'] = len(chan_idx)
+    edf_out['hdr_nbytes'] = 256*(len(chan_idx)+1)
+    edf_out['n_records'] = int(edf_info.get('n_records_real'))
+    return edf_out
+
+
+# Internal function to return the (rec_start, rec_stop) of the blocks of
+# data records of the memory map "edf_map" (about REWRITE_BLOCK_NBYTES each).
+# A block is a multiple of "rec_group" data records and the blocks stop at 
+# "n_records" (all the data records by default).
+def _record_blocks(edf_map, rec_group=1, n_records=None, block_nbytes=REWRITE_BLOCK_NBYTES):
+    if n_records is None:
+        n_records = edf_map.n_records
+    record_nbytes = max(edf_map.data_bytes.shape[1], 1)
+    block_nrecords = max(block_nbytes // (record_nbytes*rec_group), 1) * rec_group
+    return [(rec_start, min(rec_start + block_nrecords, n_records)) \
+            for rec_start in range(0, n_records, block_nrecords)]
+
+
+# Internal function to write the header "edf_info" and the data records of
+# "record_blocks" (arrays of bytes, n_records x record_nbytes) into the file
+# "fname".  Returns True if the file is written.
+def _write_edf_records(fname, edf_info, record_blocks, message_win):
+    write_span = CEAMS_edfLog.span(message_win, 'write', fname=fname)
+    if not CEAMS_edfLib.write_edf_hdr(fname, edf_info, message_win):
+        write_span.end()
+        return False
+    try:
+        with open(fname, 'ab') as fid:
+            for record_bytes in record_blocks:
+                fid.write(memoryview(np.ascontiguousarray(record_bytes)))
+            # Verify the file size written in the edf header
+            CEAMS_edfLib._verify_n_records(fid.tell(), edf_info, message_win)
+    except OSError:
+        message_win.append('{} could not open/write'.format(fname))
+        return False
+    finally:
+        write_span.end()
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a new edf file with '\
+        'the channels selected or the data records of a new duration of an edf file.')
+    parser.add_argument('fname_src', help='edf file to read')
+    parser.add_argument('fname', help='edf file to write')
+    rewrite_group = parser.add_mutually_exclusive_group(required=True)
+    rewrite_group.add_argument('--chans', default=None, \
+        help='labels (or index) of the channels to keep, comma separated, '\
+            'in the order of the new file')
+    rewrite_group.add_argument('--record-sec', type=float, default=None, \
+        help='new duration of the data records in seconds')
+    rewrite_group.add_argument('--rate', type=float, default=None, \
+        help='new sampling rate in Hz of the channels of --rate-chans')
+    parser.add_argument('--rate-chans', default=None, \
+        help='labels (or index) of the channels to resample, comma separated '\
+            '(default : all the channels except the annotations)')
+    parser.add_argument('-j', '--workers', type=int, default=None, \
+        help='number of processes of the resampling (default : number of CPUs)')
+    args = parser.parse_args(argv)
+    message_win = []
+    edf_info = CEAMS_edfLib.read_edf_header(args.fname_src, message_win)
+    if edf_info is None:
+        print(*message_win, sep="\n", file=sys.stderr)
+        return 1
+    if args.chans is not None:
+        file_written = select_edf_chans(args.fname_src, edf_info, args.chans.split(','), \
+                                        args.fname, message_win)
+    elif args.record_sec is not None:
+        file_written = reblock_edf_records(args.fname_src, edf_info, args.record_sec, \
+                                           args.fname, message_win)
+    else:
+        file_written = resample_edf_chans(args.fname_src, edf_info, args.rate, args.fname, \
+            message_win, None if args.rate_chans is None else args.rate_chans.split(','), \
+                args.workers)
+    print(*[message for message in message_win if not message.startswith('...')], \
+          sep="\n", file=sys.stdout if file_written else sys.stderr)
+    return 0 if file_written else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch scanner of the edf headers (without the GUI).
+The edf files (.edf, .rec and .bdf) of directory trees are found, their headers
+are read in parallel (pool of processes) with read_edf_header and the
+reports of CEAMS_edfReports are written :
+    -EDF header Report : edfHdrRep.csv
+    -Channel Count Report : chanCountRep.csv
+    -Complete Channels reports : EdfHdr_RW_chans_rep/*_rep.csv
+    -Data Validation Report : edfDataRep.csv (only with -r data, the data
+     records of each file are read)
+    -Columnar tables : edfHdrTable and edfChanTable (only with -r parquet
+     or -r feather, pyarrow is needed)
+A file that can not be read, or with a header not valid (truncated, no
+channel or a field that can not be parsed), is reported as a failure
+(scanFailures.csv), left out of the reports, and the scan continues.  The headers already read (and not modified since)
+are taken from the index of CEAMS_edfIndex.
+The time spent to open, parse, validate and write the files can be printed
+(--profile) or written in a trace file (--trace, see CEAMS_edfLog).
+
+Usage : python CEAMS_edfScan.py /path/to/archive -o /path/to/reports -j 8
+
+Created on Sat Oct 17 10:48:05 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import argparse
+import CEAMS_edfIndex
+import CEAMS_edfLib
+import CEAMS_edfLog
+import CEAMS_edfReports
+import CEAMS_edfValid
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pandas as pd
+import sys
+import time
+
+# Extensions of the files to scan
+EDF_EXTENSIONS = CEAMS_edfLib.EDF_EXTENSIONS
+# Number of files sent at once to a worker
+SCAN_CHUNKSIZE = 16
+# Number of files between two progress messages
+PROGRESS_NFILES = 1000
+
+
+def find_edf_files(directories):
+    """Walk the directory trees and return the path of each edf file (sorted).
+
+    Parameters
+    -----------
+    directories : list of str
+        Path of the directories to walk.
+
+    Returns
+    -----------
+    edf_files : list of str
+        Path of the edf files found.
+
+    Usage : edf_files = find_edf_files(['/path/to/archive'])
+    """
+    edf_files = []
+    for directory in directories:
+        for dir_path, dir_names, file_names in os.walk(directory):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if os.path.splitext(file_name)[1].lower() in EDF_EXTENSIONS:
+                    edf_files.append(os.path.join(dir_path, file_name))
+    return edf_files
+
+
+# Internal function run by the workers : read the header of one edf file.
+# Returns (fname, edf_info, messages), edf_info is None if the header
+# could not be read or is not valid.  The messages are an EdfLog of level
+# "log_level" (at least INFO to see the parse errors).
+def _scan_edf_hdr(fname, log_level=CEAMS_edfLog.DEBUG, trace=False):
+    message_win = CEAMS_edfLog.EdfLog(min(log_level, CEAMS_edfLog.INFO), trace)
+    try:
+        edf_info = CEAMS_edfLib.read_edf_header(fname, message_win)
+    except (Exception, SystemExit) as err:
+        message_win.append('ERROR : {} could not be read ({})'.format(fname, err))
+        edf_info = None
+    if edf_info is not None:
+        hdr_error = _hdr_error(edf_info, message_win)
+        if hdr_error is not None:
+            message_win.append('ERROR : {} is not a valid edf file ({})'.format(\
+                fname, hdr_error))
+            edf_info = None
+    return fname, edf_info, message_win
+
+
+# Internal function to return why the header "edf_info" is not valid : 
+# truncated, without channel or with a field that could not be parsed 
+# (read_edf_header replaces it by 0 and reports "Error reading ...").
+# Returns None if the header is valid.
+def _hdr_error(edf_info, file_messages):
+    hdr_nbytes_real = edf_info.get('hdr_nbytes_real')
+    if hdr_nbytes_real < 256:
+        return 'the header is truncated to {} bytes'.format(hdr_nbytes_real)
+    if edf_info.get('nchan') <= 0:
+        return 'the header has no channel'
+    if hdr_nbytes_real < 256*(edf_info.get('nchan')+1):
+        return 'the header of the {} channels is truncated to {} bytes'.format(\
+            edf_info.get('nchan'), hdr_nbytes_real)
+    for message in file_messages:
+        if message.startswith('Error reading'):
+            return message
+    return None
+
+
+def scan_edf_hdrs(edf_files, message_win, n_workers=None, hdr_index=None):
+    """Read the header of each edf file in a pool of processes.  The headers
+    are returned in the same order as edf_files.  The failures do not stop
+    the scan.
+
+    Parameters
+    -----------
+    edf_files : list of str
+        Path of the edf files to read.
+    n_workers : int, optional
+        Number of processes (number of CPUs by default).
+    hdr_index : EdfHdrIndex, optional
+        Index of the edf headers, only the files not in the index 
+        (or modified since) are read.
+
+    Returns
+    -----------
+    edf_hdr_list : list of dict
+        edf_info of each edf file read
+    edf_hdr_files : list of str
+        Path of each edf file read (same order as edf_hdr_list)
+    failures : list of (str, str)
+        Path and error message of each edf file that could not be read
+
+    Usage : edf_hdr_list, edf_hdr_files, failures = scan_edf_hdrs(edf_files, message_win, 8)
+    """
+    # Look for the headers in the index first
+    scan_results = [None] * len(edf_files)
+    files_to_read = []
+    file_stats = {}
+    for i_file, fname in enumerate(edf_files):
+        if hdr_index is not None:
+            try:
+                file_stats[fname] = os.stat(fname)
+                cached = hdr_index.get(fname, file_stats[fname])
+            except OSError:
+                cached = None
+            if cached is not None:
+                scan_results[i_file] = (fname, cached[0], cached[1])
+                continue
+        files_to_read.append(i_file)
+    if hdr_index is not None:
+        print('{} edf headers found in the index, {} to read'.format(\
+            len(edf_files) - len(files_to_read), len(files_to_read)))
+
+    # The workers keep the messages of the level of message_win (EdfLog)
+    log_level = getattr(message_win, 'level', CEAMS_edfLog.DEBUG)
+    trace = getattr(message_win, 'trace', False)
+    n_read = len(files_to_read)
+    time_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        # The results are consumed as they arrive
+        for i_read, (fname, edf_info, file_messages) in enumerate(\
+            executor.map(_scan_edf_hdr, [edf_files[i] for i in files_to_read], \
+                         [log_level]*n_read, [trace]*n_read, chunksize=SCAN_CHUNKSIZE)):
+            scan_results[files_to_read[i_read]] = (fname, edf_info, file_messages)
+            if hdr_index is not None and edf_info is not None and fname in file_stats:
+                hdr_index.put(fname, edf_info, file_messages, file_stats[fname])
+            if (i_read+1) % PROGRESS_NFILES == 0:
+                elapsed_sec = time.perf_counter() - time_start
+                print('{}/{} files scanned ({:.1f} files/s)'.format(\
+                    i_read+1, len(files_to_read), (i_read+1)/elapsed_sec))
+    # The rate is the rate of the files read (not found in the index)
+    elapsed_sec = max(time.perf_counter() - time_start, 1e-9)
+    print('{} edf headers read in {:.1f} s ({:.1f} files/s)'.format(\
+        n_read, elapsed_sec, n_read/elapsed_sec))
+
+    edf_hdr_list = []
+    edf_hdr_files = []
+    failures = []
+    for fname, edf_info, file_messages in scan_results:
+        if edf_info is None:
+            failures.append((fname, file_messages[-1] if file_messages else ''))
+        else:
+            edf_hdr_list.append(edf_info)
+            edf_hdr_files.append(fname)
+        message_win.extend(file_messages)
+    return edf_hdr_list, edf_hdr_files, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scan the edf headers of '\
+        'directory trees and write the EdfHdr_RW reports.')
+    parser.add_argument('directories', nargs='+', \
+        help='directories to scan (recursively)')
+    parser.add_argument('-o', '--output', required=True, \
+        help='directory to save the reports')
+    parser.add_argument('-j', '--workers', type=int, default=None, \
+        help='number of processes (default : number of CPUs)')
+    parser.add_argument('-r', '--reports', default='hdr,count,chans', \
+        help='reports to write, comma separated among hdr, count, chans, '\
+            'data, parquet and feather (default : hdr,count,chans)')
+    parser.add_argument('--index', default=CEAMS_edfIndex.default_index_fname(), \
+        help='index of the edf headers already read (default : {})'.format(\
+            CEAMS_edfIndex.default_index_fname()))
+    parser.add_argument('--no-index', action='store_true', \
+        help='read all the edf headers without the index')
+    parser.add_argument('-v', '--verbose', action='store_true', \
+        help='print the messages of read_edf_header')
+    parser.add_argument('--profile', action='store_true', \
+        help='print the time spent in each phase (open, parse, validate, write)')
+    parser.add_argument('--trace', default=None, \
+        help='write the spans of each phase in a trace file (json)')
+    args = parser.parse_args(argv)
+
+    message_win = CEAMS_edfLog.EdfLog(CEAMS_edfLog.DEBUG if args.verbose else \
+                                      CEAMS_edfLog.INFO, args.trace is not None)
+    time_start = time.perf_counter()
+    edf_files = find_edf_files(args.directories)
+    print('{} edf files found'.format(len(edf_files)))
+    hdr_index = None if args.no_index else CEAMS_edfIndex.EdfHdrIndex(args.index)
+    edf_hdr_list, edf_hdr_files, failures = scan_edf_hdrs(edf_files, \
+                                                message_win, args.workers, hdr_index)
+    if hdr_index is not None:
+        hdr_index.close()
+    elapsed_sec = max(time.perf_counter() - time_start, 1e-9)
+    print('{} edf files scanned in {:.1f} s, {} failures'.format(\
+        len(edf_files), elapsed_sec, len(failures)))
+
+    # The file names in the reports are relative to the scanned directory
+    edf_file_names = []
+    for fname in edf_hdr_files:
+        for directory in args.directories:
+            if os.path.abspath(fname).startswith(os.path.abspath(directory) + os.sep):
+                fname = os.path.relpath(fname, directory)
+                break
+        edf_file_names.append(fname)
+
+    if not os.path.exists(args.output):
+        os.makedirs(args.output)
+    reports = args.reports.split(',')
+    if len(edf_hdr_list) > 0:
+        if 'hdr' in reports:
+            CEAMS_edfReports.write_hdr_rep(edf_hdr_list, edf_file_names, \
+                                           args.output, message_win)
+        columnar_formats = [report for report in reports if report in \
+                            CEAMS_edfReports.COLUMNAR_FORMATS]
+        if 'count' in reports or 'chans' in reports or len(columnar_formats) > 0:
+            # The channel table is shared by the channel reports
+            chan_table = CEAMS_edfReports.build_chan_table(edf_hdr_list, edf_file_names)
+        if 'count' in reports:
+            CEAMS_edfReports.write_chan_count(edf_hdr_list, args.output, message_win, \
+                                              chan_table)
+        if 'chans' in reports:
+            CEAMS_edfReports.write_chan_reports(edf_hdr_list, edf_file_names, \
+                                                args.output, message_win, chan_table)
+        for file_format in columnar_formats:
+            CEAMS_edfReports.write_columnar_rep(edf_hdr_list, edf_file_names, \
+                args.output, message_win, chan_table, file_format)
+        if 'data' in reports:
+            # The channels of each file are validated in parallel (threads)
+            data_valid_list = [CEAMS_edfValid.validate_edf_data(fname, edf_info, \
+                message_win, n_workers=args.workers) for fname, edf_info in \
+                    zip(edf_hdr_files, edf_hdr_list)]
+            CEAMS_edfReports.write_data_rep(data_valid_list, edf_file_names, \
+                                            args.output, message_win)
+    if len(failures) > 0:
+        failures_fname = args.output + "/scanFailures.csv"
+        pd.DataFrame(failures, columns=['filename', 'error']).to_csv(failures_fname)
+        print('Failures are written to {}'.format(failures_fname))
+
+    if args.verbose:
+        print(*message_win, sep="\n")
+    else:
+        print(*[message for message in message_win if 'written to' in message \
+                or message.startswith('ERROR')], sep="\n")
+    if args.profile:
+        print(*message_win.format_counters(), sep="\n")
+    if args.trace is not None:
+        message_win.write_trace(args.trace)
+        print('Trace is written to {}'.format(args.trace))
+    return 0 if len(failures) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
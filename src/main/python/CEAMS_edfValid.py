@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validation of the edf data (the samples), the header is validated by
+read_edf_header.  For each channel :
+    -clipping : samples equal to the digital minimum or maximum
+    -out of range : samples outside [digital_min, digital_max]
+    -flatline : segments of constant samples longer than flat_min_sec
+
+The data records are memory mapped (EdfDataMap) and each channel is read by
+blocks of data records, then the memory used does not depend on the size of
+the file.  The channels are validated in parallel (threads, numpy releases
+the GIL).  The results are written in the Data Validation Report
+(CEAMS_edfReports.write_data_rep).
+
+Usage :
+    chan_valid_lst = validate_edf_data(your_file.edf, edf_info, message_win)
+
+Created on Sun Oct 18 13:40:18 2026
+
+@author: Karine Lacourse (karine.lacourse.cnmtl@ssss.gouv.qc.ca)
+"""
+
+import CEAMS_edfAnnot
+import CEAMS_edfLib
+import CEAMS_edfLog
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Number of bytes of a channel read at once
+VALID_BLOCK_NBYTES = 4*1024*1024
+# Minimum duration of a flatline segment (in seconds)
+FLAT_MIN_SEC = 1.0
+
+
+def validate_edf_data(fname, edf_info, message_win, flat_min_sec=FLAT_MIN_SEC, \
+                      n_workers=None):
+    """Validate the samples of each channel of the edf file "fname"
+    (annotation channels excluded).
+
+    Parameters
+    -----------
+    fname : str
+        Path to the EDF or EDF+ file.
+    edf_info : dict
+        edf info dictionary of the filename 'fname' (read_edf_header)
+    flat_min_sec : float, optional
+        Minimum duration in seconds of a flatline segment.
+    n_workers : int, optional
+        Number of threads (channels validated in parallel).
+
+    Returns
+    -----------
+    chan_valid_lst : list of dict (one per channel)
+        channel, n_samps, n_clip_min, n_clip_max, clip_fraction,
+        n_out_of_range, n_flat_segments, flat_sec, flat_max_sec
+
+    Usage : chan_valid_lst = validate_edf_data(your_file.edf, edf_info, message_win)
+    """
+    annot_chans = CEAMS_edfAnnot.find_annot_chans(edf_info)
+    chans = [chan_i for chan_i in range(edf_info.get('nchan')) if chan_i not in annot_chans]
+    with CEAMS_edfLog.span(message_win, 'validate_data', fname=fname), \
+        CEAMS_edfLib.EdfDataMap(fname, edf_info, message_win) as edf_map:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            chan_valid_lst = list(executor.map(lambda chan_i: \
+                _validate_chan(edf_map, edf_info, chan_i, flat_min_sec), chans))
+    n_bad_chans = sum(chan_valid['n_out_of_range'] > 0 for chan_valid in chan_valid_lst)
+    if n_bad_chans > 0:
+        message_win.append('WARNING : {} channels of {} have samples outside the '\
+                           'digital range'.format(n_bad_chans, fname))
+    return chan_valid_lst
+
+
+# Internal function to validate the channel "chan_i" by blocks of data records.
+def _validate_chan(edf_map, edf_info, chan_i, flat_min_sec):
+    digital_min = edf_info.get('digital_min')[chan_i]
+    digital_max = edf_info.get('digital_max')[chan_i]
+    n_samps_record = int(edf_map.n_samps_record[chan_i])
+    samp_rate = n_samps_record / edf_map.record_length_sec \
+        if edf_map.record_length_sec > 0 else 1.0
+    flat_min_samps = max(int(round(flat_min_sec * samp_rate)), 2)
+    block_nrecords = max(VALID_BLOCK_NBYTES // max(edf_map.samp_nbytes*n_samps_record, 1), 1)
+
+    n_samps = 0
+    n_clip_min = 0
+    n_clip_max = 0
+    n_out_of_range = 0
+    flat_runs = _FlatRuns(flat_min_samps)
+    for rec_start in range(0, edf_map.n_records, block_nrecords):
+        chan_data = edf_map.chan_records(chan_i, rec_start, \
+                                         rec_start + block_nrecords).ravel()
+        n_samps += chan_data.size
+        n_clip_min += int(np.count_nonzero(chan_data == digital_min))
+        n_clip_max += int(np.count_nonzero(chan_data == digital_max))
+        n_out_of_range += int(np.count_nonzero((chan_data < digital_min) | \
+                                               (chan_data > digital_max)))
+        flat_runs.add_block(chan_data)
+    flat_runs.finish()
+    return {'channel': edf_map.ch_labels[chan_i], 'n_samps': n_samps,
+            'n_clip_min': n_clip_min, 'n_clip_max': n_clip_max,
+            'clip_fraction': (n_clip_min + n_clip_max) / n_samps if n_samps else 0.0,
+            'n_out_of_range': n_out_of_range,
+            'n_flat_segments': flat_runs.n_segments,
+            'flat_sec': flat_runs.n_flat_samps / samp_rate if samp_rate else 0.0,
+            'flat_max_sec': flat_runs.max_flat_samps / samp_rate if samp_rate else 0.0}
+
+
+class _FlatRuns():
+    """Runs of constant samples through the blocks of a channel.  The run at
+    the end of a block is carried to the next block."""
+    def __init__(self, flat_min_samps):
+        self.flat_min_samps = flat_min_samps
+        self.n_segments = 0
+        self.n_flat_samps = 0
+        self.max_flat_samps = 0
+        # Last value and length of the run at the end of the previous block
+        self.last_val = None
+        self.last_len = 0
+
+
+    def add_block(self, chan_data):
+        if chan_data.size == 0:
+            return
+        # Start of each run in the block
+        run_starts = np.concatenate(([0], np.flatnonzero(chan_data[1:] != chan_data[:-1]) + 1))
+        run_lens = np.diff(np.concatenate((run_starts, [chan_data.size])))
+        # The first run continues the run of the previous block
+        if self.last_val is not None and chan_data[0] == self.last_val:
+            run_lens[0] += self.last_len
+        elif self.last_val is not None:
+            self._add_runs(np.array([self.last_len]))
+        # The last run can continue in the next block
+        self._add_runs(run_lens[:-1])
+        self.last_val = chan_data[-1]
+        self.last_len = int(run_lens[-1])
+
+
+    def finish(self):
+        if self.last_val is not None:
+            self._add_runs(np.array([self.last_len]))
+        self.last_val = None
+        self.last_len = 0
+
+
+    def _add_runs(self, run_lens):
+        flat_lens = run_lens[run_lens >= self.flat_min_samps]
+        if flat_lens.size > 0:
+            self.n_segments += int(flat_lens.size)
+            self.n_flat_samps += int(flat_lens.sum())
+            self.max_flat_samps = max(self.max_flat_samps, int(flat_lens.max()))
@@ -1,5 +1,6 @@
 # EdfHdr_RW.pro
 SOURCES += 	customTableModel.py \
+			hdrLoader.py \
 			main.py \
 			MainWindow.py
 TRANSLATIONS += EdfHdr_RW.fr.ts \
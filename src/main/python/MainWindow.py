@@ -274,11 +274,26 @@ class Ui_MainWindow(object):
         self.label_4.setAlignment(QtCore.Qt.AlignCenter)
         self.label_4.setObjectName("label_4")
         self.verticalLayout_2.addWidget(self.label_4)
+        self.horizontalLayout_9 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_9.setObjectName("horizontalLayout_9")
+        self.lineEdit_filter = QtWidgets.QLineEdit(self.layoutWidget)
+        self.lineEdit_filter.setClearButtonEnabled(True)
+        self.lineEdit_filter.setObjectName("lineEdit_filter")
+        self.horizontalLayout_9.addWidget(self.lineEdit_filter)
+        self.comboBox_sort = QtWidgets.QComboBox(self.layoutWidget)
+        self.comboBox_sort.setObjectName("comboBox_sort")
+        self.comboBox_sort.addItem("")
+        self.comboBox_sort.addItem("")
+        self.comboBox_sort.addItem("")
+        self.comboBox_sort.addItem("")
+        self.horizontalLayout_9.addWidget(self.comboBox_sort)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_9)
         self.listView = QtWidgets.QListView(self.layoutWidget)
         self.listView.setStyleSheet("")
         self.listView.setDragEnabled(True)
         self.listView.setDragDropMode(QtWidgets.QAbstractItemView.DragDrop)
         self.listView.setSelectionRectVisible(True)
+        self.listView.setUniformItemSizes(True)
         self.listView.setObjectName("listView")
         self.verticalLayout_2.addWidget(self.listView)
         self.splitter_2 = QtWidgets.QSplitter(self.splitter_3)
@@ -437,13 +452,23 @@ class Ui_MainWindow(object):
         self.actionAll_Reports.setObjectName("actionAll_Reports")
         self.actionConcatene_2_Files = QtWidgets.QAction(MainWindow)
         self.actionConcatene_2_Files.setObjectName("actionConcatene_2_Files")
+        self.actionData_Validation_Report = QtWidgets.QAction(MainWindow)
+        self.actionData_Validation_Report.setObjectName("actionData_Validation_Report")
+        self.actionColumnar_Tables = QtWidgets.QAction(MainWindow)
+        self.actionColumnar_Tables.setObjectName("actionColumnar_Tables")
+        self.actionSelect_Channels = QtWidgets.QAction(MainWindow)
+        self.actionSelect_Channels.setObjectName("actionSelect_Channels")
         self.menu_File.addAction(self.actionOpen_File)
         self.menu_File.addAction(self.actionConcatene_2_Files)
+        self.menu_File.addAction(self.actionSelect_Channels)
         self.menuGenerate.addAction(self.actionChannels_Count_Report)
         self.menuGenerate.addAction(self.actionEDF_Header_Report)
         self.menuGenerate.addAction(self.actionComplete_Channels_reports)
         self.menuGenerate.addSeparator()
         self.menuGenerate.addAction(self.actionAll_Reports)
+        self.menuGenerate.addSeparator()
+        self.menuGenerate.addAction(self.actionData_Validation_Report)
+        self.menuGenerate.addAction(self.actionColumnar_Tables)
         self.menuLanguage.addAction(self.actionFrancais)
         self.menuLanguage.addAction(self.actionEnglish)
         self.menuTheme.addAction(self.actionDark_Mode)
@@ -472,7 +497,12 @@ class Ui_MainWindow(object):
         self.actionEDF_Header_Report.triggered.connect(MainWindow.genHdrRepSlot)
         self.actionComplete_Channels_reports.triggered.connect(MainWindow.genChanRptsSlot)
         self.actionAll_Reports.triggered.connect(MainWindow.genAllReportsSlot)
+        self.actionData_Validation_Report.triggered.connect(MainWindow.genDataRepSlot)
+        self.actionColumnar_Tables.triggered.connect(MainWindow.genColumnarRepSlot)
         self.actionConcatene_2_Files.triggered.connect(MainWindow.concat2FilesSlot)
+        self.actionSelect_Channels.triggered.connect(MainWindow.selectChansSlot)
+        self.lineEdit_filter.textChanged['QString'].connect(MainWindow.filterEdfListSlot)
+        self.comboBox_sort.currentIndexChanged['int'].connect(MainWindow.sortEdfListSlot)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
         MainWindow.setTabOrder(self.lineEdit, self.pushButton_browse)
         MainWindow.setTabOrder(self.pushButton_browse, self.pushButton_Write)
@@ -484,6 +514,13 @@ class Ui_MainWindow(object):
         self.label.setText(_translate("MainWindow", "File name"))
         self.pushButton_browse.setText(_translate("MainWindow", "Browse"))
         self.label_4.setText(_translate("MainWindow", "EDF files list"))
+        self.lineEdit_filter.setToolTip(_translate("MainWindow", "<html><head/><body><p>Show only the edf files with a name including this text.</p></body></html>"))
+        self.lineEdit_filter.setPlaceholderText(_translate("MainWindow", "Filter by name"))
+        self.comboBox_sort.setToolTip(_translate("MainWindow", "<html><head/><body><p>Sort the edf files list.</p></body></html>"))
+        self.comboBox_sort.setItemText(0, _translate("MainWindow", "Loading order"))
+        self.comboBox_sort.setItemText(1, _translate("MainWindow", "Name"))
+        self.comboBox_sort.setItemText(2, _translate("MainWindow", "Start date"))
+        self.comboBox_sort.setItemText(3, _translate("MainWindow", "Number of channels"))
         self.listView.setToolTip(_translate("MainWindow", "<html><head/><body><p>Window to select the edf file.</p></body></html>"))
         self.listView.setWhatsThis(_translate("MainWindow", "<html><head/><body><p><br/></p></body></html>"))
         self.label_5.setText(_translate("MainWindow", "EDF fields list"))
@@ -519,4 +556,10 @@ class Ui_MainWindow(object):
         self.actionComplete_Channels_reports.setToolTip(_translate("MainWindow", "<html><head/><body><p>Channel header fields of each loaded file (one file per channel).</p></body></html>"))
         self.actionAll_Reports.setText(_translate("MainWindow", "All reports listed above"))
         self.actionAll_Reports.setToolTip(_translate("MainWindow", "Generate the reports listed above for the loaded files."))
-        self.actionConcatene_2_Files.setText(_translate("MainWindow", "[BAD] Concatenate 2 Files"))
+        self.actionData_Validation_Report.setText(_translate("MainWindow", "Report - Data validation"))
+        self.actionData_Validation_Report.setToolTip(_translate("MainWindow", "Clipping, out of range and flatline samples of each channel of the loaded files."))
+        self.actionColumnar_Tables.setText(_translate("MainWindow", "Tables - Parquet (files and channels)"))
+        self.actionColumnar_Tables.setToolTip(_translate("MainWindow", "File table and channel table of the loaded files in Parquet format (pyarrow is needed)."))
+        self.actionConcatene_2_Files.setText(_translate("MainWindow", "Concatenate Files"))
+        self.actionSelect_Channels.setText(_translate("MainWindow", "Select Channels"))
+        self.actionSelect_Channels.setToolTip(_translate("MainWindow", "Write a new edf file with the channels selected (and reordered) of the selected file."))
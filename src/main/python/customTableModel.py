@@ -21,7 +21,9 @@ https://www.learnpyqt.com/tutorials/qtableview-modelviews-numpy-pandas/
 """
 import CEAMS_edfLib
 import numpy as np
-from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractListModel, QCoreApplication
+import os
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractListModel, QCoreApplication, \
+    QModelIndex, QSortFilterProxyModel
 
 
 class FieldTableModel(QAbstractTableModel):
@@ -32,8 +34,12 @@ class FieldTableModel(QAbstractTableModel):
     def __init__( self, message_win):
         super(FieldTableModel, self).__init__()
         
-        # Data of the model shown on the table view
-        # what needs to be updated
+        # The edf header shown (shared with ValueTableModel) 
+        self.edf_dict = {}
+        # The edf fields in the order of the edf header
+        self.field_names = []
+        # Data of the model shown on the table view (the value of each
+        # field converted to str), what needs to be updated
         self.edf_info = []
         
         # Set the labels
@@ -48,6 +54,29 @@ class FieldTableModel(QAbstractTableModel):
         # The nb of edf fields
         if role == Qt.DisplayRole:
             return self.edf_info[index.row()][index.column()]
+
+
+    def set_header(self, edf_dict):
+        '''
+        Show the edf header "edf_dict" (the model is reset once).
+        '''
+        self.beginResetModel()
+        self.edf_dict = edf_dict
+        self.field_names = list(edf_dict.keys())
+        self.edf_info = [[str(value_dict)] for value_dict in edf_dict.values()]
+        self.endResetModel()
+
+
+    def update_fields(self):
+        '''
+        When the edf header has been modified.  Only the rows of the fields 
+        modified are updated on the view (dataChanged).
+        '''
+        for row, field in enumerate(self.field_names):
+            field_str = str(self.edf_dict.get(field))
+            if field_str != self.edf_info[row][0]:
+                self.edf_info[row][0] = field_str
+                self.dataChanged.emit(self.index(row, 0), self.index(row, 0))
         
         
     def columnCount(self, index):
@@ -82,7 +111,7 @@ class FieldTableModel(QAbstractTableModel):
     # Called by the constructor and by the changeEvent when LanguageChange
     def retranslateUi(self):
         # Headers labels
-        self.ver_header_labels = [self.tr('patient identification'), self.tr('recording identification'),\
+        self.ver_header_labels = [self.tr('version'), self.tr('patient identification'), self.tr('recording identification'),\
                                     self.tr('start date'), self.tr('start time'), self.tr('number of bytes in header'),\
                                     self.tr('comment 44 char reserved'), self.tr('number of data records'),\
                                     self.tr('record length (sec)'), self.tr('number of channels'),\
@@ -92,36 +121,142 @@ class FieldTableModel(QAbstractTableModel):
                                     self.tr('comment 32 char rsv'), self.tr('*real nb of bytes in header'),\
                                     self.tr('*real nb of records')]
         self.hor_header_labels = [self.tr('value')]        
+        self.headerDataChanged.emit(Qt.Vertical, 0, len(self.ver_header_labels)-1)
         
         
 class FileListModel(QAbstractListModel):
     '''
     Class to store data in order to show and navigate through the edf files.
-    It contains a list of edf_hdr, an edf_edf for each edf file loaded.
+    Each edf file loaded is a record saved in a single list (edf_records) :
+        [complete path, file name, edf_hdr, start date key, number of channels]
+    The records are inserted and removed with beginInsertRows/beginRemoveRows
+    so the view only updates the rows changed.
     '''
+    # Roles used by FileListProxyModel to sort the edf files
+    SortNameRole = Qt.UserRole + 1
+    SortDateRole = Qt.UserRole + 2
+    SortNchanRole = Qt.UserRole + 3
+
     def __init__( self):
         '''
-        Initializes the two members the class holds:
-        the file name and its contents.
+        Initializes the list of records (one per edf file loaded).
         '''
         super(FileListModel, self).__init__()
-        # Data useful to manage the model
-        self.edf_complete_path = [] # path of each edf loaded
-        self.edf_hdr_list = [] # list of edf_hdr_dict for each edf loaded
-        # Data of the model, data actually shown on the list
-        self.edf_file_names = []
+        self.edf_records = []
 
     # the two methods rowcount() and data() are standard Model methods 
     # we must implement for a list model.
     def data(self, index, role):
-        if role == Qt.DisplayRole:
-            text = self.edf_file_names[index.row()]
-            return text
+        record = self.edf_records[index.row()]
+        if role == Qt.DisplayRole or role == self.SortNameRole:
+            return record[1]
+        if role == Qt.ToolTipRole:
+            return record[0]
+        if role == self.SortDateRole:
+            return record[3]
+        if role == self.SortNchanRole:
+            return record[4]
         
     # the two methods rowcount() and data() are standard Model methods 
     # we must implement for a list model.
-    def rowCount(self, index):
-        return len(self.edf_file_names)
+    def rowCount(self, index=QModelIndex()):
+        if index.isValid():
+            return 0
+        return len(self.edf_records)
+
+
+    def insert_files(self, row, fileNames, edf_hdr_list):
+        '''
+        Insert the edf files (and their edf_hdr) at the row "row", 
+        at the end if row is -1.
+        '''
+        if not fileNames:
+            return
+        if row < 0 or row > len(self.edf_records):
+            row = len(self.edf_records)
+        records = []
+        for fileName, edf_hdr_dict in zip(fileNames, edf_hdr_list):
+            start = CEAMS_edfLib.edf_start_datetime(edf_hdr_dict)
+            records.append([fileName, os.path.basename(fileName), edf_hdr_dict, \
+                            start.isoformat() if start is not None else '', \
+                            int(edf_hdr_dict.get('nchan'))])
+        self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+        self.edf_records[row:row] = records
+        self.endInsertRows()
+
+
+    def remove_file(self, row):
+        ''' Remove the edf file at the row "row".'''
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.edf_records.pop(row)
+        self.endRemoveRows()
+
+
+    def clear(self):
+        ''' Remove all the edf files.'''
+        self.beginResetModel()
+        self.edf_records = []
+        self.endResetModel()
+
+
+    def get_path(self, row):
+        ''' Return the complete path of the edf file at the row "row".'''
+        return self.edf_records[row][0]
+
+
+    def get_hdr(self, row):
+        ''' Return the edf_hdr of the edf file at the row "row".'''
+        return self.edf_records[row][2]
+
+
+    # Lists of the edf files loaded (in the loading order) for the reports
+    @property
+    def edf_complete_path(self):
+        return [record[0] for record in self.edf_records]
+
+    @property
+    def edf_file_names(self):
+        return [record[1] for record in self.edf_records]
+
+    @property
+    def edf_hdr_list(self):
+        return [record[2] for record in self.edf_records]
+
+
+class FileListProxyModel(QSortFilterProxyModel):
+    '''
+    Class to sort and filter the edf files of a FileListModel.
+    The edf files are filtered by name and sorted by name, start date or
+    number of channels (sort keys in the same order as the sort combo box).
+    '''
+    SORT_ROLES = [None, FileListModel.SortNameRole, FileListModel.SortDateRole, \
+                  FileListModel.SortNchanRole]
+
+    def __init__( self):
+        super(FileListProxyModel, self).__init__()
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setSortCaseSensitivity(Qt.CaseInsensitive)
+        self.setDynamicSortFilter(True)
+
+
+    def sort_by(self, sort_key):
+        '''
+        Sort the edf files by the sort key "sort_key" (index of SORT_ROLES), 
+        the loading order is restored with the sort key 0.
+        '''
+        if sort_key <= 0 or sort_key >= len(self.SORT_ROLES):
+            self.sort(-1)
+        else:
+            self.setSortRole(self.SORT_ROLES[sort_key])
+            self.sort(0, Qt.AscendingOrder)
+
+
+    def source_row(self, index):
+        ''' Return the row in the FileListModel of the proxy index "index"
+        (-1 if the index is not valid).'''
+        if not index.isValid():
+            return -1
+        return self.mapToSource(index).row()
     
 
 class ValueTableModel(QAbstractTableModel):
@@ -135,23 +270,57 @@ class ValueTableModel(QAbstractTableModel):
         
         # Specific to our data
         self.ch_labels = []
-        # To store a copy of what is shown on table field
-        self.edf_info = []
-        # To store a copy of what is read in the edf
-        self.edf_dict = []
-        
-        # Data of the model shown on the table view
-        # what needs to be updated
-        self.field_value = []
+        # The edf header read in the edf (shared with FieldTableModel)
+        # where the edited fields are saved
+        self.edf_dict = {}
         
-        # Set the labels
-        self.ver_header_labels = ['value'] # value or all the channel labels
-        self.hor_header_labels = ['patient_id']        
+        # The field shown on the table view : the value of the field or
+        # the value of each channel when the field is specific to each channel
+        self.selected_field = None
+        # Content of the selected field, read once from the edf header
+        # (the header converts the text of the channels at each access)
+        self.field_content = None
 
         # Reference to the message window to print messages
         self.message_win = message_win
 
 
+    def set_header(self, edf_dict, selected_field=None):
+        '''
+        Show the field "selected_field" (the first field by default) 
+        of the edf header "edf_dict" (the model is reset once).
+        '''
+        self.beginResetModel()
+        self.edf_dict = edf_dict
+        self.ch_labels = list(edf_dict.get('ch_labels', []))
+        if selected_field is None and len(edf_dict) > 0:
+            selected_field = next(iter(edf_dict))
+        self.selected_field = selected_field
+        self.field_content = edf_dict.get(selected_field)
+        self.endResetModel()
+
+
+    def select_field(self, selected_field):
+        '''
+        Show the field "selected_field" of the edf header (the model is reset
+        once, only the rows visible are read by the view).
+        '''
+        self.beginResetModel()
+        self.selected_field = selected_field
+        self.field_content = self.edf_dict.get(selected_field)
+        self.endResetModel()
+
+
+    # Return the content of the field shown
+    def _field_content(self):
+        return self.field_content
+
+
+    # True if the field shown has a value for each channel
+    def _is_chan_field(self):
+        return isinstance(self._field_content(), (list, np.ndarray))
+
+
     # To make the code easier to read : its the translate fonction
     def tr(self, text_to_translate):
         "Text translation to support different languages in the application."
@@ -218,31 +387,40 @@ class ValueTableModel(QAbstractTableModel):
         # The length of the outer list.
         # The nb of edf fields
         if role == Qt.DisplayRole or role == Qt.EditRole:
-            return self.field_value[index.row()][index.column()]
+            if self._is_chan_field():
+                return str(self._field_content()[index.row()])
+            return str(self._field_content())
         if role == Qt.ToolTipRole:
-            return self.tool_tip_string(self.hor_header_labels[0])
+            return self.tool_tip_string(self.selected_field)
         
         
-    def columnCount(self, index):
-        # The following takes the first sub-list, and returns
-        # the length (only works if all rows are an equal length)
-        # the number of edf field valuemodel_table_value
-        #   all channel label must be packed in one string for now
+    def columnCount(self, index=QModelIndex()):
+        # A single column : the value of the field selected
         if self.rowCount(index):
-            return len(self.field_value[0])
+            return 1
         else:
             return 0
         
 
-    def rowCount(self, index):
-        return len(self.field_value)
+    def rowCount(self, index=QModelIndex()):
+        # One row per channel when the field is specific to each channel
+        if self.selected_field is None:
+            return 0
+        if self._is_chan_field():
+            return len(self._field_content())
+        return 1
 
     
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         if role == Qt.DisplayRole and orientation == Qt.Horizontal:
-            return self.hor_header_labels[section]
+            return str(self.selected_field)
         if role == Qt.DisplayRole and orientation == Qt.Vertical:
-            return self.ver_header_labels[section]        
+            # Channel labels when the field is specific to each channel
+            if not self._is_chan_field():
+                return 'value'
+            if section < len(self.ch_labels):
+                return self.ch_labels[section]
+            return str(section)
         return QAbstractTableModel.headerData(self, section, orientation, role)
     
     
@@ -257,67 +435,57 @@ class ValueTableModel(QAbstractTableModel):
         if role == Qt.EditRole:
             
             # To know which field is edited
-            edited_field = self.hor_header_labels
-            self.message_win.append("User edits '{}' row {} value is {}'".format(edited_field[0],\
+            edited_field = self.selected_field
+            field_content = self._field_content()
+            self.message_win.append("User edits '{}' row {} value is {}'".format(edited_field,\
                                                 index.row(), value))
              
-            # Update the current model 
-            # To see the edited data on the table view
-            self.field_value[index.row()][index.column()] = value
-            self.layoutChanged.emit() 
-            
-            # Flat the list (the selected field creates a list of list)
-            flat_list = [item for sublist in self.field_value for item in sublist]
-            
             # Evaluate the instance of edited field
-            if isinstance(self.edf_dict.get(edited_field[0]), np.ndarray):
-                edited_array = np.zeros(len(flat_list))
-                for index, item in enumerate(flat_list):
-                    edited_array[index] = item
+            # The value of the other channels are kept
+            if isinstance(field_content, np.ndarray):
+                edited_array = np.array(field_content, dtype=float)
+                try:
+                    edited_array[index.row()] = value
+                except ValueError:
+                    self.message_win.append("{} was not modified!".format(edited_field))
+                    return False
                 self.message_win.append("value to provide to modify_edf_header is {}'".format(edited_array))
                 hdr_mod = CEAMS_edfLib.modify_edf_header(self.edf_dict, \
-                        edited_field[0], edited_array, self.message_win)
-            elif isinstance(self.edf_dict.get(edited_field[0]), list):
-                self.message_win.append("value to provide to modify_edf_header is {}'".format(flat_list))
+                        edited_field, edited_array, self.message_win)
+            elif isinstance(field_content, list):
+                edited_list = list(field_content)
+                edited_list[index.row()] = value
+                self.message_win.append("value to provide to modify_edf_header is {}'".format(edited_list))
                 hdr_mod = CEAMS_edfLib.modify_edf_header(self.edf_dict, \
-                        edited_field[0], flat_list, self.message_win)
-            elif isinstance(self.edf_dict.get(edited_field[0]), str):
-                self.message_win.append("value to provide to modify_edf_header is '{}'".format(str(flat_list[0])))
+                        edited_field, edited_list, self.message_win)
+            elif isinstance(field_content, str):
+                self.message_win.append("value to provide to modify_edf_header is '{}'".format(str(value)))
                 hdr_mod = CEAMS_edfLib.modify_edf_header(self.edf_dict, \
-                        edited_field[0], str(flat_list[0]), self.message_win)
-            elif isinstance(self.edf_dict.get(edited_field[0]), int) or \
-                isinstance(self.edf_dict.get(edited_field[0]), float):
-                self.message_win.append("value to provide to modify_edf_header is '{}'".format(flat_list[0]))
+                        edited_field, str(value), self.message_win)
+            elif isinstance(field_content, int) or \
+                isinstance(field_content, float):
+                self.message_win.append("value to provide to modify_edf_header is '{}'".format(value))
                 hdr_mod = CEAMS_edfLib.modify_edf_header(self.edf_dict, \
-                        edited_field[0], flat_list[0], self.message_win)                
+                        edited_field, value, self.message_win)                
             else:
                 self.message_win.append("The edited field has an unexpecetd type = {}".\
-                      format(type(self.edf_dict.get(edited_field[0]))))
+                      format(type(field_content)))
                 hdr_mod = False
             
             
             # If the field was modified sucessfully
             if hdr_mod:
-                # Update the current model
-                # Store the modified data into edf_info
-                self.edf_info = []
-                for label_dict, value_dict in self.edf_dict.items():
-                    self.edf_info.append([label_dict, value_dict])
-                self.message_win.append("{} was modified to '{}'".format(edited_field[0],value))
+                self.message_win.append("{} was modified to '{}'".format(edited_field,value))
+                self.field_content = self.edf_dict.get(edited_field)
                 
                 # set the channel labels into the model
-                if edited_field[0]=="ch_labels":
-                    self.ch_labels = []
-                    self.ver_header_labels = []
-                    for chan in self.edf_dict.get('ch_labels'):
-                        self.ch_labels.append(chan)
-                        self.ver_header_labels.append(chan)
-                        self.layoutChanged.emit()
+                if edited_field=="ch_labels":
+                    self.ch_labels = list(self.edf_dict.get('ch_labels'))
+                    self.headerDataChanged.emit(Qt.Vertical, 0, len(self.ch_labels)-1)
                         
-                self.layoutChanged.emit()
+                # Update the rows of the field on the table view
+                self.dataChanged.emit(self.index(0, 0), \
+                                      self.index(self.rowCount()-1, 0))
             else:
-                self.message_win.append("{} was not modified!".format(edited_field[0]))
+                self.message_win.append("{} was not modified!".format(edited_field))
             return True
-    
-    
-    
\ No newline at end of file
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background loading of the edf headers for the GUI.
+The headers are read by the threads of a QThreadPool (one task per file)
+and each header is sent back to the GUI thread with the signal "loaded" as
+soon as it is read.  The GUI stays responsive whatever the number of files.
+
+Usage :
+    hdr_loader = HdrLoader(fileNames, hdr_index)
+    hdr_loader.signals.loaded.connect(your_slot)
+    hdr_loader.start()
+    ...
+    hdr_loader.cancel()
+
+Created on Sun Oct 18 09:12:27 2026
+
+@author: Karine Lacourse karine.lacourse.cnmtl@ssss.gouv.qc.ca
+"""
+
+import CEAMS_edfIndex
+from PyQt5.QtCore import pyqtSignal, QObject, QRunnable, QThreadPool
+
+
+class HdrLoaderSignals(QObject):
+    '''
+    Signals emitted by the loading tasks (a QRunnable can not emit signals).
+        loaded(i_file, fileName, edf_hdr_dict, messages) : emitted when a
+            header is read, edf_hdr_dict is None if the header could not be read.
+    '''
+    loaded = pyqtSignal(int, str, object, list)
+
+
+class HdrLoaderTask(QRunnable):
+    '''
+    Task to read the header of one edf file in a thread of the pool.
+    The messages of read_edf_header are kept in a list and sent with the header
+    because the message window can only be used in the GUI thread.
+    '''
+    def __init__( self, hdr_loader, i_file, fileName):
+        super(HdrLoaderTask, self).__init__()
+        self.hdr_loader = hdr_loader
+        self.i_file = i_file
+        self.fileName = fileName
+
+
+    def run(self):
+        # The task is skipped if the loading has been cancelled
+        if self.hdr_loader.cancelled:
+            return
+        messages = []
+        try:
+            # Load the edf file (from the index if already read)
+            edf_hdr_dict = CEAMS_edfIndex.read_edf_header_cached(self.fileName, \
+                                    messages, self.hdr_loader.hdr_index)
+        except (Exception, SystemExit) as err:
+            messages.append('ERROR : {} could not be read ({})'.format(\
+                self.fileName, err))
+            edf_hdr_dict = None
+        if not self.hdr_loader.cancelled:
+            self.hdr_loader.signals.loaded.emit(self.i_file, self.fileName, \
+                                                edf_hdr_dict, messages)
+
+
+class HdrLoader():
+    '''
+    Load the headers of a list of edf files in the background.
+    The headers arrive in any order through signals.loaded.
+    '''
+    def __init__( self, fileNames, hdr_index=None, thread_pool=None):
+        self.fileNames = list(fileNames)
+        # Index of the edf headers (shared between the threads)
+        self.hdr_index = hdr_index
+        if thread_pool is None:
+            thread_pool = QThreadPool.globalInstance()
+        self.thread_pool = thread_pool
+        self.signals = HdrLoaderSignals()
+        self.cancelled = False
+
+
+    def start(self):
+        ''' Start one task per file in the thread pool.'''
+        for i_file, fileName in enumerate(self.fileNames):
+            self.thread_pool.start(HdrLoaderTask(self, i_file, fileName))
+
+
+    def cancel(self):
+        ''' The tasks not started are skipped and the headers
+        read after the cancellation are not sent.'''
+        self.cancelled = True
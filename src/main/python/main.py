@@ -18,17 +18,21 @@ Created on Fri Nov 20 09:37:12 2020
 @author: Karine Lacourse karine.lacourse.cnmtl@ssss.gouv.qc.ca
 """
 
+import CEAMS_edfIndex
 import CEAMS_edfLib
-from customTableModel import FieldTableModel, FileListModel, ValueTableModel
+import CEAMS_edfReports
+import CEAMS_edfRewrite
+import CEAMS_edfValid
+from customTableModel import FieldTableModel, FileListModel, FileListProxyModel, \
+    ValueTableModel
 # import datetime
 from fbs_runtime.application_context.PyQt5 import ApplicationContext
+from hdrLoader import HdrLoader
 import locale # to read the local system language
 from MainWindow import Ui_MainWindow
-import numpy as np
 import os
-import pandas as pd
-from PyQt5.QtWidgets import QMainWindow, QFileDialog
-from PyQt5.QtCore import pyqtSlot, QEvent, Qt, QTranslator, QCoreApplication
+from PyQt5.QtWidgets import QMainWindow, QFileDialog, QInputDialog, QProgressDialog
+from PyQt5.QtCore import pyqtSlot, QEvent, Qt, QTimer, QTranslator, QCoreApplication
 import qdarkstyle
 import sys
 
@@ -49,8 +53,17 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Create the data model for the edf files list
         # The field list and field content model are created only 
         # when a edf file is loaded
+        # The list view shows the edf files through a proxy to sort and filter them
         self.model_file_list = FileListModel()
-        self.listView.setModel(self.model_file_list)
+        self.proxy_file_list = FileListProxyModel()
+        self.proxy_file_list.setSourceModel(self.model_file_list)
+        self.listView.setModel(self.proxy_file_list)
+        # The models of the edf fields and of the field content are created once,
+        # the edf header shown is changed when a edf file is selected
+        self.model_table_field = FieldTableModel(self.message_win)
+        self.model_table_value = ValueTableModel(self.message_win)
+        self.tableView.setModel(self.model_table_field)
+        self.tableView_2.setModel(self.model_table_value)
 
         # To detect the enter pressed on the edf field content view
         self.tableView_2.installEventFilter(self)
@@ -60,6 +73,23 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         
         # Store a reference to the context for resources
         self.ctx = appctxt 
+        
+        # Index of the edf headers already read (to avoid reading them again)
+        try:
+            self.hdr_index = CEAMS_edfIndex.EdfHdrIndex(\
+                                CEAMS_edfIndex.default_index_fname())
+        except Exception as err:
+            self.debugPrint("The index of the edf headers could not be opened : {}".format(err))
+            self.hdr_index = None
+
+        # Loading of the edf headers in the background (None when nothing is loading)
+        self.hdr_loader = None
+        # The headers loaded are added to the edf list by batch
+        self.hdr_pending = []
+        self.hdr_flush_timer = QTimer(self)
+        self.hdr_flush_timer.setSingleShot(True)
+        self.hdr_flush_timer.setInterval(100)
+        self.hdr_flush_timer.timeout.connect(self.flush_loaded_files)
 
 
     @pyqtSlot( )
@@ -72,21 +102,14 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                         None,
                         "getOpenFileNames()",
                         "",
-                        "EDF files (*.edf);;REC files (*.rec)",
+                        "EDF files (*.edf);;REC files (*.rec);;BDF files (*.bdf)",
                         options=options)        
         if fileNames:
             # Keep the selected field if any
             my_qmodelindex = self.tableView.currentIndex()
             selected_field = my_qmodelindex.row()
-            for fileName in fileNames:
-                # Load the edf file 
-                edf_hdr_dict = CEAMS_edfLib.read_edf_header(fileName, self.message_win)            
-                # Fill the edf list model
-                self.fill_list_model(fileName, edf_hdr_dict)
-                # Fill the edf field table and the edf value table
-                self.fill_table_model(fileName, edf_hdr_dict, selected_field)
-                # Plot debug message
-                self.debugPrint( "setting file name: " + fileName )
+            # Load the edf files in the background
+            self.load_edf_files(fileNames, selected_field)
     
     
     @pyqtSlot( )
@@ -132,28 +155,20 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         ''' Called when the user click on the "clear" push buttom in the listView.
             The EDF list will be cleared.
         '''
-        # Re-create the data model for the edf files list, field list and value
-        self.model_file_list = FileListModel()
-        self.listView.setModel(self.model_file_list)
-        self.model_table_field = FieldTableModel(self.message_win)
-        self.model_table_value = ValueTableModel(self.message_win)
-        self.tableView.setModel(self.model_table_field)
-        self.tableView_2.setModel(self.model_table_value)        
+        # Clear the edf files list, the field list and value
+        self.model_file_list.clear()
+        self.model_table_field.set_header({})
+        self.model_table_value.set_header({})
         # Turn off the clear and the remove button
         self.pushButton_clr.setEnabled(False)        
         self.pushButton_rm.setEnabled(False) 
         
 
     @pyqtSlot( )
-    # To complete this feature :
-    # -We need to modify the channel EDF Annotations properly.
-    # -We need to add verification to merge more than 2 files :
-    #   should work with more than one files if all the dates are different
-    #   or all the same date with different starttime.
     def concat2FilesSlot( self ):
-        ''' Called when the user select concatenate 2 files from submenu.
-            The user will be asked to load 2 files and they will be concatenate 
-            if possible.
+        ''' Called when the user select concatenate files from submenu.
+            The user will be asked to load the files (2 or more) and they 
+            will be concatenated in the order of their start if possible.
         '''           
         options = QFileDialog.Options()
         options |= QFileDialog.DontUseNativeDialog
@@ -161,133 +176,34 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                         None,
                         "getOpenFileNames()",
                         "",
-                        "EDF files (*.edf);;REC files (*.rec)",
+                        "EDF files (*.edf);;REC files (*.rec);;BDF files (*.bdf)",
                         options=options)
         
         if fileNames:
-            edf_hdr_lst = []
-            for fileName in fileNames:
-                # Add the edf header file into the list      
-                edf_hdr_lst.append(CEAMS_edfLib.read_edf_header(fileName, self.message_win))
-                
-            # Verification if the concatenation is possible
-            # Some fields need to be the same through the files :
-            string_2_cmp = ['patient_id', 'hdr_nbytes', 'record_length_sec',\
-                'nchan', 'ch_labels', 'physical_min', 'physical_max', \
-                'digital_min', 'digital_max', 'prefiltering', 'n_samps_record']
-            concat_true = True
-            
-            # Compare each field of the loaded files
-            for field in string_2_cmp:               
-                # Loop through the files
-                tmp_lst = []
-                for edf_hdr in edf_hdr_lst:
-                    tmp_lst.append(edf_hdr.get(field))
-                
-                # Compare each edf field for all the files
-                # for arrays
-                if isinstance(tmp_lst[0], np.ndarray):
-                    for i in range(len(tmp_lst)-1):
-                        if any(tmp_lst[0]!=tmp_lst[i+1]):
-                            self.debugPrint(field + " is not the same through"\
-                                            + " the files to concatenate")                            
-                            concat_true = False
-                # for single value as string, float, int
-                else:
-                    if tmp_lst.count(tmp_lst[0]) != len(tmp_lst):
-                        self.debugPrint(field + " is not the same through "\
-                                        + "the files to concatenate")
-                        concat_true = False
-            
-            # Verification of the starttime and the duration
-            # should work with more than one files if all the date are different
-            # or all the same date with different starttime.
-            #   ERROR : could have problem if the first 2 files have 
-            #   the same date but not the third one.
-            if concat_true:
-                field = 'startdate'
-                # ex) dd.mm.yy
-                # Loop through the files
-                date_lst = []
-                for edf_hdr in edf_hdr_lst:
-                    date_lst.append(edf_hdr.get(field))
-                field = 'starttime'
-                # ex) hh.mm.ss
-                # Loop through the files
-                time_lst = []
-                for edf_hdr in edf_hdr_lst:
-                    time_lst.append(edf_hdr.get(field))                
-                
-                # if the startdate recording are not the same
-                if date_lst.count(date_lst[0]) != len(date_lst):
-                    # find the order of the recordings
-                    year_lst = []
-                    month_lst = []
-                    day_lst = []
-                    for lst in date_lst:
-                        year_lst.append(int(lst[6:8]))
-                        month_lst.append(int(lst[3:5]))   
-                        day_lst.append(int(lst[0:2]))
-                    if year_lst.count(year_lst[0]) != len(year_lst):
-                        file_order = np.argsort(year_lst)
-                    elif month_lst.count(month_lst[0]) != len(month_lst):
-                        file_order = np.argsort(month_lst)
-                    elif day_lst.count(day_lst[0]) != len(day_lst):
-                        file_order = np.argsort(day_lst)
-                    else:
-                        file_order = []
-                # if the starttime recording are not the same
-                elif time_lst.count(time_lst[0]) != len(time_lst):
-                    # find the order of the recordings
-                    hour_lst = []
-                    min_lst = []
-                    sec_lst = []
-                    for lst in time_lst:
-                        hour_lst.append(int(lst[0:2]))
-                        min_lst.append(int(lst[3:5]))   
-                        sec_lst.append(int(lst[6:8]))
-                    if hour_lst.count(hour_lst[0]) != len(hour_lst):
-                        file_order = np.argsort(hour_lst)
-                    elif min_lst.count(min_lst[0]) != len(min_lst):
-                        file_order = np.argsort(min_lst)
-                    elif sec_lst.count(sec_lst[0]) != len(sec_lst):
-                        file_order = np.argsort(sec_lst)
-                    else:
-                        file_order = []                                 
-                else:
-                    concat_true = False
-                    self.debugPrint("Startdate and starttime are the same")
-                
-                if len(file_order)==len(edf_hdr_lst):
-                    self.debugPrint("Files could be concatenated")
-                    
-                    # Ask to the user to select or write the filename to save the edf
-                    sl_file_name = QFileDialog.getSaveFileName(self, self.tr(\
-                            'Write the file name to save the edf'))
-                    edffilename_2write = sl_file_name[0]                    
-                    
-                    # Extract the first edf hdr
-                    edf_hdr = edf_hdr_lst[file_order[0]]
-                    # Sum the n_records
-                    field = 'n_records'
-                    n_records = 0
-                    for edf_hdr_tmp in edf_hdr_lst:
-                        n_records = n_records + edf_hdr_tmp.get(field)              
-                    edf_hdr['n_records'] = n_records
-                    
-                    # Write the header
-                    CEAMS_edfLib.write_edf_hdr(edffilename_2write, edf_hdr, self.message_win)
-                    # Extract data in the right order
-                    for ifile in range(len(fileNames)):
-                        edf_data = CEAMS_edfLib.read_edf_data(\
-                            fileNames[file_order[ifile]], edf_hdr.get('hdr_nbytes'))
-                        # Write the data
-                        CEAMS_edfLib.write_edf_data(edffilename_2write,\
-                                edf_hdr, edf_data, self.message_win)
-                else:
-                    self.debugPrint("Files could not be concatenated")
+            # Ask to the user to select or write the filename to save the edf
+            sl_file_name = QFileDialog.getSaveFileName(self, self.tr(\
+                    'Write the file name to save the edf'))
+            edffilename_2write = sl_file_name[0]
+            if not edffilename_2write:
+                return
+            if os.path.abspath(edffilename_2write) in \
+                [os.path.abspath(fileName) for fileName in fileNames]:
+                self.debugPrint("The concatenated file can not be one of the files to concatenate")
+                return
+            # The data records are copied by chunks from each file
+            progress_dlg = QProgressDialog(self.tr('Concatenating the edf files...'), \
+                                           None, 0, 1000, self)
+            progress_dlg.setWindowModality(Qt.WindowModal)
+            progress_dlg.setMinimumDuration(500)
+            def progress_callback(n_bytes_copied, n_bytes_total):
+                progress_dlg.setValue(int(1000*n_bytes_copied/max(n_bytes_total, 1)))
+                QCoreApplication.processEvents()
+            if CEAMS_edfLib.concat_edf_files(fileNames, edffilename_2write, \
+                                    self.message_win, progress_callback):
+                self.debugPrint("Files are concatenated")
             else:
                 self.debugPrint("Files could not be concatenated")
+            progress_dlg.setValue(1000)
 
             
     @pyqtSlot( )
@@ -321,12 +237,15 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # the function currentIndex returns a QModelIndex Class
         # QModelIndex has a function row() and it returns a int
         # Extract the selected row index
+        # (the row in the list view is mapped to the row in the edf list model)
         my_qmodelindex = self.listView.currentIndex()
-        file_sel_row = my_qmodelindex.row() 
-        selected_file = self.model_file_list.edf_complete_path[file_sel_row]
+        file_sel_row = self.proxy_file_list.source_row(my_qmodelindex)
+        if file_sel_row < 0:
+            return
+        selected_file = self.model_file_list.get_path(file_sel_row)
         
         # Extract the edf content models to avoid loading the file again
-        edf_hdr_dict = self.model_file_list.edf_hdr_list[file_sel_row]             
+        edf_hdr_dict = self.model_file_list.get_hdr(file_sel_row)             
         # fill the table view from the edf_dict saved 
         self.fill_table_model(selected_file, edf_hdr_dict, selected_field)
         
@@ -334,49 +253,30 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.pushButton_rm.setEnabled(True)      
 
 
-    def fill_list_model(self, fileName, edf_hdr_dict):
+    def fill_list_model(self, fileNames, edf_hdr_list):
         '''
-        When the user asked for a new edf file to be loaded.
-        The edf file list is updated with the new edf file, just loaded.
+        When the user asked for new edf files to be loaded.
+        The edf file list is updated with the new edf files, just loaded.
         Parameters
         ----------
-        fileName : string
-            Filename including the path of the edf file to show.
-        edf_hdr_dict : dict
-            Dictionnary of the edf header.
+        fileNames : list of string
+            Filename including the path of each edf file to show.
+        edf_hdr_list : list of dict
+            Dictionnary of the edf header of each edf file.
 
         Returns
         -------
         None
 
         '''
-        # Clear selection of the edf list when a new edf is loaded
-        # self.listView.clearSelection()
-        # Show the new edf file loaded           
-        head, tail = os.path.split(fileName)
-        # If it is the first edf file to be loaded
-        if not self.model_file_list.edf_file_names:
-            self.model_file_list.edf_complete_path.append(fileName)
-            self.model_file_list.edf_file_names.append(tail)
-            self.model_file_list.edf_hdr_list.append(edf_hdr_dict)
-        else:
-            # Extract the selected row index
-            my_qmodelindex = self.listView.currentIndex()                
-            file_sel_row = my_qmodelindex.row()
-            # Insert the new edf file where the cursor is on the list view
-            if file_sel_row > -1:
-                self.model_file_list.edf_complete_path.insert(file_sel_row,fileName)
-                self.model_file_list.edf_file_names.insert(file_sel_row,tail)
-                self.model_file_list.edf_hdr_list.insert(file_sel_row, edf_hdr_dict)
-                # Turn on the remove button if a file is selected
-                self.pushButton_rm.setEnabled(True)                
-            # If there is no file selected
-            else: 
-                self.model_file_list.edf_complete_path.append(fileName)
-                self.model_file_list.edf_file_names.append(tail)    
-                self.model_file_list.edf_hdr_list.append(edf_hdr_dict)
-        # Update the changes on the list view
-        self.model_file_list.layoutChanged.emit()
+        # Insert the new edf files where the cursor is on the list view
+        # (at the end if there is no file selected)
+        my_qmodelindex = self.listView.currentIndex()                
+        file_sel_row = self.proxy_file_list.source_row(my_qmodelindex)
+        self.model_file_list.insert_files(file_sel_row, fileNames, edf_hdr_list)
+        if file_sel_row > -1:
+            # Turn on the remove button if a file is selected
+            self.pushButton_rm.setEnabled(True)                
         
         # Turn on the write button
         self.pushButton_clr.setEnabled(True)
@@ -401,50 +301,20 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         None        
         '''
         
-        # Contruct the model based on the edf file to show
-        self.model_table_field = FieldTableModel(self.message_win)
-        self.model_table_value = ValueTableModel(self.message_win)
-        self.tableView.setModel(self.model_table_field)
-        self.tableView_2.setModel(self.model_table_value)
-
         # Dict of all the edf field
         # Where the current data is stored
         # Where the data to write in a new edf is taken
         # Edited field will be saved there and propagated to 
-        # model_table_field.edf_info after the "enter" pressed
-        self.model_table_value.edf_dict = edf_hdr_dict
-        
-        # Convert the dict into a list (field label : field value)
-        # because the view needs a list
-        for label_dict, value_dict in edf_hdr_dict.items():
-            # Access the edf field list via the model model_table_field.
-            # Plot the field label selected as horizontal header (first field per default) 
-            self.model_table_field.edf_info.append([str(value_dict)])
-            self.model_table_value.edf_info.append([label_dict, value_dict])
-            self.model_table_field.layoutChanged.emit()
-        
-        self.model_table_field.layoutChanged.emit()
-        self.model_table_value.layoutChanged.emit()
-        
-        # the table value is init to the first field by default to show something
-        self.model_table_value.field_value.append([str(self.model_table_value.\
-                            edf_info[0][1])])
-        
-        # set the channel labels into the model in order to show them when the
-        # field selected is specific to each channel (such as "digital min")
-        self.model_table_value.ch_labels = []
-        for chan in edf_hdr_dict.get('ch_labels'):
-            self.model_table_value.ch_labels.append(chan)
+        # model_table_field after the "enter" pressed
+        # Each model is reset once with the edf header to show
+        self.model_table_field.set_header(edf_hdr_dict)
+        # the table value is init to the patient identification to show something
+        self.model_table_value.set_header(edf_hdr_dict, 'patient_id')
         
         # Set the current selection to be the same as it was before edf file changed
         if selected_field>-1:
             self.tableView.selectRow(selected_field)
             self.rowClickedSlot()
-        else:
-            # Plot the field label selected as horizontal header (first field per default)
-            self.model_table_value.hor_header_labels = ["patient_id"]
-            self.model_table_value.ver_header_labels = ["value"]
-            self.model_table_value.layoutChanged.emit()                       
         
         # Empty the input
         self.lineEdit.setText("")
@@ -462,13 +332,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         if obj is self.tableView_2 and event.type() == QEvent.KeyPress:
             if event.key() in (Qt.Key_Return, Qt.Key_Enter):
                 # Update the model : model_table_field
-                # Convert the dict into a list for the model_table_field
-                self.model_table_field.edf_info = []
-                for label_dict, value_dict in self.model_table_value.edf_dict.items():
-                    # Access the edf field list via the model model_table_field.
-                    # Plot the field label selected as horizontal header (first field per default) 
-                    self.model_table_field.edf_info.append([str(value_dict)])
-                    self.model_table_field.layoutChanged.emit() 
+                # Only the fields modified are updated on the view
+                self.model_table_field.update_fields()
         return super(MainWindow, self).eventFilter(obj, event)        
 
 
@@ -484,9 +349,12 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Ask to the user to select the directory to save the report
         directory_name = QFileDialog.getExistingDirectory(self, \
                                 self.tr("Select a directory to save reports"))  
-        self._write_chan_count(directory_name)
+        # The channel table is shared by the channel reports
+        chan_table = CEAMS_edfReports.build_chan_table(\
+            self.model_file_list.edf_hdr_list, self.model_file_list.edf_file_names)
+        self._write_chan_count(directory_name, chan_table)
         self._write_hdr_rep(directory_name)
-        self._write_chan_reports(directory_name)
+        self._write_chan_reports(directory_name, chan_table)
             
             
     @pyqtSlot( )
@@ -515,6 +383,53 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self._write_chan_reports(directory_name)
         
         
+    @pyqtSlot( )
+    def genDataRepSlot(self):
+        '''
+        When the user click "Generate -> Data validation Report" from the menu.
+        The samples of each channel of the loaded files are validated
+        (clipping, out of range, flatline).
+        '''
+        # Ask to the user to select the directory to save the report
+        directory_name = QFileDialog.getExistingDirectory(self, \
+                                self.tr("Select a directory to save report"))  
+        if not directory_name:
+            return
+        edf_complete_path = self.model_file_list.edf_complete_path
+        edf_hdr_list = self.model_file_list.edf_hdr_list
+        progress_dlg = QProgressDialog(self.tr('Validating the edf data...'), \
+                            self.tr('Cancel'), 0, len(edf_complete_path), self)
+        progress_dlg.setWindowModality(Qt.WindowModal)
+        progress_dlg.setMinimumDuration(500)
+        data_valid_list = []
+        for file_i, (fileName, edf_hdr_dict) in enumerate(zip(edf_complete_path, edf_hdr_list)):
+            progress_dlg.setValue(file_i)
+            if progress_dlg.wasCanceled():
+                self.debugPrint("Data validation cancelled")
+                return
+            data_valid_list.append(CEAMS_edfValid.validate_edf_data(fileName, \
+                                        edf_hdr_dict, self.message_win))
+        progress_dlg.setValue(len(edf_complete_path))
+        CEAMS_edfReports.write_data_rep(data_valid_list, \
+            self.model_file_list.edf_file_names, directory_name, self.message_win)
+
+
+    @pyqtSlot( )
+    def genColumnarRepSlot(self):
+        '''
+        When the user click "Generate -> Tables - Parquet" from the menu.
+        The file table and the channel table of the loaded files are written
+        in Parquet format (edfHdrTable.parquet and edfChanTable.parquet).
+        '''
+        # Ask to the user to select the directory to save the tables
+        directory_name = QFileDialog.getExistingDirectory(self, \
+                                self.tr("Select a directory to save report"))  
+        if not directory_name:
+            return
+        CEAMS_edfReports.write_columnar_rep(self.model_file_list.edf_hdr_list, \
+            self.model_file_list.edf_file_names, directory_name, self.message_win)
+
+
     @pyqtSlot( )
     def genHdrRepSlot(self):
         '''
@@ -541,6 +456,108 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             return False        
 
  
+    def load_edf_files(self, fileNames, selected_field):
+        '''
+        Load the headers of the edf files in the background (QThreadPool).
+        The edf file list is filled as the headers arrive (hdrLoadedSlot) and
+        only the last selected file is shown in the field/value tables when
+        the loading is completed or cancelled (finish_loading).
+        Parameters
+        ----------
+        fileNames : list of string
+            Filename including the path of each edf file to load.
+        selected_field : int
+            Row of the field to select in the field table (-1 if none).
+
+        Returns
+        -------
+        None
+        '''
+        # Only one loading at a time, the previous one is stopped
+        if self.hdr_loader is not None:
+            self.hdr_loader.cancel()
+            self.finish_loading()
+        self.hdr_loader = HdrLoader(fileNames, self.hdr_index)
+        self.hdr_loader.signals.loaded.connect(self.hdrLoadedSlot)
+        # Headers received, key : index of the file in fileNames
+        self.hdr_loaded = {}
+        self.hdr_n_received = 0
+        self.hdr_selected_field = selected_field
+        self.progress_load = QProgressDialog(self.tr('Loading the edf files...'), \
+                                    self.tr('Cancel'), 0, len(fileNames), self)
+        self.progress_load.setMinimumDuration(500)
+        self.progress_load.setValue(0)
+        self.progress_load.canceled.connect(self.hdrLoadCanceledSlot)
+        self.hdr_loader.start()
+
+
+    @pyqtSlot(int, str, object, list)
+    def hdrLoadedSlot( self, i_file, fileName, edf_hdr_dict, messages ):
+        ''' Called (in the GUI thread) each time a header is read by the
+        loading threads.  The edf file is added to the edf file list.
+        '''
+        # Header sent by a loading already stopped
+        if self.hdr_loader is None or self.sender() is not self.hdr_loader.signals:
+            return
+        for message in messages:
+            self.debugPrint(message)
+        if edf_hdr_dict is None:
+            self.debugPrint( "Could not load the file: " + fileName )
+        else:
+            self.hdr_loaded[i_file] = (fileName, edf_hdr_dict)
+            # The edf list model is filled by batch (flush_loaded_files)
+            self.hdr_pending.append((fileName, edf_hdr_dict))
+            if not self.hdr_flush_timer.isActive():
+                self.hdr_flush_timer.start()
+            # Plot debug message
+            self.debugPrint( "setting file name: " + fileName )
+        self.hdr_n_received += 1
+        if self.hdr_n_received == len(self.hdr_loader.fileNames):
+            self.finish_loading()
+        else:
+            self.progress_load.setValue(self.hdr_n_received)
+
+
+    @pyqtSlot( )
+    def hdrLoadCanceledSlot( self ):
+        ''' Called when the user cancels the loading of the edf files.
+        The files already loaded are kept in the edf file list.
+        '''
+        if self.hdr_loader is not None:
+            self.hdr_loader.cancel()
+            self.debugPrint("Loading cancelled: {} of {} files loaded".format(\
+                len(self.hdr_loaded), len(self.hdr_loader.fileNames)))
+            self.finish_loading()
+
+
+    @pyqtSlot( )
+    def flush_loaded_files( self ):
+        ''' Add the edf files loaded since the last call to the edf list model.
+        '''
+        if self.hdr_pending:
+            fileNames, edf_hdr_list = zip(*self.hdr_pending)
+            self.hdr_pending = []
+            self.fill_list_model(list(fileNames), list(edf_hdr_list))
+
+
+    def finish_loading(self):
+        '''
+        When the loading of the edf files is completed or cancelled.
+        The last selected file loaded is shown in the field/value tables
+        and the index of the edf headers is saved.
+        '''
+        self.hdr_loader = None
+        self.hdr_flush_timer.stop()
+        self.flush_loaded_files()
+        self.progress_load.close()
+        if self.hdr_loaded:
+            fileName, edf_hdr_dict = self.hdr_loaded[max(self.hdr_loaded)]
+            # Fill the edf field table and the edf value table
+            self.fill_table_model(fileName, edf_hdr_dict, self.hdr_selected_field)
+        if self.hdr_index is not None:
+            self.hdr_index.commit()
+
+
     @pyqtSlot( )
     def lightModeSlot( self ):
         ''' Called when the user select light mode from the submenu
@@ -580,14 +597,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             # Keep the selected field if any
             my_qmodelindex = self.tableView.currentIndex()
             selected_field = my_qmodelindex.row()                 
-            # Load the edf file 
-            edf_hdr_dict = CEAMS_edfLib.read_edf_header(fileName, self.message_win)            
-            # Fill the edf list model
-            self.fill_list_model(fileName, edf_hdr_dict)
-            # Fill the edf field table and the edf value table
-            self.fill_table_model(fileName, edf_hdr_dict, selected_field)            
-            # Plot debug message
-            self.debugPrint( "setting file name: " + fileName )
+            # Load the edf file in the background
+            self.load_edf_files([fileName], selected_field)
         else:
             # Plot debug message
             self.debugPrint( "Invalid file specified: " + fileName  )
@@ -600,17 +611,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         '''
         # Extract the selected row index
         my_qmodelindex = self.listView.currentIndex()                
-        file_sel_row = my_qmodelindex.row()
-        # pop the selected edf file
-        self.model_file_list.edf_complete_path.pop(file_sel_row)
-        self.model_file_list.edf_file_names.pop(file_sel_row)
-        self.model_file_list.edf_hdr_list.pop(file_sel_row)
-        # Update the changes on the list view
-        self.model_file_list.layoutChanged.emit()
+        file_sel_row = self.proxy_file_list.source_row(my_qmodelindex)
+        if file_sel_row < 0:
+            return
+        # Remove the selected edf file
+        self.model_file_list.remove_file(file_sel_row)
         # Cleat the QTableView of the edf fields
-        self.model_table_value = ValueTableModel(self.message_win)
-        self.tableView.setModel(self.model_table_field)
-        self.tableView_2.setModel(self.model_table_value)          
+        self.model_table_value.set_header({})
         
 
     @pyqtSlot( )
@@ -627,29 +634,70 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Extract the selected row index        
         my_qmodelindex = self.tableView.currentIndex()
         selected_row = my_qmodelindex.row()        
-        selected_field = self.model_table_value.edf_info[selected_row][0]
-        selected_content = self.model_table_value.edf_info[selected_row][1]
-        
-        # Plot the field label selected as horizontal header
-        self.model_table_value.hor_header_labels = [str(selected_field)] 
-        
-        # Fill model_table_value
-        self.model_table_value.field_value = []
-        self.model_table_value.ver_header_labels = []
+        if selected_row < 0 or selected_row >= len(self.model_table_field.field_names):
+            return
+        selected_field = self.model_table_field.field_names[selected_row]
         
-        if isinstance(selected_content, list) or \
-            isinstance(selected_content, np.ndarray):
+        # Fill model_table_value (the model is reset once and the view reads
+        # only the visible rows)
+        self.model_table_value.select_field(selected_field)
 
-            # Print channel labels and content
-            for ichan, value_list in enumerate(selected_content):
-                self.model_table_value.field_value.append([str(value_list)])
-                self.model_table_value.ver_header_labels.append(\
-                                self.model_table_value.ch_labels[ichan])               
-                self.model_table_value.layoutChanged.emit()
-        else:
-            self.model_table_value.field_value.append([str(selected_content)]) 
-            self.model_table_value.ver_header_labels = ["value"]         
-            self.model_table_value.layoutChanged.emit()        
+
+    @pyqtSlot( )
+    def selectChansSlot( self ):
+        ''' Called when the user select "Select Channels" from the File menu.
+            The labels of the channels of the selected file are listed (one
+            per line), the user removes or reorders them and a new edf file
+            is written with the channels listed, in their order.
+        '''
+        my_qmodelindex = self.listView.currentIndex()
+        file_sel_row = self.proxy_file_list.source_row(my_qmodelindex)
+        if file_sel_row < 0:
+            self.debugPrint("Select an edf file in the list")
+            return
+        edf_complete_path = self.model_file_list.get_path(file_sel_row)
+        edf_hdr_dict = self.model_file_list.get_hdr(file_sel_row)
+        ch_labels = [label.strip() for label in edf_hdr_dict.get('ch_labels')]
+        chans_text, ok = QInputDialog.getMultiLineText(self, self.tr('Select Channels'), \
+            self.tr('Channels to keep (one label per line, in the order of the new file)'), \
+                "\n".join(ch_labels))
+        if not ok:
+            return
+        chans = [label.strip() for label in chans_text.splitlines() if label.strip()]
+        # Ask to the user to select or write the filename to save the edf
+        sl_file_name = QFileDialog.getSaveFileName(self, self.tr(\
+                'Write the file name to save the edf'))
+        edffilename_2write = sl_file_name[0]
+        if not edffilename_2write:
+            return
+        # The channels are copied by blocks of data records
+        progress_dlg = QProgressDialog(self.tr('Writing the edf file...'), \
+                                       None, 0, 1000, self)
+        progress_dlg.setWindowModality(Qt.WindowModal)
+        progress_dlg.setMinimumDuration(500)
+        def progress_callback(n_bytes_copied, n_bytes_total):
+            progress_dlg.setValue(int(1000*n_bytes_copied/max(n_bytes_total, 1)))
+            QCoreApplication.processEvents()
+        if CEAMS_edfRewrite.select_edf_chans(edf_complete_path, edf_hdr_dict, chans, \
+                edffilename_2write, self.message_win, progress_callback):
+            self.debugPrint("{} is written".format(edffilename_2write))
+        progress_dlg.setValue(1000)
+
+
+    @pyqtSlot( int )
+    def sortEdfListSlot( self, sort_key ):
+        ''' Called when the user selects a sort key in the combo box 
+        above the EDF list (loading order, name, start date or number of channels).
+        '''
+        self.proxy_file_list.sort_by(sort_key)
+
+
+    @pyqtSlot( str )
+    def filterEdfListSlot( self, filter_text ):
+        ''' Called when the user edits the filter above the EDF list.
+            Only the edf files with a name including the filter are shown.
+        '''
+        self.proxy_file_list.setFilterFixedString(filter_text)
 
 
     # To make the code easier to read : its the translate fonction
@@ -667,148 +715,52 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 'Write the file name to save the edf'))
         # Look for the right loaded file to write
         my_qmodelindex = self.listView.currentIndex()
-        file_sel = my_qmodelindex.row()
+        file_sel = self.proxy_file_list.source_row(my_qmodelindex)
         # If no selection, the last one is taken
-        edf_complete_path = self.model_file_list.edf_complete_path[file_sel]
+        edf_complete_path = self.model_file_list.get_path(file_sel)
         edffilename_2write = sl_file_name[0]
-        # Load the edf data to write a complete edf file
-        edf_data = CEAMS_edfLib.read_edf_data(edf_complete_path, \
-                            self.model_table_value.edf_dict.get('hdr_nbytes'),\
-                                self.message_win)
-        # Write the edf file with the modified header
-        CEAMS_edfLib.write_edf_file(edffilename_2write, \
-                        self.model_table_value.edf_dict, edf_data, self.message_win)
+        if not edffilename_2write:
+            return
+        # Overwrite the loaded file : only the header is rewritten
+        if os.path.exists(edffilename_2write) and \
+            os.path.samefile(edf_complete_path, edffilename_2write):
+            if CEAMS_edfLib.patch_edf_hdr(edffilename_2write, \
+                        self.model_table_value.edf_dict, self.message_win):
+                self.debugPrint( "{} is written".format(edffilename_2write))
+            return
+        # Write the edf file with the modified header, the edf data
+        # is copied by chunks from the loaded file
+        progress_dlg = QProgressDialog(self.tr('Writing the edf file...'), \
+                                       None, 0, 1000, self)
+        progress_dlg.setWindowModality(Qt.WindowModal)
+        progress_dlg.setMinimumDuration(500)
+        def progress_callback(n_bytes_copied, n_bytes_total):
+            progress_dlg.setValue(int(1000*n_bytes_copied/max(n_bytes_total, 1)))
+            QCoreApplication.processEvents()
+        CEAMS_edfLib.write_edf_file_from(edffilename_2write, \
+                        self.model_table_value.edf_dict, edf_complete_path, \
+                            self.message_win, progress_callback)
+        progress_dlg.setValue(1000)
         self.debugPrint( "{} is written".format(edffilename_2write))
 
 
     # function to write the channel count report.
-    def _write_chan_count(self, directory_name):
-        # List of edf header
-        edf_hdr_list = self.model_file_list.edf_hdr_list
-        # Create a master flat list of all the channels through the loaded files
-        master_chan_lst = []
-        for edf_hdr_dict in edf_hdr_list:
-            cur_labels = edf_hdr_dict.get('ch_labels')
-            # Strip spaces
-            labels_stp = []
-            for labels in cur_labels: 
-                labels_stp.append(labels.strip())
-            master_chan_lst.extend(labels_stp)        
-        # Extract unique channel list 
-        chan_np_unique = np.unique(master_chan_lst)
-        chan_lst_unique = chan_np_unique.tolist()
-        # Count the occurrence of each channel labels
-        occur_count = {}
-        for i_chan in range(len(chan_lst_unique)):
-             occurrence = master_chan_lst.count(chan_lst_unique[i_chan])
-             occur_count[chan_lst_unique[i_chan]] = occurrence
-        # Create a dataframe from the count
-        df = pd.DataFrame.from_dict(occur_count, orient='index')
-        # Write the DataFrame into a cvs file
-        chanCount_rep_fname = directory_name + "/chanCountRep.csv"  
-        # Write the DataFrame into a cvs file
-        df.to_csv(chanCount_rep_fname, index_label='channel', header=['count'])        
-        # Plot debug message
-        self.debugPrint( "Channel Count Report is written to {}".\
-                        format(chanCount_rep_fname))
+    def _write_chan_count(self, directory_name, chan_table=None):
+        CEAMS_edfReports.write_chan_count(self.model_file_list.edf_hdr_list, \
+                                          directory_name, self.message_win, chan_table)
             
             
     # function to write the channels reports.
-    def _write_chan_reports(self, directory_name):
-        
-        # Create a subfolder to save all the reports if it does not exist
-        if not os.path.exists(directory_name + "/EdfHdr_RW_chans_rep"):
-            os.mkdir(directory_name + "/EdfHdr_RW_chans_rep")
-            
-        # List of edf header
-        edf_hdr_list = self.model_file_list.edf_hdr_list
-        
-        # Create a master flat list of all the channels through the loaded files
-        master_chan_lst = []
-        for edf_hdr_dict in edf_hdr_list:
-            cur_labels = edf_hdr_dict.get('ch_labels')
-            # Strip spaces
-            labels_stp = []
-            for labels in cur_labels: 
-                labels_stp.append(labels.strip())
-            master_chan_lst.extend(labels_stp)        
-        # Extract unique channel list 
-        chan_np_unique = np.unique(master_chan_lst)
-        chan_lst_unique = chan_np_unique.tolist()
-        
-        # For each channel from the unique master list
-        for i_chan in range(len(chan_lst_unique)):
-            # List to group all fields for the same channel (through the loaded files) 
-            all_edf_chan = [] 
-            # For each edf file loaded
-            file_i = 0
-            for edf_hdr_dict in edf_hdr_list:
-                # Look for the current channel
-                cur_labels = edf_hdr_dict.get('ch_labels')
-                # Strip spaces
-                labels_stp = []
-                for labels in cur_labels: 
-                    labels_stp.append(labels.strip())
-                cur_labels = labels_stp
-                # If the current channel is in the current edf
-                if cur_labels.count(chan_lst_unique[i_chan]):
-                    # Dict to store fields for the current channel and file
-                    cur_edf_chan = {'filename': self.model_file_list.edf_file_names[file_i]}                    
-                    cur_index = cur_labels.index(chan_lst_unique[i_chan])
-                    # For each channel field
-                    for field_key, field_val in edf_hdr_dict.items():
-                        if isinstance(field_val, list) or \
-                            isinstance(field_val, np.ndarray):
-                            # Extract the value for the current channel
-                            cur_field = field_val[cur_index]
-                            cur_edf_chan.update({field_key: cur_field})
-                            #print({field_key: cur_field})
-                    # Add the channel dict into a list
-                    all_edf_chan.append(cur_edf_chan)
-                file_i +=1
-            # Write the current channel report
-            # Create a dataframe from the list of dicts
-            dp = pd.DataFrame(all_edf_chan)
-            # Write the DataFrame into a cvs file
-            chan_reps_filen = directory_name + "/EdfHdr_RW_chans_rep/" + \
-                chan_lst_unique[i_chan] + "_rep.csv"
-            dp.to_csv(chan_reps_filen)
-            
-            
-        # Plot debug message
-        self.debugPrint( "Channels header reports are written to {}".\
-                        format(directory_name + "/EdfHdr_RW_chans_rep/")) 
+    def _write_chan_reports(self, directory_name, chan_table=None):
+        CEAMS_edfReports.write_chan_reports(self.model_file_list.edf_hdr_list, \
+            self.model_file_list.edf_file_names, directory_name, self.message_win, \
+                chan_table)
         
             
     # function to write the edf header report.
     def _write_hdr_rep(self, directory_name):
-        # List of edf header from the files loaded
-        edf_hdr_list = self.model_file_list.edf_hdr_list
-        # Create an empty list of dicts (to extract only single field)
-        # A single field does not include fields specific to channels (no array)
-        edf_hdr_s_all = []
-        # Loop through the dicts of loaded files
-        file_i = 0
-        for edf_hdr_dict in edf_hdr_list:
-            # Dict of single field
-            # Add the filename into the dict
-            edf_hdr_single = {'filename': self.model_file_list.edf_file_names[file_i]}
-            for field_key, field_val in edf_hdr_dict.items():
-                if isinstance(field_val, str) or isinstance(field_val, int) or \
-                    isinstance(field_val, float):
-                        # Construct a dict with only single values
-                        # one edf_hdr_single dist per edf file
-                        edf_hdr_single.update({field_key: field_val})
-            # Add the single dict into a list
-            edf_hdr_s_all.append(edf_hdr_single)
-            file_i +=1
-        # Create a dataframe from the list of dicts
-        dp = pd.DataFrame(edf_hdr_s_all)
-        # Write the DataFrame into a cvs file
-        hdr_rep_fname = directory_name + "/edfHdrRep.csv"
-        dp.to_csv(hdr_rep_fname)
-        # Plot debug message
-        self.debugPrint( "EDF header Report is written to {}".format(hdr_rep_fname)) 
+        CEAMS_edfReports.write_hdr_rep(self.model_file_list.edf_hdr_list, \
+            self.model_file_list.edf_file_names, directory_name, self.message_win)
         
         
 # To retrieve the computer system’s local language and load the right 